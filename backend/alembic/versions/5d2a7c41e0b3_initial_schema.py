@@ -0,0 +1,76 @@
+"""Initial schema: users, datasets and models
+
+Revision ID: 5d2a7c41e0b3
+Revises:
+Create Date: 2026-10-15 09:00:00
+
+The tables ``Base.metadata.create_all`` created before migrations were
+added; such databases are stamped with this revision rather than
+upgraded through it (see ``upgrade_database``).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '5d2a7c41e0b3'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('email', sa.String()),
+        sa.Column('username', sa.String()),
+        sa.Column('hashed_password', sa.String()),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('is_verified', sa.Boolean()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True))
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table(
+        'datasets',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String()),
+        sa.Column('filename', sa.String()),
+        sa.Column('file_path', sa.String()),
+        sa.Column('file_size', sa.Integer()),
+        sa.Column('row_count', sa.Integer()),
+        sa.Column('column_count', sa.Integer()),
+        sa.Column('column_info', sa.JSON()),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True))
+    )
+    op.create_index('ix_datasets_id', 'datasets', ['id'])
+    op.create_index('ix_datasets_name', 'datasets', ['name'])
+
+    op.create_table(
+        'models',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String()),
+        sa.Column('task_type', sa.String()),
+        sa.Column('algorithm', sa.String()),
+        sa.Column('target_column', sa.String()),
+        sa.Column('feature_columns', sa.JSON()),
+        sa.Column('model_path', sa.String()),
+        sa.Column('metrics', sa.JSON()),
+        sa.Column('parameters', sa.JSON()),
+        sa.Column('dataset_id', sa.Integer(), sa.ForeignKey('datasets.id')),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index('ix_models_id', 'models', ['id'])
+    op.create_index('ix_models_name', 'models', ['name'])
+
+
+def downgrade() -> None:
+    op.drop_table('models')
+    op.drop_table('datasets')
+    op.drop_table('users')
@@ -0,0 +1,126 @@
+"""Content-addressed storage, ingest and upload sessions, training jobs
+
+Revision ID: 9c3e1f86b274
+Revises: 5d2a7c41e0b3
+Create Date: 2026-10-15 09:30:00
+
+Adds the columnar and cleaned copies, content hash, cleaning report and
+ingest status of datasets (existing datasets are ready), widens
+``file_size`` for files over 2 GB, and adds the stored files, ingest
+jobs, resumable upload sessions and background training jobs tables.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '9c3e1f86b274'
+down_revision = '5d2a7c41e0b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('datasets') as batch:
+        batch.add_column(sa.Column('columnar_path', sa.String(), nullable=True))
+        batch.add_column(sa.Column('cleaned_path', sa.String(), nullable=True))
+        batch.add_column(sa.Column('content_hash', sa.String(), nullable=True))
+        batch.add_column(sa.Column('cleaning_report', sa.JSON(), nullable=True))
+        batch.add_column(sa.Column('status', sa.String(), server_default='ready'))
+        batch.alter_column('file_size', existing_type=sa.Integer(), type_=sa.BigInteger())
+        batch.create_index('ix_datasets_content_hash', ['content_hash'])
+
+    op.create_table(
+        'stored_files',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('content_hash', sa.String()),
+        sa.Column('file_path', sa.String()),
+        sa.Column('columnar_path', sa.String(), nullable=True),
+        sa.Column('cleaned_path', sa.String(), nullable=True),
+        sa.Column('file_size', sa.BigInteger()),
+        sa.Column('row_count', sa.Integer()),
+        sa.Column('column_count', sa.Integer()),
+        sa.Column('column_info', sa.JSON()),
+        sa.Column('cleaning_report', sa.JSON(), nullable=True),
+        sa.Column('ref_count', sa.Integer()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index('ix_stored_files_id', 'stored_files', ['id'])
+    op.create_index('ix_stored_files_content_hash', 'stored_files', ['content_hash'], unique=True)
+
+    op.create_table(
+        'ingest_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('dataset_id', sa.Integer(), sa.ForeignKey('datasets.id')),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('stage', sa.String()),
+        sa.Column('rows_processed', sa.Integer()),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True))
+    )
+    op.create_index('ix_ingest_jobs_id', 'ingest_jobs', ['id'])
+
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('filename', sa.String()),
+        sa.Column('file_path', sa.String()),
+        sa.Column('total_size', sa.BigInteger()),
+        sa.Column('chunk_size', sa.Integer()),
+        sa.Column('status', sa.String()),
+        sa.Column('dataset_id', sa.Integer(), sa.ForeignKey('datasets.id'), nullable=True),
+        sa.Column('expires_at', sa.DateTime()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index('ix_upload_sessions_id', 'upload_sessions', ['id'])
+
+    op.create_table(
+        'upload_chunks',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('session_id', sa.Integer(), sa.ForeignKey('upload_sessions.id')),
+        sa.Column('chunk_index', sa.Integer()),
+        sa.Column('sha256', sa.String()),
+        sa.UniqueConstraint('session_id', 'chunk_index')
+    )
+    op.create_index('ix_upload_chunks_id', 'upload_chunks', ['id'])
+    op.create_index('ix_upload_chunks_session_id', 'upload_chunks', ['session_id'])
+
+    op.create_table(
+        'training_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('dataset_id', sa.Integer(), sa.ForeignKey('datasets.id')),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('request', sa.JSON()),
+        sa.Column('stage', sa.String()),
+        sa.Column('model_id', sa.Integer(), sa.ForeignKey('models.id'), nullable=True),
+        sa.Column('insights', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('worker_pid', sa.Integer(), nullable=True),
+        sa.Column('claim', sa.String(), nullable=True),
+        sa.Column('refit_stage', sa.String(), nullable=True),
+        sa.Column('refit_error', sa.Text(), nullable=True),
+        sa.Column('refit_finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index('ix_training_jobs_id', 'training_jobs', ['id'])
+    op.create_index('ix_training_jobs_user_id', 'training_jobs', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('training_jobs')
+    op.drop_table('upload_chunks')
+    op.drop_table('upload_sessions')
+    op.drop_table('ingest_jobs')
+    op.drop_table('stored_files')
+    with op.batch_alter_table('datasets') as batch:
+        batch.drop_index('ix_datasets_content_hash')
+        batch.alter_column('file_size', existing_type=sa.BigInteger(), type_=sa.Integer())
+        batch.drop_column('status')
+        batch.drop_column('cleaning_report')
+        batch.drop_column('content_hash')
+        batch.drop_column('cleaned_path')
+        batch.drop_column('columnar_path')
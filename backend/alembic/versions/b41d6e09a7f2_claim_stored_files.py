@@ -0,0 +1,29 @@
+"""Claim stored files before they are ingested
+
+Revision ID: b41d6e09a7f2
+Revises: 9c3e1f86b274
+Create Date: 2026-10-15 11:00:00
+
+Stored files are inserted pending, with the claiming server, before the
+upload is moved into place; existing rows are ready.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b41d6e09a7f2'
+down_revision = '9c3e1f86b274'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('stored_files') as batch:
+        batch.add_column(sa.Column('status', sa.String(), server_default='ready'))
+        batch.add_column(sa.Column('claim', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('stored_files') as batch:
+        batch.drop_column('claim')
+        batch.drop_column('status')
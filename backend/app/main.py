@@ -5,13 +5,13 @@ import os
 from dotenv import load_dotenv
 
 from app.routes import auth, upload, ml, reports
-from app.models.database import engine, Base
+from app.models.database import upgrade_database
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create or migrate the database tables
+upgrade_database()
 
 app = FastAPI(
     title="InsightAI API",
@@ -42,6 +42,15 @@ app.include_router(upload.router, prefix="/upload", tags=["Data Upload"])
 app.include_router(ml.router, prefix="/ml", tags=["Machine Learning"])
 app.include_router(reports.router, prefix="/reports", tags=["Reports"])
 
+@app.on_event("startup")
+async def resume_training_jobs():
+    # Jobs queued or running when the server last stopped start over
+    ml.training_service.resume()
+
+@app.on_event("shutdown")
+async def stop_training_workers():
+    ml.training_service.shutdown()
+
 @app.get("/")
 async def root():
     return {
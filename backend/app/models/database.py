@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -15,6 +15,36 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def alembic_config():
+    """Alembic configuration of the migrations in ``alembic/versions``."""
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.attributes["configure_logger"] = False
+    return config
+
+def upgrade_database(bind=None):
+    """Apply the pending migrations to ``bind`` (the app's engine by default).
+
+    Databases created by ``create_all`` before migrations were added hold
+    the tables of the first (base) revision but no revision record; they
+    are stamped with that revision first, so the later migrations add what
+    they lack.
+    """
+    from alembic import command
+    from alembic.script import ScriptDirectory
+
+    config = alembic_config()
+    with (bind if bind is not None else engine).begin() as connection:
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        if "users" in tables and "alembic_version" not in tables:
+            command.stamp(config, ScriptDirectory.from_config(config).get_base())
+        command.upgrade(config, "head")
+
 def get_db():
     db = SessionLocal()
     try:
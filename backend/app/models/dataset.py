@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.models.database import Base
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class Dataset(Base):
@@ -13,10 +13,15 @@ class Dataset(Base):
     name = Column(String, index=True)
     filename = Column(String)
     file_path = Column(String)
-    file_size = Column(Integer)
+    columnar_path = Column(String, nullable=True)  # Arrow copy of the raw data
+    cleaned_path = Column(String, nullable=True)  # Arrow copy of the cleaned data
+    file_size = Column(BigInteger)
+    content_hash = Column(String, index=True, nullable=True)  # SHA-256 of the uploaded bytes
     row_count = Column(Integer)
     column_count = Column(Integer)
     column_info = Column(JSON)  # Store column types, missing values, etc.
+    cleaning_report = Column(JSON, nullable=True)  # Duplicates, gaps and outliers handled at ingest
+    status = Column(String, default="ready")  # pending, profiling, appending, ready, failed
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -25,6 +30,65 @@ class Dataset(Base):
     user = relationship("User", back_populates="datasets")
     models = relationship("Model", back_populates="dataset")
 
+class StoredFile(Base):
+    __tablename__ = "stored_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, unique=True, index=True)  # SHA-256 of the file bytes
+    file_path = Column(String)
+    columnar_path = Column(String, nullable=True)
+    cleaned_path = Column(String, nullable=True)
+    file_size = Column(BigInteger)
+    row_count = Column(Integer)
+    column_count = Column(Integer)
+    column_info = Column(JSON)
+    cleaning_report = Column(JSON, nullable=True)
+    ref_count = Column(Integer, default=0)  # Datasets currently pointing at this file
+    status = Column(String, default="ready")  # pending while the upload that claimed the hash ingests it, ready
+    claim = Column(String, nullable=True)  # Server (host:pid) ingesting a pending file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"))
+    user_id = Column(Integer, ForeignKey("users.id"))
+    stage = Column(String, default="queued")  # queued, validating, scanning, profiling, ready, failed
+    rows_processed = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships
+    dataset = relationship("Dataset")
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    filename = Column(String)
+    file_path = Column(String)  # Chunks are written in place at their offsets
+    total_size = Column(BigInteger)
+    chunk_size = Column(Integer)
+    status = Column(String, default="open")  # open, finalizing, complete, failed
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), nullable=True)
+    expires_at = Column(DateTime)  # UTC; pushed back by every chunk received
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    chunks = relationship("UploadChunk", cascade="all, delete-orphan")
+
+class UploadChunk(Base):
+    __tablename__ = "upload_chunks"
+    __table_args__ = (UniqueConstraint("session_id", "chunk_index"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("upload_sessions.id"), index=True)
+    chunk_index = Column(Integer)
+    sha256 = Column(String)  # Checksum the client sent and the bytes matched
+
 class Model(Base):
     __tablename__ = "models"
 
@@ -45,6 +109,30 @@ class Model(Base):
     dataset = relationship("Dataset", back_populates="models")
     user = relationship("User", back_populates="models")
 
+class TrainingJob(Base):
+    __tablename__ = "training_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    request = Column(JSON)  # The training request, replayed by the worker
+    stage = Column(String, default="queued")  # queued, loading, training, saving, ready, failed, cancelled
+    model_id = Column(Integer, ForeignKey("models.id"), nullable=True)
+    insights = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    worker_pid = Column(Integer, nullable=True)  # Process running the job, while it runs
+    claim = Column(String, nullable=True)  # Server (host:pid) the job is queued on
+    refit_stage = Column(String, nullable=True)  # queued, running, ready, failed; unset unless refit_full was asked for
+    refit_error = Column(Text, nullable=True)
+    refit_finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    dataset = relationship("Dataset")
+
 class DatasetCreate(BaseModel):
     name: str
     filename: str
@@ -59,14 +147,54 @@ class DatasetResponse(BaseModel):
     name: str
     filename: str
     file_size: int
-    row_count: int
-    column_count: int
-    column_info: Dict[str, Any]
+    row_count: Optional[int] = None  # unset until ingest has finished
+    column_count: Optional[int] = None
+    column_info: Optional[Dict[str, Any]] = None
+    cleaning_report: Optional[Dict[str, Any]] = None
+    status: str = "ready"
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class IngestJobResponse(BaseModel):
+    id: int
+    dataset_id: int
+    stage: str
+    rows_processed: int
+    error: Optional[str] = None
+    dataset: Optional[DatasetResponse] = None
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class DatasetAppendResponse(BaseModel):
+    dataset: DatasetResponse
+    rows_received: int
+    # Duplicates (of each other and of the stored rows), gaps and outliers
+    # in the new rows; None when an identical append had already been stored
+    # and its result was shared
+    cleaning_report: Optional[Dict[str, Any]] = None
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    total_size: int
+
+class UploadSessionResponse(BaseModel):
+    id: int
+    filename: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_bytes: int
+    # [start, end) byte offsets received so far, merged across chunks
+    received_ranges: List[List[int]]
+    status: str
+    dataset_id: Optional[int] = None
+    expires_at: datetime
+
 class ModelCreate(BaseModel):
     name: str
     task_type: str
@@ -77,6 +205,24 @@ class ModelCreate(BaseModel):
     metrics: Dict[str, Any]
     parameters: Dict[str, Any]
 
+class TrainingJobResponse(BaseModel):
+    id: int
+    dataset_id: int
+    request: Dict[str, Any]
+    stage: str
+    model_id: Optional[int] = None
+    error: Optional[str] = None
+    refit_stage: Optional[str] = None
+    refit_error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    refit_finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class ModelResponse(BaseModel):
     id: int
     name: str
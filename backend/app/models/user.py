@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean
 from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
 from app.models.database import Base
 from pydantic import BaseModel, EmailStr
 from typing import Optional
@@ -17,6 +18,10 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Relationships
+    datasets = relationship("Dataset", back_populates="user")
+    models = relationship("Model", back_populates="user")
+
 class UserCreate(BaseModel):
     email: EmailStr
     username: str
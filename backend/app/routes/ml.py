@@ -1,33 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 import pandas as pd
-from typing import Dict, Any, List
+import asyncio
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 import os
 
 from app.models.database import get_db
 from app.models.user import User
-from app.models.dataset import Dataset, Model, ModelResponse
+from app.models.dataset import Dataset, Model, ModelResponse, TrainingJob, TrainingJobResponse
 from app.utils.auth import get_current_active_user
+from app.utils.model_selection import AUTO_STRATEGIES
 from app.services.ml_service import MLService
 from app.services.llm_service import LLMService
+from app.services.training_service import TrainingService
 
 router = APIRouter()
 ml_service = MLService()
 llm_service = LLMService()
+training_service = TrainingService()
 
 class ModelTrainingRequest(BaseModel):
     dataset_id: int
     task_type: str  # classification, regression, clustering
     target_column: str = None
+    feature_columns: Optional[List[str]] = None  # defaults to every other column
     algorithm: str = "auto"
+    auto_strategy: Optional[str] = None  # halving or full; defaults to AUTO_SELECT_STRATEGY
     n_clusters: int = 3
+    use_float32: bool = False  # load float features as float32 to halve their memory
+    refit_full: bool = False  # once ready, refit the model on train and test rows in the background
+    time_budget_seconds: Optional[float] = None  # auto mode: stop selecting after this long
+    max_memory_mb: Optional[float] = None  # auto mode: memory the candidate fits may use
 
 class ModelTrainingResponse(BaseModel):
     model_id: int
     task_type: str
     algorithm: str
-    target_column: str = None
+    target_column: Optional[str] = None  # unset for clustering
     feature_columns: List[str]
     metrics: Dict[str, Any]
     insights: str
@@ -36,10 +48,23 @@ class ModelTrainingResponse(BaseModel):
 @router.post("/train", response_model=ModelTrainingResponse)
 async def train_model(
     request: ModelTrainingRequest,
+    background: bool = Query(False, description="Train in a background job and return 202 with its id"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Train a machine learning model on a dataset."""
+    """Train a machine learning model on a dataset.
+
+    Training runs as a job in a worker process (see ``TRAINING_WORKERS``),
+    never in the server itself. The request waits for the job unless
+    ``background=true``, in which case it returns 202 with the job to poll
+    at ``/ml/jobs/{id}``.
+
+    With ``refit_full`` the model is fitted again on train and test rows
+    once the job is ready, without holding up the response; the job's
+    ``refit_stage`` tracks it and the reported metrics stay those of the
+    held-out test rows. The refit fails if rows are appended to the
+    dataset in the meantime.
+    """
     
     # Get the dataset
     dataset = db.query(Dataset).filter(
@@ -53,100 +78,135 @@ async def train_model(
             detail="Dataset not found"
         )
     
-    try:
-        # Load the dataset
-        df = pd.read_csv(dataset.file_path)
-        
-        # Train model based on task type
-        if request.task_type == "classification":
-            if not request.target_column:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Target column is required for classification"
-                )
-            
-            model_data = ml_service.train_classification_model(
-                df, request.target_column, request.algorithm
-            )
-            
-        elif request.task_type == "regression":
-            if not request.target_column:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Target column is required for regression"
-                )
-            
-            model_data = ml_service.train_regression_model(
-                df, request.target_column, request.algorithm
-            )
-            
-        elif request.task_type == "clustering":
-            model_data = ml_service.train_clustering_model(
-                df, request.n_clusters
+    if dataset.status != "ready":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Dataset is not ready for training (status: {dataset.status})"
+        )
+
+    if request.task_type not in ["classification", "regression", "clustering"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid task type. Must be classification, regression, or clustering"
+        )
+
+    if request.auto_strategy is not None and request.auto_strategy not in AUTO_STRATEGIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid auto strategy. Must be one of: {', '.join(AUTO_STRATEGIES)}"
+        )
+
+    for budget in ["time_budget_seconds", "max_memory_mb"]:
+        value = getattr(request, budget)
+        if value is not None and value <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{budget} must be positive"
             )
-            
-        else:
+
+    if request.refit_full and request.task_type == "clustering":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="refit_full applies to classification and regression only"
+        )
+
+    if request.task_type != "clustering" and not request.target_column:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Target column is required for {request.task_type}"
+        )
+    
+    if request.feature_columns:
+        columns = list(request.feature_columns)
+        if request.target_column and request.target_column not in columns:
+            columns.append(request.target_column)
+        unknown = [col for col in columns if col not in (dataset.column_info or {})]
+        if unknown:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid task type. Must be classification, regression, or clustering"
+                detail=f"Unknown columns: {', '.join(unknown)}"
             )
-        
-        # Save the model
-        model_name = f"{dataset.name}_{request.task_type}_{request.algorithm}"
-        model_path = ml_service.save_model(model_data, model_name)
-        
-        # Generate insights using LLM
-        dataset_info = {
-            "name": dataset.name,
-            "row_count": dataset.row_count,
-            "column_count": dataset.column_count,
-            "column_info": dataset.column_info
-        }
-        
-        model_results = {
-            "task_type": model_data["task_type"],
-            "algorithm": model_data["algorithm"],
-            "target_column": request.target_column,
-            "feature_columns": model_data["feature_columns"],
-            "metrics": model_data["metrics"]
-        }
-        
-        insights = llm_service.generate_insights(dataset_info, model_results)
-        
-        # Save model record to database
-        model_record = Model(
-            name=model_name,
-            task_type=model_data["task_type"],
-            algorithm=model_data["algorithm"],
-            target_column=request.target_column,
-            feature_columns=model_data["feature_columns"],
-            model_path=model_path,
-            metrics=model_data["metrics"],
-            parameters={"algorithm": request.algorithm, "n_clusters": request.n_clusters},
-            dataset_id=dataset.id,
-            user_id=current_user.id
+
+    job = training_service.create_job(db, dataset.id, current_user.id, request.model_dump())
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"At most {training_service.max_jobs_per_user} training jobs can be queued or running at once"
         )
-        
-        db.add(model_record)
-        db.commit()
-        db.refresh(model_record)
-        
-        return ModelTrainingResponse(
-            model_id=model_record.id,
-            task_type=model_data["task_type"],
-            algorithm=model_data["algorithm"],
-            target_column=request.target_column,
-            feature_columns=model_data["feature_columns"],
-            metrics=model_data["metrics"],
-            insights=insights,
-            model_path=model_path
+
+    finished = training_service.submit(job.id)
+    if background:
+        content = jsonable_encoder(TrainingJobResponse.model_validate(job))
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=content,
+            headers={"Location": f"/ml/jobs/{job.id}"}
         )
-        
-    except Exception as e:
+
+    # Wait for the worker without holding up the event loop
+    await asyncio.wrap_future(finished)
+    db.refresh(job)
+    if job.stage == "cancelled":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Training job was cancelled"
+        )
+    if job.stage != "ready":
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error training model: {str(e)}"
+            detail=job.error or "Error training model"
+        )
+
+    model_record = db.query(Model).filter(Model.id == job.model_id).first()
+    return ModelTrainingResponse(
+        model_id=model_record.id,
+        task_type=model_record.task_type,
+        algorithm=model_record.algorithm,
+        target_column=model_record.target_column,
+        feature_columns=model_record.feature_columns,
+        metrics=model_record.metrics,
+        insights=job.insights,
+        model_path=model_record.model_path
+    )
+
+def _get_training_job(db: Session, job_id: int, user: User) -> TrainingJob:
+    job = db.query(TrainingJob).filter(
+        TrainingJob.id == job_id,
+        TrainingJob.user_id == user.id
+    ).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job
+
+@router.get("/jobs/{job_id}", response_model=TrainingJobResponse)
+async def get_training_job(
+    job_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the stage of a training job, and its model once it is ready."""
+    return _get_training_job(db, job_id, current_user)
+
+@router.post("/jobs/{job_id}/cancel", response_model=TrainingJobResponse)
+async def cancel_training_job(
+    job_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Cancel a queued or running training job, killing its worker process."""
+    job = _get_training_job(db, job_id, current_user)
+    if not training_service.cancel(db, job):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job has already finished (stage: {job.stage})"
         )
+    db.refresh(job)
+    return job
 
 @router.get("/models", response_model=List[ModelResponse])
 async def get_models(
@@ -207,7 +267,8 @@ async def get_model_results(
             "name": dataset.name,
             "row_count": dataset.row_count,
             "column_count": dataset.column_count,
-            "column_info": dataset.column_info
+            "column_info": dataset.column_info,
+            "cleaning_report": dataset.cleaning_report
         }
         
         model_results = {
@@ -259,7 +320,8 @@ async def delete_model(
     if os.path.exists(model.model_path):
         os.remove(model.model_path)
     
-    # Delete from database
+    # Delete from database; the job that trained it stays, without it
+    db.query(TrainingJob).filter(TrainingJob.model_id == model.id).update({"model_id": None})
     db.delete(model)
     db.commit()
     
@@ -48,7 +48,8 @@ async def download_pdf_report(
             "name": dataset.name,
             "row_count": dataset.row_count,
             "column_count": dataset.column_count,
-            "column_info": dataset.column_info
+            "column_info": dataset.column_info,
+            "cleaning_report": dataset.cleaning_report
         }
         
         model_results = {
@@ -109,7 +110,8 @@ async def download_csv_results(
             "name": dataset.name,
             "row_count": dataset.row_count,
             "column_count": dataset.column_count,
-            "column_info": dataset.column_info
+            "column_info": dataset.column_info,
+            "cleaning_report": dataset.cleaning_report
         }
         
         # Generate CSV results
@@ -158,7 +160,8 @@ async def get_model_charts(
             "name": dataset.name,
             "row_count": dataset.row_count,
             "column_count": dataset.column_count,
-            "column_info": dataset.column_info
+            "column_info": dataset.column_info,
+            "cleaning_report": dataset.cleaning_report
         }
         
         # Generate charts
@@ -210,7 +213,8 @@ async def get_model_summary(
             "name": dataset.name,
             "row_count": dataset.row_count,
             "column_count": dataset.column_count,
-            "column_info": dataset.column_info
+            "column_info": dataset.column_info,
+            "cleaning_report": dataset.cleaning_report
         }
         
         model_results = {
@@ -1,41 +1,90 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Header, Query, Request, Response, status
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 import pandas as pd
 import os
-import shutil
-from typing import List
-from datetime import datetime
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
 
 from app.models.database import get_db
 from app.models.user import User
-from app.models.dataset import Dataset, DatasetResponse
+from app.models.dataset import (
+    Dataset,
+    DatasetResponse,
+    DatasetAppendResponse,
+    IngestJob,
+    IngestJobResponse,
+    Model,
+    TrainingJob,
+    UploadSession,
+    UploadChunk,
+    UploadSessionCreate,
+    UploadSessionResponse
+)
 from app.utils.auth import get_current_active_user
-from app.utils.data_processing import (
-    validate_csv_file,
-    save_dataframe_info,
-    get_dataframe_preview
+from app.utils.compression import csv_suffix, dataset_name, supported_suffixes
+from app.utils.preview import build_preview, save_preview, load_preview, preview_etag
+from app.utils.correlations import (
+    compute_correlations,
+    correlation_columns,
+    load_correlations,
+    sample_rows,
+    save_correlations,
+    target_associations
+)
+from app.utils.columnar import read_cleaned_frame, read_dataset_frame
+from app.utils.csv_reader import stored_schema
+from app.utils.storage import (
+    save_upload_file,
+    session_file_path,
+    allocate_session_file,
+    write_upload_chunk,
+    hash_file,
+    incoming_path,
+    stored_file_path,
+    remove_dataset_files,
+    acquire_stored_file,
+    release_dataset_files
 )
+from app.services.ingest_service import IngestService
+from app.services.training_service import FINISHED_STAGES
 
 router = APIRouter()
+ingest_service = IngestService()
 
 @router.post("/csv", response_model=DatasetResponse)
 async def upload_csv(
     file: UploadFile = File(...),
+    background: bool = Query(False, description="Ingest in a background job and return 202 with its id"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Upload a CSV file and create a dataset."""
+    """Upload a CSV file and create a dataset.
+
+    Files may be compressed (``.csv.gz``, ``.csv.bz2``, ``.csv.zst``); they
+    are stored compressed and decompressed as a stream when parsed.
+
+    With ``background=true`` the file is stored and the request returns
+    202 Accepted right away; parsing, cleaning and profiling run in the
+    ingest worker pool and can be followed at ``/upload/jobs/{id}``.
+    """
     
     # Validate file type
-    if not file.filename.endswith('.csv'):
+    suffix = csv_suffix(file.filename)
+    if suffix is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only CSV files are allowed"
+            detail=f"Only CSV files are allowed ({supported_suffixes()})"
         )
     
-    # Check file size (10MB limit)
+    # Reject early when the client declares an oversized file; the limit is
+    # enforced again on the bytes actually received while streaming.
     max_size = int(os.getenv("MAX_FILE_SIZE", 10485760))
-    if file.size > max_size:
+    if file.size is not None and file.size > max_size:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File size exceeds {max_size / 1024 / 1024}MB limit"
@@ -45,57 +94,425 @@ async def upload_csv(
     upload_dir = os.getenv("UPLOAD_DIR", "./uploads")
     os.makedirs(upload_dir, exist_ok=True)
     
+    # Save uploaded file; it is stored under its content hash, so the final
+    # location is only known once it has been streamed.
+    chunk_size = int(os.getenv("UPLOAD_CHUNK_SIZE", 1048576))
+    temp_path = incoming_path(upload_dir, suffix)
+    file_size, content_hash = await save_upload_file(file, temp_path, max_size, chunk_size)
+    
+    # Ingest parses the whole file; it runs off the event loop so other
+    # requests are served meanwhile
+    dataset, job = await run_in_threadpool(
+        _store_upload, db, current_user, file.filename, temp_path, file_size, content_hash, background
+    )
+    if job is not None:
+        return _job_accepted(job)
+    return dataset
+
+def _store_upload(
+    db: Session,
+    current_user: User,
+    original_filename: str,
+    temp_path: str,
+    file_size: int,
+    content_hash: str,
+    background: bool
+) -> Tuple[Dataset, Optional[IngestJob]]:
+    """Create a dataset from an upload fully received at ``temp_path``.
+
+    The file is moved to its content-addressed location and ingested, in
+    the background when ``background`` is set. Returns the dataset and,
+    for background uploads, the ingest job to report.
+    """
+    upload_dir = os.path.dirname(temp_path)
+    
     # Generate unique filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{current_user.id}_{timestamp}_{file.filename}"
-    file_path = os.path.join(upload_dir, filename)
+    filename = f"{current_user.id}_{timestamp}_{original_filename}"
     
-    try:
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    # Compressed uploads stay compressed; they are decompressed as a
+    # stream whenever they are parsed
+    file_path = stored_file_path(upload_dir, content_hash, csv_suffix(original_filename))
+    
+    # Re-uploads of stored content reuse the file, profile and columnar copy
+    stored = acquire_stored_file(db, content_hash)
+    if stored is not None:
+        os.remove(temp_path)
+    else:
+        if background:
+            # The dataset holds its own upload until the job stores it (see
+            # ``IngestService.store_upload``); nothing is moved before the
+            # hash is claimed
+            dataset = Dataset(
+                name=dataset_name(original_filename),
+                filename=filename,
+                file_path=temp_path,
+                file_size=file_size,
+                content_hash=content_hash,
+                status="pending",
+                user_id=current_user.id
+            )
+            db.add(dataset)
+            db.flush()
+            job = IngestJob(dataset_id=dataset.id, user_id=current_user.id, stage="queued")
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            
+            ingest_service.submit(job.id)
+            return dataset, job
         
-        # Validate CSV file
-        is_valid, message = validate_csv_file(file_path)
-        if not is_valid:
-            os.remove(file_path)
+        try:
+            # An identical upload arriving meanwhile waits for this copy
+            # (or this one for its copy); only the claimed copy is ever removed
+            stored = ingest_service.store_upload(
+                db, temp_path, file_path, content_hash, file_size, current_user.id
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=message
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error processing file: {str(e)}"
             )
-        
-        # Read and process the CSV
-        df = pd.read_csv(file_path)
-        
-        # Get dataset metadata
-        metadata = save_dataframe_info(df, file_path, current_user.id)
-        
-        # Create dataset record
-        dataset = Dataset(
-            name=file.filename.replace('.csv', ''),
-            filename=filename,
-            file_path=file_path,
-            file_size=metadata['file_size'],
-            row_count=metadata['row_count'],
-            column_count=metadata['column_count'],
-            column_info=metadata['column_info'],
-            user_id=current_user.id
+    
+    # Create dataset record
+    dataset = Dataset(
+        name=dataset_name(original_filename),
+        filename=filename,
+        file_path=stored.file_path,
+        columnar_path=stored.columnar_path,
+        cleaned_path=stored.cleaned_path,
+        file_size=stored.file_size,
+        content_hash=content_hash,
+        row_count=stored.row_count,
+        column_count=stored.column_count,
+        column_info=stored.column_info,
+        cleaning_report=stored.cleaning_report,
+        user_id=current_user.id
+    )
+    
+    db.add(dataset)
+    db.commit()
+    db.refresh(dataset)
+    
+    if background:
+        # Nothing left to do, so the job is created already finished
+        job = IngestJob(
+            dataset_id=dataset.id,
+            user_id=current_user.id,
+            stage="ready",
+            rows_processed=dataset.row_count
         )
-        
-        db.add(dataset)
+        db.add(job)
         db.commit()
-        db.refresh(dataset)
-        
-        return dataset
-        
+        db.refresh(job)
+        return dataset, job
+    
+    return dataset, None
+
+def _job_accepted(job: IngestJob) -> JSONResponse:
+    content = jsonable_encoder(IngestJobResponse.model_validate(job))
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=content,
+        headers={"Location": f"/upload/jobs/{job.id}"}
+    )
+
+@router.get("/jobs/{job_id}", response_model=IngestJobResponse)
+async def get_ingest_job(
+    job_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the stage and progress of a background ingest job."""
+    job = db.query(IngestJob).filter(
+        IngestJob.id == job_id,
+        IngestJob.user_id == current_user.id
+    ).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job
+
+def _total_chunks(session: UploadSession) -> int:
+    return -(-session.total_size // session.chunk_size)
+
+def _session_response(session: UploadSession) -> UploadSessionResponse:
+    ranges: List[List[int]] = []
+    for index in sorted(chunk.chunk_index for chunk in session.chunks):
+        start = index * session.chunk_size
+        end = min(start + session.chunk_size, session.total_size)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return UploadSessionResponse(
+        id=session.id,
+        filename=session.filename,
+        total_size=session.total_size,
+        chunk_size=session.chunk_size,
+        total_chunks=_total_chunks(session),
+        received_bytes=sum(end - start for start, end in ranges),
+        received_ranges=ranges,
+        status=session.status,
+        dataset_id=session.dataset_id,
+        expires_at=session.expires_at
+    )
+
+def _session_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=int(os.getenv("UPLOAD_SESSION_TTL", 86400)))
+
+def _discard_upload_session(db: Session, session: UploadSession) -> None:
+    if session.file_path and os.path.exists(session.file_path):
+        os.remove(session.file_path)
+    db.delete(session)
+
+def _get_upload_session(db: Session, session_id: int, current_user: User) -> UploadSession:
+    session = db.query(UploadSession).filter(
+        UploadSession.id == session_id,
+        UploadSession.user_id == current_user.id
+    ).first()
+    
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found"
+        )
+    
+    if session.status != "complete" and session.expires_at < datetime.utcnow():
+        _discard_upload_session(db, session)
+        db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Upload session has expired"
+        )
+    
+    return session
+
+@router.post("/sessions", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    upload: UploadSessionCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Start a resumable upload.
+
+    The file is sent in ``chunk_size`` pieces with
+    ``PUT /upload/sessions/{id}/chunks/{index}``, in any order and retried
+    as often as needed; ``GET /upload/sessions/{id}`` reports the byte
+    ranges received so far. ``POST /upload/sessions/{id}/complete`` then
+    ingests the file as ``/upload/csv`` would. Sessions without activity
+    for ``UPLOAD_SESSION_TTL`` seconds expire.
+    """
+    if csv_suffix(upload.filename) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Only CSV files are allowed ({supported_suffixes()})"
+        )
+    
+    max_size = int(os.getenv("MAX_FILE_SIZE", 10485760))
+    if upload.total_size <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV file is empty"
+        )
+    if upload.total_size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File size exceeds {max_size / 1024 / 1024}MB limit"
+        )
+    
+    upload_dir = os.getenv("UPLOAD_DIR", "./uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    
+    # Abandoned sessions would otherwise keep their partial files forever
+    expired = db.query(UploadSession).filter(UploadSession.expires_at < datetime.utcnow()).all()
+    for session in expired:
+        _discard_upload_session(db, session)
+    
+    session = UploadSession(
+        user_id=current_user.id,
+        filename=upload.filename,
+        total_size=upload.total_size,
+        chunk_size=int(os.getenv("UPLOAD_SESSION_CHUNK_SIZE", 8388608)),
+        status="open",
+        expires_at=_session_expiry()
+    )
+    db.add(session)
+    db.flush()
+    session.file_path = session_file_path(upload_dir, session.id)
+    allocate_session_file(session.file_path, session.total_size)
+    db.commit()
+    db.refresh(session)
+    
+    return _session_response(session)
+
+@router.get("/sessions/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the status and received byte ranges of a resumable upload."""
+    return _session_response(_get_upload_session(db, session_id, current_user))
+
+@router.put("/sessions/{session_id}/chunks/{chunk_index}", response_model=UploadSessionResponse)
+async def put_upload_chunk(
+    session_id: int,
+    chunk_index: int,
+    request: Request,
+    x_chunk_sha256: str = Header(..., description="Hex SHA-256 of the chunk body"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Upload one chunk of a resumable upload as the raw request body.
+
+    Chunk ``i`` covers bytes ``[i * chunk_size, (i + 1) * chunk_size)``;
+    only the last may be shorter. The chunk counts as received once its
+    length and SHA-256 match, and re-sending a received chunk is a no-op.
+    """
+    session = _get_upload_session(db, session_id, current_user)
+    
+    if session.status != "open":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload session is not accepting chunks (status: {session.status})"
+        )
+    
+    total_chunks = _total_chunks(session)
+    if not 0 <= chunk_index < total_chunks:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chunk index must be between 0 and {total_chunks - 1}"
+        )
+    
+    checksum = x_chunk_sha256.lower()
+    existing = db.query(UploadChunk).filter(
+        UploadChunk.session_id == session.id,
+        UploadChunk.chunk_index == chunk_index
+    ).first()
+    if existing is not None:
+        if existing.sha256 != checksum:
+            # Received chunks are never rewritten, so a finalize in progress
+            # always reads the bytes that were verified
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Chunk {chunk_index} was already received with a different checksum"
+            )
+        return _session_response(session)
+    
+    offset = chunk_index * session.chunk_size
+    expected_size = min(session.chunk_size, session.total_size - offset)
+    bytes_written, digest = await write_upload_chunk(
+        request.stream(), session.file_path, offset, expected_size
+    )
+    if bytes_written != expected_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chunk {chunk_index} must be {expected_size} bytes, received {bytes_written}"
+        )
+    if digest != checksum:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Checksum mismatch for chunk {chunk_index}; send it again"
+        )
+    
+    db.add(UploadChunk(session_id=session.id, chunk_index=chunk_index, sha256=digest))
+    session.expires_at = _session_expiry()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent retry of the same chunk was recorded first
+        db.rollback()
+    db.refresh(session)
+    
+    return _session_response(session)
+
+@router.post("/sessions/{session_id}/complete", response_model=DatasetResponse)
+async def complete_upload_session(
+    session_id: int,
+    background: bool = Query(False, description="Ingest in a background job and return 202 with its id"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Finish a resumable upload once every chunk has been received.
+
+    The assembled file is hashed and handed to the same storage and ingest
+    path as ``/upload/csv``, including deduplication and ``background``.
+    """
+    session = _get_upload_session(db, session_id, current_user)
+    
+    # Claim the session so chunks and a second finalize are turned away
+    claimed = db.query(UploadSession).filter(
+        UploadSession.id == session.id,
+        UploadSession.status == "open"
+    ).update({"status": "finalizing"}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload session cannot be completed (status: {session.status})"
+        )
+    db.refresh(session)
+    
+    missing = _total_chunks(session) - len(session.chunks)
+    if missing:
+        session.status = "open"
+        db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{missing} of {_total_chunks(session)} chunks have not been received"
+        )
+    
+    try:
+        content_hash = await hash_file(session.file_path, int(os.getenv("UPLOAD_CHUNK_SIZE", 1048576)))
+        dataset, job = await run_in_threadpool(
+            _store_upload, db, current_user, session.filename, session.file_path,
+            session.total_size, content_hash, background
+        )
     except Exception as e:
-        # Clean up file if error occurs
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        db.rollback()
+        db.query(UploadSession).filter(UploadSession.id == session_id).update({"status": "failed"})
+        db.commit()
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing file: {str(e)}"
         )
+    
+    session.status = "complete"
+    session.dataset_id = dataset.id
+    db.commit()
+    
+    if job is not None:
+        return _job_accepted(job)
+    return dataset
+
+@router.delete("/sessions/{session_id}")
+async def delete_upload_session(
+    session_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Abandon a resumable upload and remove its partial file."""
+    session = _get_upload_session(db, session_id, current_user)
+    
+    if session.status == "finalizing":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session is being finalized"
+        )
+    
+    _discard_upload_session(db, session)
+    db.commit()
+    
+    return {"message": "Upload session deleted successfully"}
 
 @router.get("/datasets", response_model=List[DatasetResponse])
 async def get_datasets(
@@ -129,10 +546,15 @@ async def get_dataset(
 @router.get("/datasets/{dataset_id}/preview")
 async def get_dataset_preview(
     dataset_id: int,
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get a preview of the dataset."""
+    """Get a preview of the dataset.
+
+    The preview is computed at ingest and served from storage with a strong
+    ETag; a matching ``If-None-Match`` gets 304 Not Modified.
+    """
     dataset = db.query(Dataset).filter(
         Dataset.id == dataset_id,
         Dataset.user_id == current_user.id
@@ -143,17 +565,193 @@ async def get_dataset_preview(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Dataset not found"
         )
+
+    if dataset.status != "ready":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Dataset is not ready (status: {dataset.status})"
+        )
     
     try:
-        df = pd.read_csv(dataset.file_path)
-        preview = get_dataframe_preview(df)
-        return preview
+        content = load_preview(dataset.file_path)
+        if content is None:
+            # Datasets ingested before previews were stored: build it once
+            # from the head and a reverse-seek read of the tail
+            preview = build_preview(
+                dataset.file_path,
+                (dataset.row_count, dataset.column_count),
+                dataset.column_info
+            )
+            content = save_preview(dataset.file_path, preview)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error reading dataset: {str(e)}"
         )
 
+    etag = preview_etag(content)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in candidates or etag in candidates:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=content, media_type="application/json", headers=headers)
+
+@router.get("/datasets/{dataset_id}/correlations")
+async def get_dataset_correlations(
+    dataset_id: int,
+    target: Optional[str] = Query(None, description="Rank every column by its association with this one"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the correlation matrices of a dataset.
+
+    Pearson and Spearman coefficients between numeric columns, Cramér's
+    V between categorical ones and the correlation ratio between numeric
+    and categorical ones are computed at ingest (on a uniform sample of
+    ``CORRELATION_SAMPLE_ROWS`` rows for large files) and served from
+    storage. Matrices from before an append, or stored without the
+    correlation ratio, are recomputed on request.
+    With ``target``, only that column's associations are returned,
+    strongest first.
+    """
+    dataset = db.query(Dataset).filter(
+        Dataset.id == dataset_id,
+        Dataset.user_id == current_user.id
+    ).first()
+
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found"
+        )
+
+    if dataset.status != "ready":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Dataset is not ready (status: {dataset.status})"
+        )
+
+    try:
+        correlations = load_correlations(dataset.file_path)
+        if (
+            correlations is None
+            or correlations['row_count'] != dataset.row_count
+            or 'correlation_ratio' not in correlations
+        ):
+            columns = correlation_columns(dataset.column_info)
+            columns = columns['numeric'] + columns['categorical']
+            df = read_cleaned_frame(dataset.file_path, dataset.cleaned_path, columns)
+            if df is None:
+                # No cleaned copy: missing values are left to the mean fill
+                df = read_dataset_frame(
+                    dataset.file_path, dataset.columnar_path, columns, stored_schema(dataset.column_info)
+                )
+            correlations = compute_correlations(sample_rows(df), dataset.column_info, dataset.row_count)
+            save_correlations(dataset.file_path, correlations)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error computing correlations: {str(e)}"
+        )
+
+    if target is None:
+        return correlations
+    try:
+        associations = target_associations(correlations, target)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Column {target!r} is not numeric or categorical"
+        )
+    return {
+        'target': target,
+        'row_count': correlations['row_count'],
+        'sample_rows': correlations['sample_rows'],
+        'sampled': correlations['sampled'],
+        'associations': associations
+    }
+
+@router.post("/datasets/{dataset_id}/append", response_model=DatasetAppendResponse)
+async def append_to_dataset(
+    dataset_id: int,
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Append the rows of a CSV to an existing dataset.
+
+    The rows must match the dataset's columns and types. They are added to
+    the stored data and its profile is updated from their statistics alone,
+    without re-reading the rows already stored.
+    """
+    dataset = db.query(Dataset).filter(
+        Dataset.id == dataset_id,
+        Dataset.user_id == current_user.id
+    ).first()
+    
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found"
+        )
+    
+    # Validate file type
+    suffix = csv_suffix(file.filename)
+    if suffix is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Only CSV files are allowed ({supported_suffixes()})"
+        )
+    
+    # Claim the dataset so concurrent appends, training and deletes wait
+    claimed = db.query(Dataset).filter(
+        Dataset.id == dataset.id,
+        Dataset.status == "ready"
+    ).update({"status": "appending"}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Dataset is not ready for appending (status: {dataset.status})"
+        )
+    
+    upload_dir = os.getenv("UPLOAD_DIR", "./uploads")
+    max_size = int(os.getenv("MAX_FILE_SIZE", 10485760))
+    chunk_size = int(os.getenv("UPLOAD_CHUNK_SIZE", 1048576))
+    temp_path = incoming_path(upload_dir, suffix)
+    try:
+        _, delta_hash = await save_upload_file(file, temp_path, max_size, chunk_size)
+        db.refresh(dataset)
+        result = await run_in_threadpool(ingest_service.append_rows, db, dataset, temp_path, delta_hash)
+        dataset.status = "ready"
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        db.query(Dataset).filter(Dataset.id == dataset_id).update({"status": "ready"})
+        db.commit()
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error appending rows: {str(e)}"
+        )
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    if result['orphaned_path']:
+        remove_dataset_files(result['orphaned_path'])
+    
+    db.refresh(dataset)
+    return DatasetAppendResponse(
+        dataset=DatasetResponse.model_validate(dataset),
+        rows_received=result['rows_received'],
+        cleaning_report=result['cleaning_report']
+    )
+
 @router.delete("/datasets/{dataset_id}")
 async def delete_dataset(
     dataset_id: int,
@@ -172,12 +770,40 @@ async def delete_dataset(
             detail="Dataset not found"
         )
     
-    # Delete the file
-    if os.path.exists(dataset.file_path):
-        os.remove(dataset.file_path)
+    if dataset.status in ["pending", "profiling", "appending"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Dataset is still being ingested"
+        )
+    
+    # Queued and running training jobs (and refits) still read its files
+    training = db.query(TrainingJob).filter(
+        TrainingJob.dataset_id == dataset.id,
+        or_(
+            TrainingJob.stage.notin_(FINISHED_STAGES),
+            TrainingJob.refit_stage.in_(["queued", "running"])
+        )
+    ).count()
+    if training:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Dataset has {training} training job(s) in progress; cancel them or wait for them to finish"
+        )
+    
+    # Drop this dataset's reference to the stored file, if it holds one
+    orphaned_path = release_dataset_files(db, dataset)
     
     # Delete from database
+    db.query(IngestJob).filter(IngestJob.dataset_id == dataset.id).delete()
+    db.query(TrainingJob).filter(TrainingJob.dataset_id == dataset.id).delete()
+    # Trained models are self-contained and outlive their dataset
+    db.query(Model).filter(Model.dataset_id == dataset.id).update({"dataset_id": None})
+    db.query(UploadSession).filter(UploadSession.dataset_id == dataset.id).update({"dataset_id": None})
     db.delete(dataset)
     db.commit()
     
+    # Delete the file and its columnar copy once nothing references them
+    if orphaned_path:
+        remove_dataset_files(orphaned_path)
+    
     return {"message": "Dataset deleted successfully"} 
\ No newline at end of file
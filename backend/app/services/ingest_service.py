@@ -0,0 +1,425 @@
+from fastapi import HTTPException, status
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Optional
+import pandas as pd
+import hashlib
+import os
+
+from app.models.database import SessionLocal
+from app.models.dataset import Dataset, IngestJob, StoredFile
+from app.utils.data_processing import (
+    CSV_PARSE_ERRORS,
+    CSVValidationError,
+    csv_parse_error,
+    validate_csv_frame,
+    save_dataframe_info,
+    get_dataframe_preview
+)
+from app.utils.profiling import (
+    profile_csv_chunked,
+    column_schema,
+    validate_append,
+    profile_append,
+    merge_cleaning_reports,
+    frame_row_hashes,
+    load_row_hashes,
+    row_hash_paths,
+    save_row_hashes
+)
+from app.utils.columnar import (
+    write_columnar_cache,
+    columnar_path_for,
+    cleaned_path_for,
+    remove_columnar_cache,
+    ColumnarWriter
+)
+from app.utils.sketches import save_sketches, load_profile_state
+from app.utils.csv_reader import read_csv
+from app.utils.compression import compression_for, csv_suffix, estimated_csv_size, open_csv_append
+from app.utils.preview import build_preview, save_preview, preview_path_for
+from app.utils.correlations import (
+    compute_correlations,
+    correlation_settings,
+    sample_rows,
+    save_correlations
+)
+from app.utils.storage import (
+    acquire_stored_file,
+    claim_stored_file,
+    drop_claim,
+    wait_for_claim,
+    release_dataset_files,
+    release_stored_file,
+    remove_dataset_files,
+    move_dataset_files,
+    stored_file_path
+)
+
+class IngestService:
+    def __init__(self):
+        self.max_workers = int(os.getenv("INGEST_WORKERS", 2))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest")
+
+    def ingest_file(
+        self,
+        file_path: str,
+        content_hash: str,
+        file_size: int,
+        user_id: int,
+        progress: Optional[Callable[[str, int], None]] = None
+    ) -> StoredFile:
+        """Validate, clean and profile a newly stored file.
+
+        The file is parsed once: validation happens on that parse (on its
+        first chunk for large files), so a malformed upload is rejected at
+        the first bad row instead of after a separate full read.
+        """
+        if progress is not None:
+            progress('validating', 0)
+
+        # Large files are cleaned and profiled chunk by chunk so memory stays
+        # bounded; smaller ones are read whole.
+        chunked_threshold = int(os.getenv("CHUNKED_INGEST_THRESHOLD", 52428800))
+        if estimated_csv_size(file_path, file_size) >= chunked_threshold:
+            chunk_size = int(os.getenv("INGEST_CHUNK_SIZE", 100000))
+            try:
+                metadata = profile_csv_chunked(
+                    file_path, user_id, chunk_size, columnar_cache=True, progress=progress,
+                    file_size=file_size, sample_size=correlation_settings()['sample_rows']
+                )
+            except CSVValidationError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            columnar_path = metadata['columnar_path']
+            cleaned_path = metadata['cleaned_path']
+            schema = metadata['schema']
+            sample = metadata['sample']
+            row_hashes = metadata['row_hashes']
+
+            # Head rows plus a reverse-seek read of the tail, never the whole file
+            preview = build_preview(
+                file_path,
+                metadata['cleaning_report']['original_shape'],
+                metadata['column_info'],
+                metadata['dtypes']
+            )
+        else:
+            # Read and validate the CSV
+            try:
+                df = read_csv(file_path)
+                validate_csv_frame(df)
+            except CSV_PARSE_ERRORS as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(csv_parse_error(e))
+                )
+            except CSVValidationError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            if progress is not None:
+                progress('profiling', len(df))
+
+            # Get dataset metadata
+            metadata = save_dataframe_info(df, file_path, user_id, file_size)
+
+            # Keep a typed columnar copy so later reads skip CSV parsing
+            columnar_path = write_columnar_cache(df, file_path)
+            # Training reads the cleaned rows instead of cleaning them again
+            cleaned_path = write_columnar_cache(
+                metadata['cleaned_frame'].reset_index(drop=True), file_path, cleaned_path_for(file_path)
+            )
+            schema = column_schema(df)
+            sample = sample_rows(metadata['cleaned_frame'])
+            row_hashes = frame_row_hashes(df)
+
+            preview = get_dataframe_preview(df, column_info=metadata['column_info'])
+
+        # Parsed types are kept with the profile so reloads skip inference
+        for column, entry in schema.items():
+            metadata['column_info'][column].update(entry)
+
+        cleaning_report = metadata['cleaning_report']
+        save_sketches(file_path, metadata['distinct_sketches'], schema, {
+            'fill_values': cleaning_report['fill_values'],
+            'clip_bounds': cleaning_report['clip_bounds']
+        }, metadata['top_values'])
+        # Appended rows are deduplicated against these
+        save_row_hashes(file_path, row_hashes)
+        # Stored once so the preview endpoint never re-reads the dataset
+        save_preview(file_path, preview)
+        # Computed on (a sample of) the cleaned rows while they are at hand
+        save_correlations(file_path, compute_correlations(sample, metadata['column_info'], metadata['row_count']))
+
+        return StoredFile(
+            content_hash=content_hash,
+            file_path=file_path,
+            columnar_path=columnar_path,
+            cleaned_path=cleaned_path,
+            file_size=file_size,
+            row_count=metadata['row_count'],
+            column_count=metadata['column_count'],
+            column_info=metadata['column_info'],
+            cleaning_report=cleaning_report,
+            ref_count=1
+        )
+
+    def store_upload(
+        self,
+        db: Session,
+        upload_path: str,
+        file_path: str,
+        content_hash: str,
+        file_size: int,
+        user_id: int,
+        progress: Optional[Callable[[str, int], None]] = None
+    ) -> StoredFile:
+        """Store the upload at ``upload_path`` at its content-addressed
+        ``file_path`` and take a reference on the stored file.
+
+        The hash is claimed (``claim_stored_file``) before anything is
+        moved or ingested. Of two identical uploads arriving together only
+        the claimant moves its bytes into place and ingests them; the other
+        waits for that copy and reuses it, or claims the hash itself if the
+        claimant failed. The upload is always consumed, and on failure only
+        the files of a claim this call holds are removed. The reference is
+        left for the caller to commit.
+        """
+        while True:
+            stored = acquire_stored_file(db, content_hash)
+            if stored is not None:
+                os.remove(upload_path)
+                return stored
+            stored = claim_stored_file(db, content_hash, file_path, file_size)
+            if stored is not None:
+                break
+            # An identical upload holds the claim
+            wait_for_claim(db, content_hash)
+
+        try:
+            os.replace(upload_path, file_path)
+            ingested = self.ingest_file(file_path, content_hash, file_size, user_id, progress)
+        except BaseException:
+            db.rollback()
+            drop_claim(db, stored)
+            remove_dataset_files(file_path)
+            if os.path.exists(upload_path):
+                os.remove(upload_path)
+            raise
+        for column in ('columnar_path', 'cleaned_path', 'row_count', 'column_count', 'column_info', 'cleaning_report'):
+            setattr(stored, column, getattr(ingested, column))
+        stored.status = "ready"
+        stored.claim = None
+        stored.ref_count = 1
+        db.flush()
+        return stored
+
+    def append_rows(
+        self,
+        db: Session,
+        dataset: Dataset,
+        delta_path: str,
+        delta_hash: str
+    ) -> Dict[str, Any]:
+        """Append the rows of the CSV at ``delta_path`` to a ready dataset.
+
+        The rows are checked against the stored schema, appended to the
+        stored CSV and columnar cache, and their statistics merged into the
+        dataset's profile without reading the existing rows. Appended data
+        is stored under ``sha256(<old hash>:<delta hash>)``; when other
+        datasets share the original file it is copied first so they are
+        unaffected. Changes are left for the caller to commit, after which
+        the returned ``orphaned_path`` (if any) should be removed. Also
+        returns ``rows_received`` and the ``cleaning_report`` of the new rows.
+        """
+        state = load_profile_state(dataset.file_path)
+        if state is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="This dataset was stored before appends were supported; upload it again to append to it"
+            )
+        chunk_size = int(os.getenv("INGEST_CHUNK_SIZE", 100000))
+        try:
+            rows_received = validate_append(delta_path, state['schema'], chunk_size)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+        new_hash = hashlib.sha256(f"{dataset.content_hash}:{delta_hash}".encode()).hexdigest()
+        stored = db.query(StoredFile).filter(StoredFile.file_path == dataset.file_path).first()
+
+        # The same rows were already appended to the same data elsewhere
+        existing = acquire_stored_file(db, new_hash)
+        if existing is not None:
+            orphaned_path = release_stored_file(db, dataset.file_path)
+            self._point_to(dataset, existing)
+            return {'rows_received': rows_received, 'orphaned_path': orphaned_path, 'cleaning_report': None}
+
+        shared = stored is not None and stored.ref_count > 1
+        new_path = stored_file_path(os.path.dirname(dataset.file_path), new_hash, csv_suffix(dataset.file_path))
+        # Copy-on-write: datasets sharing the file keep the original
+        move_dataset_files(dataset.file_path, new_path, copy=shared)
+        original_size = os.path.getsize(new_path)
+
+        columnar_path = columnar_path_for(new_path) if dataset.columnar_path else None
+        writer = ColumnarWriter.append_segment(columnar_path) if columnar_path else None
+        # A cleaned copy from an older CLEANED_VERSION is not extended
+        cleaned_path = None
+        if dataset.cleaned_path and dataset.cleaned_path == cleaned_path_for(dataset.file_path):
+            cleaned_path = cleaned_path_for(new_path)
+        cleaned_writer = ColumnarWriter.append_segment(cleaned_path) if cleaned_path else None
+        segments = [added.path for added in (writer, cleaned_writer) if added is not None]
+        stored_hashes = row_hash_paths(new_path)
+        row_hashes = load_row_hashes(new_path)
+        compressed = compression_for(new_path) is not None
+        try:
+            if original_size and not compressed:
+                with open(new_path, "rb+") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+            with open_csv_append(new_path) as csv_file:
+                if compressed:
+                    # The last byte is not known without decompressing the
+                    # file; a blank line is skipped by the CSV parser
+                    csv_file.write("\n")
+
+                def write_chunk(chunk: pd.DataFrame) -> None:
+                    chunk.to_csv(csv_file, header=False, index=False)
+                    if writer is not None:
+                        writer.write(chunk)
+
+                result = profile_append(
+                    delta_path,
+                    dataset.row_count,
+                    dataset.column_info,
+                    state['schema'],
+                    state['cleaning_plan'],
+                    state['distinct'],
+                    write_chunk,
+                    chunk_size,
+                    cleaned_writer.write if cleaned_writer is not None else None,
+                    state['top_values'],
+                    row_hashes
+                )
+            if writer is not None and writer.close() is None:
+                # The new rows did not fit the cache's schema; fall back to CSV
+                remove_columnar_cache(columnar_path)
+                columnar_path = None
+            writer = None
+            if cleaned_writer is not None and cleaned_writer.close() is None:
+                remove_columnar_cache(cleaned_path)
+                cleaned_path = None
+            cleaned_writer = None
+
+            shape = (result['row_count'], len(result['column_info']))
+            dtypes = {column: entry['dtype'] for column, entry in result['schema'].items()}
+            save_preview(new_path, build_preview(new_path, shape, result['column_info'], dtypes))
+            save_sketches(new_path, state['distinct'], result['schema'], state['cleaning_plan'], state['top_values'])
+            # Only a complete set is extended; hashes of just the new rows
+            # would pass for the stored ones on the next append
+            if row_hashes is not None:
+                save_row_hashes(new_path, row_hashes)
+        except Exception:
+            for open_writer in (writer, cleaned_writer):
+                if open_writer is not None:
+                    open_writer.close()
+            if shared:
+                remove_dataset_files(new_path)
+            else:
+                # Undo the append and give the files back their old names;
+                # the preview is rebuilt on its next request
+                added_hashes = [path for path in row_hash_paths(new_path) if path not in stored_hashes]
+                for path in segments + added_hashes + [preview_path_for(new_path)]:
+                    if os.path.exists(path):
+                        os.remove(path)
+                with open(new_path, "rb+") as f:
+                    f.truncate(original_size)
+                move_dataset_files(new_path, dataset.file_path)
+            raise
+
+        if shared:
+            release_stored_file(db, dataset.file_path)
+        if stored is None or shared:
+            stored = StoredFile(ref_count=1)
+            db.add(stored)
+        stored.content_hash = new_hash
+        stored.file_path = new_path
+        stored.columnar_path = columnar_path
+        stored.cleaned_path = cleaned_path
+        stored.file_size = os.path.getsize(new_path)
+        stored.row_count = result['row_count']
+        stored.column_count = len(result['column_info'])
+        stored.column_info = result['column_info']
+        if dataset.cleaning_report:
+            stored.cleaning_report = merge_cleaning_reports(
+                dataset.cleaning_report, result['cleaning_report'], result['row_count']
+            )
+        db.flush()
+        self._point_to(dataset, stored)
+        return {'rows_received': rows_received, 'orphaned_path': None, 'cleaning_report': result['cleaning_report']}
+
+    @staticmethod
+    def _point_to(dataset: Dataset, stored: StoredFile) -> None:
+        dataset.file_path = stored.file_path
+        dataset.columnar_path = stored.columnar_path
+        dataset.cleaned_path = stored.cleaned_path
+        dataset.content_hash = stored.content_hash
+        dataset.file_size = stored.file_size
+        dataset.row_count = stored.row_count
+        dataset.column_count = stored.column_count
+        dataset.column_info = stored.column_info
+        dataset.cleaning_report = stored.cleaning_report
+
+    def submit(self, job_id: int) -> None:
+        """Queue an ingest job; at most ``INGEST_WORKERS`` run at once."""
+        self.executor.submit(self.run_job, job_id)
+
+    def run_job(self, job_id: int) -> None:
+        """Ingest the pending dataset behind a job, recording its progress."""
+        db = SessionLocal()
+        try:
+            job = db.query(IngestJob).filter(IngestJob.id == job_id).first()
+            dataset = job.dataset
+            dataset.status = "profiling"
+            db.commit()
+
+            def report(stage: str, rows: int):
+                job.stage = stage
+                job.rows_processed = rows
+                db.commit()
+
+            # The pending dataset points at its own upload, stored here once
+            # its hash is claimed (or shared with an identical upload's copy)
+            file_path = stored_file_path(
+                os.path.dirname(dataset.file_path), dataset.content_hash, csv_suffix(dataset.filename)
+            )
+            stored = self.store_upload(
+                db, dataset.file_path, file_path, dataset.content_hash, dataset.file_size, job.user_id, report
+            )
+
+            self._point_to(dataset, stored)
+            dataset.status = "ready"
+            job.stage = "ready"
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            job = db.query(IngestJob).filter(IngestJob.id == job_id).first()
+            job.stage = "failed"
+            job.error = e.detail if isinstance(e, HTTPException) else f"Error processing file: {str(e)}"
+            job.dataset.status = "failed"
+            db.commit()
+            # The dataset took no reference; only an upload it still holds is removed
+            orphaned_path = release_dataset_files(db, job.dataset)
+            if orphaned_path:
+                remove_dataset_files(orphaned_path)
+
+        finally:
+            db.close()
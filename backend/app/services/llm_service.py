@@ -90,12 +90,25 @@ class LLMService:
             prompt += f"\n  - Type: {col_info.get('type', 'unknown')}"
             prompt += f"\n  - Missing values: {col_info.get('missing_count', 0)} ({col_info.get('missing_percentage', 0):.1f}%)"
             prompt += f"\n  - Unique values: {col_info.get('unique_count', 0)}"
+            if col_info.get('unique_count_mode') == 'approximate':
+                prompt += f" (approximate, ±{col_info.get('unique_count_error', 0) * 100:.1f}%)"
             
             if col_info.get('type') in ['integer', 'float']:
                 prompt += f"\n  - Range: {col_info.get('min', 'N/A')} to {col_info.get('max', 'N/A')}"
                 prompt += f"\n  - Mean: {col_info.get('mean', 'N/A')}"
                 prompt += f"\n  - Std: {col_info.get('std', 'N/A')}"
-        
+
+        # Cleaning applied at ingest; the model was trained on the cleaned rows
+        cleaning = dataset.get('cleaning_report') or {}
+        if cleaning:
+            prompt += "\n\n        DATA CLEANING:"
+            prompt += f"\n- Duplicate rows removed: {cleaning.get('duplicates_removed', 0)}"
+            fill_values = cleaning.get('fill_values', {})
+            for col_name, count in cleaning.get('missing_values', {}).items():
+                prompt += f"\n- {col_name}: {count} missing values filled with {fill_values.get(col_name, 'N/A')}"
+            for col_name, count in cleaning.get('outliers', {}).items():
+                prompt += f"\n- {col_name}: {count} outliers capped to the 1.5 IQR range"
+
         prompt += f"""
 
         MODEL INFORMATION:
@@ -9,34 +9,50 @@ from sklearn.metrics import (
 )
 from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
-from lazypredict.Supervised import LazyClassifier, LazyRegressor
+from sklearn.base import clone
 import joblib
 import os
 import json
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Optional, Union
 from datetime import datetime
 
+from app.utils.feature_matrix import FeatureMatrix
+from app.utils.model_selection import select_model
+
 class MLService:
     def __init__(self):
         self.models_dir = "./models"
         os.makedirs(self.models_dir, exist_ok=True)
     
-    def prepare_data(self, df: pd.DataFrame, target_column: str, task_type: str) -> Tuple[pd.DataFrame, pd.Series, List[str]]:
-        """Prepare data for ML training."""
+    def prepare_data(self, df: Union[pd.DataFrame, FeatureMatrix], target_column: str, task_type: str, impute: bool = True) -> Tuple[pd.DataFrame, pd.Series, List[str]]:
+        """Prepare data for ML training.
+
+        ``impute=False`` skips filling missing values, for data already
+        cleaned at ingest. ``df`` may also be a dataset's ``FeatureMatrix``,
+        which is already cleaned and encoded.
+        """
+        if isinstance(df, FeatureMatrix):
+            return self._prepare_matrix(df, target_column, task_type)
+
         # Remove target column from features
         feature_columns = [col for col in df.columns if col != target_column]
         
         # Handle missing values
-        for col in feature_columns:
-            if df[col].dtype in ['int64', 'float64']:
-                df[col] = df[col].fillna(df[col].median())
-            else:
-                df[col] = df[col].fillna(df[col].mode()[0] if not df[col].mode().empty else 'Unknown')
-        
-        # Encode categorical variables
+        if impute:
+            for col in feature_columns:
+                if pd.api.types.is_numeric_dtype(df[col]):
+                    df[col] = df[col].fillna(df[col].median())
+                else:
+                    mode = df[col].mode()
+                    fill_value = mode[0] if not mode.empty else 'Unknown'
+                    if isinstance(df[col].dtype, pd.CategoricalDtype) and fill_value not in df[col].cat.categories:
+                        df[col] = df[col].cat.add_categories([fill_value])
+                    df[col] = df[col].fillna(fill_value)
+        
+        # Encode categorical variables (object or category dtype)
         label_encoders = {}
         for col in feature_columns:
-            if df[col].dtype == 'object':
+            if not pd.api.types.is_numeric_dtype(df[col]):
                 le = LabelEncoder()
                 df[col] = le.fit_transform(df[col].astype(str))
                 label_encoders[col] = le
@@ -53,9 +69,34 @@ class MLService:
         
         return X, y, feature_columns, label_encoders
     
-    def train_classification_model(self, df: pd.DataFrame, target_column: str, algorithm: str = 'auto') -> Dict[str, Any]:
-        """Train a classification model."""
-        X, y, feature_columns, label_encoders = self.prepare_data(df, target_column, 'classification')
+    def _prepare_matrix(self, features: FeatureMatrix, target_column: str, task_type: str):
+        """``prepare_data`` for a feature matrix: features are sliced from the
+        mapped file and encoders rebuilt from its stored classes."""
+        feature_columns = [col for col in features.columns if col != target_column]
+        X = features.take(feature_columns)
+        y = features.decoded(target_column)
+
+        label_encoders = {}
+        for col in feature_columns:
+            if col in features.classes:
+                le = LabelEncoder()
+                le.classes_ = np.asarray(features.classes[col], dtype=object)
+                label_encoders[col] = le
+
+        if task_type == 'classification':
+            target_encoder = LabelEncoder()
+            y = target_encoder.fit_transform(y)
+            label_encoders[target_column] = target_encoder
+
+        return X, y, feature_columns, label_encoders
+
+    def train_classification_model(self, df: Union[pd.DataFrame, FeatureMatrix], target_column: str, algorithm: str = 'auto', impute: bool = True, auto_strategy: Optional[str] = None, time_budget: Optional[float] = None, max_memory_mb: Optional[float] = None) -> Dict[str, Any]:
+        """Train a classification model.
+
+        In auto mode the selection stays within ``time_budget`` seconds and
+        ``max_memory_mb``, if given (see ``select_model``).
+        """
+        X, y, feature_columns, label_encoders = self.prepare_data(df, target_column, 'classification', impute)
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -65,19 +106,20 @@ class MLService:
         X_train_scaled = scaler.fit_transform(X_train)
         X_test_scaled = scaler.transform(X_test)
         
+        leaderboard = None
         if algorithm == 'auto':
-            # Use LazyPredict for automatic model selection
-            clf = LazyClassifier(verbose=0, ignore_warnings=True, custom_metric=None)
-            models, predictions = clf.fit(X_train_scaled, X_test_scaled, y_train, y_test)
+            # Fit LazyPredict's candidates in parallel, each within a time
+            # limit; by default most are ruled out on subsamples first
+            best_model_name, best_model, y_pred, leaderboard, usage = select_model(
+                X_train_scaled, X_test_scaled, y_train, y_test, 'classification', strategy=auto_strategy,
+                time_budget=time_budget, max_memory_mb=max_memory_mb
+            )
             
-            # Get best model
-            best_model_name = models.index[0]
-            best_model = clf.models[best_model_name]
-            
-            # Train best model on full dataset
-            best_model.fit(X_train_scaled, y_train)
-            y_pred = best_model.predict(X_test_scaled)
-            y_pred_proba = best_model.predict_proba(X_test_scaled) if hasattr(best_model, 'predict_proba') else None
+            # The winner comes back fitted on the training rows with its test
+            # predictions; only ROC AUC still needs probabilities
+            y_pred_proba = None
+            if hasattr(best_model, 'predict_proba') and len(np.unique(y_test)) == 2:
+                y_pred_proba = best_model.predict_proba(X_test_scaled)
             
         else:
             # Use specific algorithm
@@ -117,6 +159,12 @@ class MLService:
         report = classification_report(y_test, y_pred, output_dict=True)
         metrics['classification_report'] = report
         
+        if leaderboard is not None:
+            # Every candidate tried, best first, with its scores and fit time
+            metrics['leaderboard'] = leaderboard
+            # Time and memory the selection took, against its budgets
+            metrics['auto_selection'] = usage
+        
         return {
             'model': best_model,
             'scaler': scaler,
@@ -127,9 +175,13 @@ class MLService:
             'task_type': 'classification'
         }
     
-    def train_regression_model(self, df: pd.DataFrame, target_column: str, algorithm: str = 'auto') -> Dict[str, Any]:
-        """Train a regression model."""
-        X, y, feature_columns, label_encoders = self.prepare_data(df, target_column, 'regression')
+    def train_regression_model(self, df: Union[pd.DataFrame, FeatureMatrix], target_column: str, algorithm: str = 'auto', impute: bool = True, auto_strategy: Optional[str] = None, time_budget: Optional[float] = None, max_memory_mb: Optional[float] = None) -> Dict[str, Any]:
+        """Train a regression model.
+
+        In auto mode the selection stays within ``time_budget`` seconds and
+        ``max_memory_mb``, if given (see ``select_model``).
+        """
+        X, y, feature_columns, label_encoders = self.prepare_data(df, target_column, 'regression', impute)
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -139,18 +191,15 @@ class MLService:
         X_train_scaled = scaler.fit_transform(X_train)
         X_test_scaled = scaler.transform(X_test)
         
+        leaderboard = None
         if algorithm == 'auto':
-            # Use LazyPredict for automatic model selection
-            reg = LazyRegressor(verbose=0, ignore_warnings=True, custom_metric=None)
-            models, predictions = reg.fit(X_train_scaled, X_test_scaled, y_train, y_test)
-            
-            # Get best model
-            best_model_name = models.index[0]
-            best_model = reg.models[best_model_name]
-            
-            # Train best model on full dataset
-            best_model.fit(X_train_scaled, y_train)
-            y_pred = best_model.predict(X_test_scaled)
+            # Fit LazyPredict's candidates in parallel, each within a time
+            # limit; by default most are ruled out on subsamples first
+            # The winner comes back fitted on the training rows with its test predictions
+            best_model_name, best_model, y_pred, leaderboard, usage = select_model(
+                X_train_scaled, X_test_scaled, y_train, y_test, 'regression', strategy=auto_strategy,
+                time_budget=time_budget, max_memory_mb=max_memory_mb
+            )
             
         else:
             # Use specific algorithm
@@ -178,6 +227,12 @@ class MLService:
             'r2_score': r2_score(y_test, y_pred)
         }
         
+        if leaderboard is not None:
+            # Every candidate tried, best first, with its scores and fit time
+            metrics['leaderboard'] = leaderboard
+            # Time and memory the selection took, against its budgets
+            metrics['auto_selection'] = usage
+        
         return {
             'model': best_model,
             'scaler': scaler,
@@ -188,19 +243,40 @@ class MLService:
             'task_type': 'regression'
         }
     
-    def train_clustering_model(self, df: pd.DataFrame, n_clusters: int = 3) -> Dict[str, Any]:
+    def refit_model(self, model_data: Dict[str, Any], df: Union[pd.DataFrame, FeatureMatrix], target_column: str, impute: bool = True) -> Dict[str, Any]:
+        """Fit a trained model's estimator (same algorithm and parameters)
+        and scaler again on every row, test rows included.
+        
+        The metrics are left as they are: they were measured on the test
+        rows before the refit, and are the estimate to quote for it.
+        """
+        X, y, _, _ = self.prepare_data(df, target_column, model_data['task_type'], impute)
+        
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+        
+        model = clone(model_data['model'])
+        model.fit(X_scaled, y)
+        
+        return {**model_data, 'model': model, 'scaler': scaler, 'refitted': True}
+    
+    def train_clustering_model(self, df: Union[pd.DataFrame, FeatureMatrix], n_clusters: int = 3, impute: bool = True) -> Dict[str, Any]:
         """Train a clustering model."""
         # Prepare data (no target column for clustering)
-        feature_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        if isinstance(df, FeatureMatrix):
+            feature_columns = [col for col in df.columns if df.is_numeric(col, include_bool=False)]
+        else:
+            feature_columns = df.select_dtypes(include=[np.number]).columns.tolist()
         
         if len(feature_columns) < 2:
             raise ValueError("Need at least 2 numeric columns for clustering")
         
-        X = df[feature_columns]
+        X = df.take(feature_columns) if isinstance(df, FeatureMatrix) else df[feature_columns]
         
         # Handle missing values
-        for col in feature_columns:
-            X[col] = X[col].fillna(X[col].median())
+        if impute:
+            for col in feature_columns:
+                X[col] = X[col].fillna(X[col].median())
         
         # Scale features
         scaler = StandardScaler()
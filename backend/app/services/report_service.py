@@ -224,6 +224,7 @@ class ReportService:
             f"Name: {dataset_info.get('name', 'Unknown')}",
             f"Rows: {dataset_info.get('row_count', 0):,}",
             f"Columns: {dataset_info.get('column_count', 0)}",
+            f"Distinct Counts: {self._distinct_count_mode(dataset_info)}",
             f"Task Type: {model_data.get('task_type', 'Unknown').title()}",
             f"Algorithm: {model_data.get('algorithm', 'Unknown')}"
         ]
@@ -279,11 +280,12 @@ class ReportService:
         }
         
         # Add dataset information
-        results_data['Metric'].extend(['Dataset Name', 'Row Count', 'Column Count', 'Task Type', 'Algorithm'])
+        results_data['Metric'].extend(['Dataset Name', 'Row Count', 'Column Count', 'Distinct Counts', 'Task Type', 'Algorithm'])
         results_data['Value'].extend([
             dataset_info.get('name', 'Unknown'),
             dataset_info.get('row_count', 0),
             dataset_info.get('column_count', 0),
+            self._distinct_count_mode(dataset_info),
             model_data.get('task_type', 'Unknown'),
             model_data.get('algorithm', 'Unknown')
         ])
@@ -291,6 +293,7 @@ class ReportService:
             'Name of the analyzed dataset',
             'Number of rows in the dataset',
             'Number of columns in the dataset',
+            'Whether unique value counts are exact or estimated',
             'Type of machine learning task',
             'Algorithm used for training'
         ])
@@ -309,6 +312,17 @@ class ReportService:
         
         return csv_path
     
+    def _distinct_count_mode(self, dataset_info: Dict[str, Any]) -> str:
+        """Describe whether unique counts are exact or sketch estimates."""
+        approximate = [
+            info for info in (dataset_info.get('column_info') or {}).values()
+            if info.get('unique_count_mode') == 'approximate'
+        ]
+        if not approximate:
+            return "Exact"
+        error = max(info.get('unique_count_error', 0) for info in approximate)
+        return f"Approximate (HyperLogLog, ±{error * 100:.1f}%)"
+    
     def _wrap_text(self, text: str, max_width: int) -> List[str]:
         """Wrap text to fit within specified width."""
         words = text.split()
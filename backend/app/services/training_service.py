@@ -0,0 +1,466 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from sqlalchemy import insert, literal, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from typing import Any, Dict, List, Optional, Tuple
+import joblib
+import multiprocessing
+import os
+import signal
+import threading
+
+from app.models.database import SessionLocal
+from app.models.dataset import Dataset, Model, TrainingJob
+from app.models.user import User
+from app.services.ml_service import MLService
+from app.services.llm_service import LLMService
+from app.utils.columnar import read_dataset_frame
+from app.utils.csv_reader import stored_schema
+from app.utils.feature_matrix import FeatureMatrix, load_feature_matrix
+from app.utils.memory import optimize_dtypes, planned_dtypes
+from app.utils.model_selection import auto_selection_settings
+from app.utils.parallel import claimant_alive, server_token
+
+# Stages a job never leaves
+FINISHED_STAGES = ["ready", "failed", "cancelled"]
+
+
+def training_features(dataset: Dataset, columns: Optional[List[str]] = None) -> Optional[FeatureMatrix]:
+    """The dataset's memory-mapped feature matrix for ``columns`` (all by
+    default); each column is encoded from the cleaned rows by the first
+    training job after ingest or an append that asks for it."""
+    return load_feature_matrix(dataset.file_path, dataset.cleaned_path, dataset.row_count, columns)
+
+
+def _update_job(db: Session, job_id: int, values: Dict[str, Any]) -> bool:
+    """Update a job unless it has already finished (e.g. was cancelled);
+    returns whether it was updated. The caller commits."""
+    updated = db.query(TrainingJob).filter(
+        TrainingJob.id == job_id,
+        TrainingJob.stage.notin_(FINISHED_STAGES)
+    ).update(values, synchronize_session=False)
+    return bool(updated)
+
+
+def _advance(db: Session, job_id: int, stage: str, **values: Any) -> bool:
+    advanced = _update_job(db, job_id, {'stage': stage, **values})
+    db.commit()
+    return advanced
+
+
+def _training_frame(dataset: Dataset, request: Dict[str, Any]) -> Tuple[Any, bool]:
+    """The rows a training request reads, and whether they are the cleaned ones."""
+    # Only the requested features (plus the target) are read from storage
+    columns = None
+    if request.get('feature_columns'):
+        columns = list(request['feature_columns'])
+        if request.get('target_column') and request['target_column'] not in columns:
+            columns.append(request['target_column'])
+
+    # Map the cleaned, encoded rows shared by every job on this dataset;
+    # datasets without a current cleaned copy are loaded raw and imputed
+    # during training
+    features = training_features(dataset, columns)
+    if features is not None:
+        return features.select(columns, request['use_float32']), True
+    df = read_dataset_frame(
+        dataset.file_path, dataset.columnar_path, columns, stored_schema(dataset.column_info)
+    )
+    # Downcast to the compact dtypes planned at ingest
+    df, _ = optimize_dtypes(df, request['use_float32'], planned_dtypes(dataset.column_info))
+    return df, False
+
+
+def _exit_on_sigterm(signum, frame) -> None:
+    raise SystemExit(128 + signum)
+
+
+def _become_worker() -> None:
+    """Set up a worker process: it leads a process group of its own, so
+    ``TrainingService`` stops it together with the processes it starts
+    (model selection workers), and SIGTERM raises ``SystemExit`` so
+    ``finally`` blocks and temporary directories are cleaned up."""
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+
+
+def run_training_job(job_id: int) -> None:
+    """Train the model a job asks for and store it; the body of a worker
+    process.
+
+    Every stage change is skipped once the job is cancelled, so a worker
+    that outlives its cancellation stops at the next stage and never
+    records a model.
+    """
+    _become_worker()
+    db = SessionLocal()
+    model_path = None
+    try:
+        if not _advance(db, job_id, 'loading', started_at=func.now(), worker_pid=os.getpid()):
+            return
+        job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+        dataset = job.dataset
+        request = job.request
+        ml_service = MLService()
+        # The rows the model is fit on; a refit only runs on these same rows
+        dataset_hash = dataset.content_hash
+        df, cleaned = _training_frame(dataset, request)
+
+        if not _advance(db, job_id, 'training'):
+            return
+        if request['task_type'] == "classification":
+            model_data = ml_service.train_classification_model(
+                df, request['target_column'], request['algorithm'], impute=not cleaned,
+                auto_strategy=request.get('auto_strategy'),
+                time_budget=request.get('time_budget_seconds'),
+                max_memory_mb=request.get('max_memory_mb')
+            )
+        elif request['task_type'] == "regression":
+            model_data = ml_service.train_regression_model(
+                df, request['target_column'], request['algorithm'], impute=not cleaned,
+                auto_strategy=request.get('auto_strategy'),
+                time_budget=request.get('time_budget_seconds'),
+                max_memory_mb=request.get('max_memory_mb')
+            )
+        else:
+            model_data = ml_service.train_clustering_model(
+                df, request['n_clusters'], impute=not cleaned
+            )
+
+        if not _advance(db, job_id, 'saving'):
+            return
+        model_name = f"{dataset.name}_{request['task_type']}_{request['algorithm']}"
+        model_path = ml_service.save_model(model_data, model_name)
+
+        # Generate insights using LLM
+        dataset_info = {
+            "name": dataset.name,
+            "row_count": dataset.row_count,
+            "column_count": dataset.column_count,
+            "column_info": dataset.column_info,
+            "cleaning_report": dataset.cleaning_report
+        }
+        model_results = {
+            "task_type": model_data["task_type"],
+            "algorithm": model_data["algorithm"],
+            "target_column": request.get('target_column'),
+            "feature_columns": model_data["feature_columns"],
+            "metrics": model_data["metrics"]
+        }
+        insights = LLMService().generate_insights(dataset_info, model_results)
+
+        model_record = Model(
+            name=model_name,
+            task_type=model_data["task_type"],
+            algorithm=model_data["algorithm"],
+            target_column=request.get('target_column'),
+            feature_columns=model_data["feature_columns"],
+            model_path=model_path,
+            metrics=model_data["metrics"],
+            parameters={
+                "algorithm": request['algorithm'],
+                "auto_strategy": (request.get('auto_strategy') or auto_selection_settings()['strategy'])
+                if request['algorithm'] == 'auto' else None,
+                "n_clusters": request['n_clusters'],
+                "use_float32": request['use_float32'],
+                "cleaned_data": cleaned,
+                "refit_full": bool(request.get('refit_full')),
+                "time_budget_seconds": request.get('time_budget_seconds'),
+                "max_memory_mb": request.get('max_memory_mb'),
+                "dataset_hash": dataset_hash
+            },
+            dataset_id=dataset.id,
+            user_id=job.user_id
+        )
+        db.add(model_record)
+        db.flush()
+        # The model is recorded together with the job's completion, or not at all
+        if not _update_job(db, job_id, {
+            'stage': 'ready',
+            'model_id': model_record.id,
+            'insights': insights,
+            'worker_pid': None,
+            'finished_at': func.now(),
+            # The refit on every row runs after the job is ready
+            'refit_stage': 'queued' if request.get('refit_full') else None
+        }):
+            db.rollback()
+            os.remove(model_path)
+            return
+        db.commit()
+        model_path = None
+
+    except SystemExit:
+        # Stopped (cancelled, or the server shut down) mid-job
+        db.rollback()
+        if model_path is not None and os.path.exists(model_path):
+            os.remove(model_path)
+        raise
+
+    except Exception as e:
+        db.rollback()
+        if model_path is not None and os.path.exists(model_path):
+            os.remove(model_path)
+        _advance(
+            db, job_id, 'failed',
+            error=f"Error training model: {str(e)}", worker_pid=None, finished_at=func.now()
+        )
+
+    finally:
+        db.close()
+
+
+def _advance_refit(db: Session, job_id: int, refit_stage: str, **values: Any) -> None:
+    db.query(TrainingJob).filter(TrainingJob.id == job_id).update(
+        {'refit_stage': refit_stage, **values}, synchronize_session=False
+    )
+    db.commit()
+
+
+def _check_unchanged(model_record: Model, dataset: Dataset) -> None:
+    if (model_record.parameters or {}).get('dataset_hash') != dataset.content_hash:
+        raise ValueError("Dataset changed since the model was trained; train a new model instead")
+
+
+def run_refit_job(job_id: int) -> None:
+    """Fit a ready job's model again on all of its rows, test rows
+    included, and replace the stored model; the body of a worker process.
+
+    The model's metrics stay those measured on the test rows before the
+    refit, so the refit only runs on the rows the model was trained on: it
+    fails once rows have been appended to the dataset (its encoders and
+    metrics describe the old rows). A failed refit leaves the stored model
+    as it was.
+    """
+    _become_worker()
+    db = SessionLocal()
+    try:
+        _advance_refit(db, job_id, 'running', refit_error=None)
+        job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+        model_record = db.query(Model).filter(Model.id == job.model_id).first()
+        if model_record is None:
+            raise ValueError("Model was deleted")
+        request = job.request
+        ml_service = MLService()
+
+        dataset = job.dataset
+        _check_unchanged(model_record, dataset)
+        df, cleaned = _training_frame(dataset, request)
+        # An append may have replaced the stored rows while they were read
+        db.refresh(dataset)
+        _check_unchanged(model_record, dataset)
+        model_data = ml_service.load_model(model_record.model_path)
+        model_data = ml_service.refit_model(model_data, df, request['target_column'], impute=not cleaned)
+
+        # Predictions never see a half-written model file
+        temp_path = f"{model_record.model_path}.refit.tmp"
+        try:
+            joblib.dump(model_data, temp_path)
+            if db.query(Model).filter(Model.id == model_record.id).first() is None:
+                raise ValueError("Model was deleted")
+            os.replace(temp_path, model_record.model_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        _advance_refit(db, job_id, 'ready', refit_finished_at=func.now())
+
+    except Exception as e:
+        db.rollback()
+        _advance_refit(db, job_id, 'failed', refit_error=f"Error refitting model: {str(e)}", refit_finished_at=func.now())
+
+    finally:
+        db.close()
+
+
+def _claim(db: Session, job: TrainingJob, condition: Any, **values: Any) -> bool:
+    """Take a job over from a server that is gone, unless another server
+    did since ``job`` was read: its ``claim`` is swapped for this server's
+    in a single conditional update."""
+    if claimant_alive(job.claim):
+        return False
+    seen = TrainingJob.claim.is_(None) if job.claim is None else TrainingJob.claim == job.claim
+    claimed = db.query(TrainingJob).filter(TrainingJob.id == job.id, seen, condition).update(
+        {'claim': server_token(), **values}, synchronize_session=False
+    )
+    db.commit()
+    return bool(claimed)
+
+
+def _stop(process: multiprocessing.process.BaseProcess) -> None:
+    # SIGTERM a worker and every process it started; one that has not yet
+    # made its own group has started none
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        process.terminate()
+
+
+class TrainingService:
+    """Runs training jobs in worker processes, at most ``TRAINING_WORKERS``
+    at once.
+
+    Each job gets a process of its own, so cancelling it kills just that
+    job, and a crash or out-of-memory kill fails one job instead of the
+    server. Jobs are rows in ``training_jobs``; ``resume`` requeues the
+    ones a restart interrupted. A job that asks for ``refit_full`` is
+    queued again once it is ready, to refit its model on every row.
+    """
+
+    def __init__(self):
+        self.max_workers = int(os.getenv("TRAINING_WORKERS", 2))
+        self.max_jobs_per_user = int(os.getenv("TRAINING_MAX_JOBS_PER_USER", 4))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="training")
+        # Forking a threaded server is unsafe; workers start from a fresh interpreter
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+        self.lock = threading.Lock()
+        self.stopping = False
+
+    def create_job(self, db: Session, dataset_id: int, user_id: int, request: Dict[str, Any]) -> Optional[TrainingJob]:
+        """Store a queued job for a training request, claimed by this server.
+
+        Returns ``None`` instead when the user already has
+        ``max_jobs_per_user`` jobs queued or running. The count and the
+        insert are a single ``INSERT ... SELECT`` run after locking the
+        user's row, so concurrent requests cannot both pass the check: the
+        lock orders them where the database supports ``FOR UPDATE``, and
+        SQLite takes its write lock before the statement reads.
+        """
+        values = {
+            'dataset_id': dataset_id,
+            'user_id': user_id,
+            'request': request,
+            'stage': "queued",
+            'claim': server_token()
+        }
+        if not self.max_jobs_per_user:
+            job = TrainingJob(**values)
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            return job
+
+        db.query(User.id).filter(User.id == user_id).with_for_update().one()
+        active = select(func.count(TrainingJob.id)).where(
+            TrainingJob.user_id == user_id,
+            TrainingJob.stage.notin_(FINISHED_STAGES)
+        ).scalar_subquery()
+        columns = TrainingJob.__table__.c
+        row = select(*[literal(value, columns[name].type) for name, value in values.items()]).where(
+            active < self.max_jobs_per_user
+        )
+        job_id = db.execute(
+            insert(TrainingJob).from_select(list(values), row).returning(TrainingJob.id)
+        ).scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+        db.commit()
+        return db.get(TrainingJob, job_id)
+
+    def submit(self, job_id: int) -> Future:
+        """Queue a training job; the future resolves once it has finished."""
+        return self.executor.submit(self.run_job, job_id)
+
+    def _run_process(self, job_id: int, target, name: str, runnable) -> Optional[str]:
+        """Run ``target(job_id)`` in a worker process if ``runnable(job)``
+        holds and wait for it; returns why the worker died, if it died
+        without recording an outcome (killed, out of memory)."""
+        with self.lock:
+            db = SessionLocal()
+            try:
+                job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+                if job is None or not runnable(job):
+                    return None
+            finally:
+                db.close()
+            process = self.context.Process(target=target, args=(job_id,), name=f"{name}-{job_id}")
+            process.start()
+            self.processes[job_id] = process
+
+        process.join()
+        with self.lock:
+            self.processes.pop(job_id, None)
+
+        if process.exitcode == 0 or self.stopping:
+            return None
+        if process.exitcode < 0:
+            return f"killed by signal {signal.Signals(-process.exitcode).name}"
+        return f"exited with code {process.exitcode}"
+
+    def run_job(self, job_id: int) -> None:
+        """Run a queued job in a worker process and wait for it to exit."""
+        # Skipped if it was cancelled while it waited for a worker
+        reason = self._run_process(job_id, run_training_job, "training", lambda job: job.stage == "queued")
+        db = SessionLocal()
+        try:
+            if reason is not None:
+                _advance(
+                    db, job_id, 'failed',
+                    error=f"Training process {reason}", worker_pid=None, finished_at=func.now()
+                )
+            job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+            if job is not None and job.refit_stage == "queued" and not self.stopping:
+                self.executor.submit(self.run_refit, job_id)
+        finally:
+            db.close()
+
+    def run_refit(self, job_id: int) -> None:
+        """Refit a ready job's model in a worker process and wait for it to exit."""
+        reason = self._run_process(job_id, run_refit_job, "refit", lambda job: job.refit_stage == "queued")
+        if reason is not None:
+            db = SessionLocal()
+            try:
+                _advance_refit(
+                    db, job_id, 'failed',
+                    refit_error=f"Refit process {reason}", refit_finished_at=func.now()
+                )
+            finally:
+                db.close()
+
+    def cancel(self, db: Session, job: TrainingJob) -> bool:
+        """Cancel a job that has not finished, killing its worker process if
+        it is running; returns ``False`` if it had already finished."""
+        if not _advance(db, job.id, 'cancelled', worker_pid=None, finished_at=func.now()):
+            return False
+        with self.lock:
+            process = self.processes.get(job.id)
+        if process is not None:
+            # Its selection workers stop with it, and it cleans up on the way out
+            _stop(process)
+        return True
+
+    def resume(self) -> None:
+        """Requeue the jobs (and refits) that were queued or running when
+        the server stopped.
+
+        Only jobs whose server (``claim``) is no longer running are taken,
+        with a compare-and-swap on the claim, so when several server
+        processes start at once (``--workers N``) exactly one of them
+        requeues each job and none takes a live server's jobs.
+        """
+        db = SessionLocal()
+        try:
+            jobs = db.query(TrainingJob).filter(TrainingJob.stage.notin_(FINISHED_STAGES)).all()
+            refits = db.query(TrainingJob).filter(
+                TrainingJob.stage == "ready",
+                TrainingJob.refit_stage.in_(["queued", "running"])
+            ).all()
+            for job in jobs:
+                if _claim(db, job, TrainingJob.stage.notin_(FINISHED_STAGES), stage="queued", worker_pid=None):
+                    self.submit(job.id)
+            for job in refits:
+                if _claim(db, job, TrainingJob.stage == "ready", refit_stage="queued"):
+                    self.executor.submit(self.run_refit, job.id)
+        finally:
+            db.close()
+
+    def shutdown(self) -> None:
+        """Stop running workers; their jobs are requeued by the next ``resume``."""
+        self.stopping = True
+        with self.lock:
+            processes = list(self.processes.values())
+        for process in processes:
+            _stop(process)
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,182 @@
+import pandas as pd
+from typing import Dict, List, Optional
+import glob
+import os
+import re
+
+from app.utils.csv_reader import read_csv
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+except ImportError:  # pyarrow is optional; datasets then fall back to CSV
+    pa = None
+
+COLUMNAR_EXTENSION = ".arrow"
+# Bump when cleaning changes so artifacts written by older code are ignored
+CLEANED_VERSION = 1
+SEGMENT_PATTERN = re.compile(r"\.append(\d+)\.arrow$")
+
+ARROW_TYPES = {
+    'int64': 'int64',
+    'float64': 'float64',
+    'bool': 'bool_',
+    'object': 'string'
+}
+
+
+def columnar_path_for(file_path: str) -> str:
+    """Path of the columnar copy stored next to a dataset file."""
+    return os.path.splitext(file_path)[0] + COLUMNAR_EXTENSION
+
+
+def cleaned_path_for(file_path: str) -> str:
+    """Path of the cleaned copy (deduplicated, imputed, capped) of a dataset file."""
+    return f"{os.path.splitext(file_path)[0]}.cleaned.v{CLEANED_VERSION}{COLUMNAR_EXTENSION}"
+
+
+def columnar_available() -> bool:
+    return pa is not None
+
+
+def columnar_segments(columnar_path: str) -> List[str]:
+    """Appended segments of a columnar cache, oldest first.
+
+    Arrow IPC files cannot grow in place, so rows appended to a dataset
+    are written to ``<stem>.append<n>.arrow`` files read after the base.
+    """
+    stem = os.path.splitext(columnar_path)[0]
+    segments = []
+    for path in glob.glob(glob.escape(stem) + ".append*.arrow"):
+        match = SEGMENT_PATTERN.search(path)
+        if match:
+            segments.append((int(match.group(1)), path))
+    return [path for _, path in sorted(segments)]
+
+
+def remove_columnar_cache(columnar_path: str) -> None:
+    for path in [columnar_path] + columnar_segments(columnar_path):
+        _remove_partial(path)
+
+
+def _remove_partial(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def write_columnar_cache(df: pd.DataFrame, file_path: str, path: Optional[str] = None) -> Optional[str]:
+    """Write ``df`` as an uncompressed Arrow IPC (Feather v2) file.
+
+    Uncompressed IPC files can be memory-mapped and projected, so readers
+    only page in the columns they ask for. Returns the cache path, or
+    ``None`` when pyarrow is unavailable or the frame cannot be typed.
+    """
+    if pa is None:
+        return None
+
+    path = path or columnar_path_for(file_path)
+    try:
+        feather.write_feather(df, path, compression='uncompressed')
+    except (pa.ArrowException, ValueError, TypeError):
+        _remove_partial(path)
+        return None
+    return path
+
+
+class ColumnarWriter:
+    """Write a columnar cache incrementally, one parsed chunk at a time.
+
+    ``dtypes`` maps each column to ``int64``, ``float64``, ``bool`` or
+    ``object`` (text) so every chunk is written with the same schema even
+    when a chunk is all-null for some column.
+    """
+
+    def __init__(self, file_path: str, dtypes: Dict[str, str], path: Optional[str] = None, schema=None):
+        self.path = path or columnar_path_for(file_path)
+        self.schema = schema if schema is not None else pa.schema([
+            (column, getattr(pa, ARROW_TYPES[dtype])()) for column, dtype in dtypes.items()
+        ])
+        self._writer = ipc.new_file(self.path, self.schema)
+        self.failed = False
+
+    @classmethod
+    def append_segment(cls, columnar_path: str) -> 'ColumnarWriter':
+        """Writer for the next appended segment of an existing cache,
+        using the base file's schema so all segments concatenate."""
+        with pa.memory_map(columnar_path) as source:
+            schema = ipc.open_file(source).schema
+        segment = len(columnar_segments(columnar_path)) + 1
+        path = f"{os.path.splitext(columnar_path)[0]}.append{segment}{COLUMNAR_EXTENSION}"
+        return cls(columnar_path, {}, path=path, schema=schema)
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.failed:
+            return
+        try:
+            table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+            self._writer.write_table(table)
+        except (pa.ArrowException, ValueError, TypeError):
+            self.failed = True
+
+    def close(self) -> Optional[str]:
+        """Finish the file and return its path, or ``None`` if writing failed."""
+        self._writer.close()
+        if self.failed:
+            _remove_partial(self.path)
+            return None
+        return self.path
+
+
+def read_dataset_frame(
+    file_path: str,
+    columnar_path: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    schema: Optional[Dict[str, Dict]] = None
+) -> pd.DataFrame:
+    """Load a dataset, preferring its columnar copy over the raw CSV.
+
+    The Arrow file (and any appended segments) is memory-mapped and only
+    ``columns`` are materialised; without a cache the CSV parser is limited
+    to the same columns and given the stored ``schema`` instead of
+    inferring types.
+    """
+    if pa is not None and columnar_path and os.path.exists(columnar_path):
+        return _read_columnar(columnar_path, columns)
+    return read_csv(file_path, columns, schema)
+
+
+def cleaned_columns(file_path: str, cleaned_path: Optional[str]) -> Optional[List[str]]:
+    """Column names of a dataset's cleaned copy, read from its schema, or
+    ``None`` when ``read_cleaned_frame`` would find no current copy."""
+    if pa is None or not cleaned_path or cleaned_path != cleaned_path_for(file_path) \
+            or not os.path.exists(cleaned_path):
+        return None
+    with pa.memory_map(cleaned_path) as source:
+        return ipc.open_file(source).schema.names
+
+
+def read_cleaned_frame(
+    file_path: str,
+    cleaned_path: Optional[str],
+    columns: Optional[List[str]] = None
+) -> Optional[pd.DataFrame]:
+    """Load the cleaned copy of a dataset stored at ingest.
+
+    Returns ``None`` when there is none (no pyarrow, or a dataset stored
+    before cleaned copies were kept) or it was written by an older
+    ``CLEANED_VERSION``; callers then clean the raw data themselves.
+    """
+    if pa is None or not cleaned_path or cleaned_path != cleaned_path_for(file_path) \
+            or not os.path.exists(cleaned_path):
+        return None
+    return _read_columnar(cleaned_path, columns)
+
+
+def _read_columnar(columnar_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    tables = [
+        feather.read_table(path, columns=columns, memory_map=True)
+        for path in [columnar_path] + columnar_segments(columnar_path)
+    ]
+    table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+    return table.to_pandas()
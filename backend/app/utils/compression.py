@@ -0,0 +1,78 @@
+import bz2
+import gzip
+import io
+import os
+from typing import IO, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; .csv.zst uploads are then refused
+    zstandard = None
+
+# Compressed CSV extensions and the codec ``pd.read_csv`` infers from each
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.zst': 'zstd'
+}
+CSV_SUFFIXES = ['.csv'] + ['.csv' + extension for extension in COMPRESSION_EXTENSIONS]
+
+# What reading a corrupt or truncated compressed file raises
+DECOMPRESSION_ERRORS = (OSError, EOFError) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+# Upper end of what CSV exports compress by; compressed files are sized as
+# if they expanded this much so large ones are never read whole
+ASSUMED_COMPRESSION_RATIO = 10
+
+
+def csv_suffix(filename: str) -> Optional[str]:
+    """Accepted CSV suffix ``filename`` ends with (``.csv``, ``.csv.gz``, ...),
+    or ``None`` if it is not a supported file."""
+    lowered = filename.lower()
+    for suffix in CSV_SUFFIXES:
+        if lowered.endswith(suffix):
+            if suffix.endswith('.zst') and zstandard is None:
+                return None
+            return suffix
+    return None
+
+
+def supported_suffixes() -> str:
+    return ", ".join(suffix for suffix in CSV_SUFFIXES if zstandard is not None or not suffix.endswith('.zst'))
+
+
+def dataset_name(filename: str) -> str:
+    """Display name of an uploaded file, without its CSV suffix."""
+    suffix = csv_suffix(filename)
+    return filename[:-len(suffix)] if suffix else filename
+
+
+def compression_for(file_path: str) -> Optional[str]:
+    """Codec a stored file is compressed with, or ``None`` for plain CSV."""
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+
+
+def estimated_csv_size(file_path: str, file_size: int) -> int:
+    """Uncompressed size to plan parsing by; exact for plain CSV."""
+    if compression_for(file_path):
+        return file_size * ASSUMED_COMPRESSION_RATIO
+    return file_size
+
+
+def open_csv_append(file_path: str) -> IO[str]:
+    """Text handle that appends rows to a stored CSV.
+
+    Compressed files get a new compressed member (gzip and bz2) or frame
+    (zstd) at their end; the CSV parser reads concatenated members as one
+    stream, so the file never has to be decompressed and rewritten.
+    """
+    compression = compression_for(file_path)
+    if compression is None:
+        return open(file_path, "a", newline="")
+    if compression == 'gzip':
+        handle = gzip.open(file_path, "ab")
+    elif compression == 'bz2':
+        handle = bz2.open(file_path, "ab")
+    else:
+        handle = zstandard.open(file_path, "ab")
+    return io.TextIOWrapper(handle, encoding="utf-8", newline="")
@@ -0,0 +1,302 @@
+import json
+import math
+import os
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+CORRELATIONS_EXTENSION = ".correlations.json"
+
+
+def correlation_settings() -> Dict[str, int]:
+    """Rows sampled for the matrices (``CORRELATION_SAMPLE_ROWS``) and the
+    number of columns per block (``CORRELATION_BLOCK_COLUMNS``)."""
+    return {
+        'sample_rows': int(os.getenv("CORRELATION_SAMPLE_ROWS", 100000)),
+        'block_columns': max(1, int(os.getenv("CORRELATION_BLOCK_COLUMNS", 256)))
+    }
+
+
+def correlations_path_for(file_path: str) -> str:
+    """Path of the stored correlation matrices kept next to a dataset file."""
+    return os.path.splitext(file_path)[0] + CORRELATIONS_EXTENSION
+
+
+class RowSample:
+    """Uniform sample of at most ``size`` rows from a stream of chunks.
+
+    Every row draws a random key and the rows with the smallest keys are
+    kept, so memory is bounded by the sample size. Keys come from one
+    seeded generator in row order, so a file yields the same sample whether
+    it is read whole or in chunks of any size.
+    """
+
+    def __init__(self, size: int, seed: int = 0):
+        self.size = size
+        self._rng = np.random.default_rng(seed)
+        self._keys = np.empty(0)
+        self._rows: Optional[pd.DataFrame] = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        keys = self._rng.random(len(chunk))
+        chunk = chunk.reset_index(drop=True)
+        if self._rows is not None and len(self._keys) >= self.size:
+            # Only rows that beat the current largest key can get in
+            keep = keys < self._keys.max()
+            keys, chunk = keys[keep], chunk[keep]
+        if self._rows is None:
+            rows = chunk
+        else:
+            rows = pd.concat([self._rows, chunk], ignore_index=True)
+        keys = np.concatenate([self._keys, keys])
+        if len(keys) > self.size:
+            # Sorted positions keep the sampled rows in file order
+            kept = np.sort(np.argpartition(keys, self.size - 1)[:self.size])
+            keys, rows = keys[kept], rows.iloc[kept].reset_index(drop=True)
+        self._keys, self._rows = keys, rows
+
+    def frame(self) -> Optional[pd.DataFrame]:
+        """The sampled rows, or ``None`` if nothing was added."""
+        return self._rows
+
+
+def sample_rows(df: pd.DataFrame, size: Optional[int] = None) -> pd.DataFrame:
+    """The rows ``RowSample`` would keep from ``df``; all of them if it is small."""
+    size = size or correlation_settings()['sample_rows']
+    if len(df) <= size:
+        return df
+    sample = RowSample(size)
+    sample.update(df)
+    return sample.frame()
+
+
+def correlation_columns(column_info: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Columns the matrices cover: numbers (booleans included) and
+    low-cardinality categories. Free text and dates are left out."""
+    return {
+        'numeric': [column for column, info in column_info.items() if info['type'] in ['integer', 'float']],
+        'categorical': [column for column, info in column_info.items() if info['type'] == 'categorical']
+    }
+
+
+def _standardized(values: np.ndarray) -> np.ndarray:
+    # Missing values take the column mean, i.e. contribute nothing; constant
+    # columns have no correlation and come out as NaN
+    centered = values - np.nanmean(values, axis=0)
+    centered[np.isnan(centered)] = 0.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return centered / np.sqrt((centered ** 2).sum(axis=0))
+
+
+def blocked_correlation(
+    df: pd.DataFrame,
+    block_columns: int,
+    transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+) -> np.ndarray:
+    """Pearson correlation of every pair of columns, ``block_columns`` at a time.
+
+    Only two blocks of columns are standardized and held as float64 at
+    once, so the working memory is ``2 * rows * block_columns`` values plus
+    the result, however wide the frame. ``transform`` is applied to each
+    block first (ranking it gives Spearman's coefficient).
+    """
+    count = len(df.columns)
+    result = np.empty((count, count))
+    starts = range(0, count, block_columns)
+
+    def standardized_block(start: int) -> np.ndarray:
+        block = df.iloc[:, start:start + block_columns]
+        if transform is not None:
+            block = transform(block)
+        with warnings.catch_warnings(), np.errstate(all='ignore'):
+            # All-missing columns warn about an empty mean
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return _standardized(block.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    for i in starts:
+        left = standardized_block(i)
+        for j in starts:
+            if j < i:
+                continue
+            right = left if j == i else standardized_block(j)
+            product = left.T @ right
+            result[i:i + block_columns, j:j + block_columns] = product
+            result[j:j + block_columns, i:i + block_columns] = product.T
+    return np.clip(result, -1.0, 1.0)
+
+
+def _ranked(block: pd.DataFrame) -> pd.DataFrame:
+    return block.astype(np.float64).rank()
+
+
+def cramers_v(df: pd.DataFrame) -> np.ndarray:
+    """Cramér's V of every pair of columns, from their contingency tables.
+
+    Missing values count as a category of their own. Pairs where either
+    column has a single category have no association and are NaN.
+    """
+    codes = []
+    for column in df.columns:
+        codes.append(_category_codes(df[column]))
+
+    count = len(codes)
+    rows = len(df)
+    result = np.full((count, count), np.nan)
+    for i, (left, left_size) in enumerate(codes):
+        for j in range(i, count):
+            right, right_size = codes[j]
+            table = np.bincount(left * right_size + right, minlength=left_size * right_size)
+            table = table.reshape(left_size, right_size)
+            # Drop categories that never occur (the missing one, usually)
+            table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+            dof = min(table.shape) - 1
+            if dof < 1 or rows == 0:
+                continue
+            expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / rows
+            chi2 = ((table - expected) ** 2 / expected).sum()
+            result[i, j] = result[j, i] = min(1.0, math.sqrt(chi2 / rows / dof))
+    return result
+
+
+def _category_codes(series: pd.Series) -> Tuple[np.ndarray, int]:
+    codes, uniques = pd.factorize(series)
+    # Missing values (code -1) become one more category
+    return np.where(codes < 0, len(uniques), codes), len(uniques) + 1
+
+
+def correlation_ratio(numeric: pd.DataFrame, categorical: pd.DataFrame, block_columns: int) -> np.ndarray:
+    """Correlation ratio (η) of every numeric column with every categorical
+    one, ``numeric`` columns ``block_columns`` at a time.
+
+    η is the square root of the share of a numeric column's variance that
+    lies between the categories' means; it is 0 when every category has
+    the same mean, 1 when the category determines the value, and equals
+    the absolute Pearson coefficient for a two-category column. Missing
+    numbers take the column mean, missing categories count as a category
+    of their own. Constant numeric columns are NaN.
+    """
+    rows = len(numeric)
+    result = np.full((len(numeric.columns), len(categorical.columns)), np.nan)
+    if rows == 0:
+        return result
+    # Rows sorted by category, so each category's sums are one reduceat
+    groups = []
+    for column in categorical.columns:
+        codes, _ = _category_codes(categorical[column])
+        order = np.argsort(codes, kind='stable')
+        starts = np.flatnonzero(np.concatenate(([True], np.diff(codes[order]) != 0)))
+        groups.append((order, starts, np.diff(np.append(starts, rows))))
+
+    for start in range(0, len(numeric.columns), block_columns):
+        block = numeric.iloc[:, start:start + block_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        with warnings.catch_warnings(), np.errstate(all='ignore'):
+            # All-missing columns warn about an empty mean
+            warnings.simplefilter('ignore', RuntimeWarning)
+            centered = block - np.nanmean(block, axis=0)
+        centered[np.isnan(centered)] = 0.0
+        total = (centered ** 2).sum(axis=0)
+        for j, (order, starts, sizes) in enumerate(groups):
+            sums = np.add.reduceat(centered[order], starts, axis=0)
+            between = (sums ** 2 / sizes[:, None]).sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[start:start + block_columns, j] = np.sqrt(np.clip(between / total, 0.0, 1.0))
+    return result
+
+
+def _json_matrix(matrix: np.ndarray) -> List[List[Optional[float]]]:
+    return [[None if math.isnan(value) else round(float(value), 6) for value in row] for row in matrix]
+
+
+def compute_correlations(
+    df: pd.DataFrame,
+    column_info: Dict[str, Any],
+    row_count: int,
+    block_columns: Optional[int] = None
+) -> Dict[str, Any]:
+    """Pearson and Spearman matrices of the numeric columns, Cramér's V of
+    the categorical ones and the correlation ratio of each numeric column
+    with each categorical one (rows numeric, columns categorical).
+
+    ``df`` holds the cleaned rows, or a uniform sample of them (see
+    ``sample_rows``) for large datasets; ``row_count`` is the size of the
+    whole dataset and is recorded so stale matrices can be recognised.
+    Missing values (there are none in cleaned rows) take the column mean.
+    Undefined coefficients (constant columns) are ``None``.
+    """
+    block_columns = block_columns or correlation_settings()['block_columns']
+    columns = correlation_columns(column_info)
+    numeric = df[columns['numeric']]
+    categorical = df[columns['categorical']]
+    return {
+        'row_count': row_count,
+        'sample_rows': len(df),
+        'sampled': len(df) < row_count,
+        'numeric_columns': columns['numeric'],
+        'pearson': _json_matrix(blocked_correlation(numeric, block_columns)),
+        'spearman': _json_matrix(blocked_correlation(numeric, block_columns, _ranked)),
+        'categorical_columns': columns['categorical'],
+        'cramers_v': _json_matrix(cramers_v(categorical)),
+        'correlation_ratio': _json_matrix(correlation_ratio(numeric, categorical, block_columns))
+    }
+
+
+def target_associations(correlations: Dict[str, Any], target: str) -> List[Dict[str, Any]]:
+    """Every other column's association with ``target``, strongest first.
+
+    Numeric columns are related to a numeric target by the Pearson
+    coefficient (with Spearman's alongside) and categorical columns to a
+    categorical target by Cramér's V; pairs of one of each by the
+    correlation ratio. Rows are ranked by the absolute value of whichever
+    applies, all of them between 0 and 1. Raises ``KeyError`` for columns
+    the matrices do not cover.
+    """
+    numeric = correlations['numeric_columns']
+    categorical = correlations['categorical_columns']
+    ratio = correlations['correlation_ratio']
+    if target in numeric:
+        index = numeric.index(target)
+        rows = [
+            {
+                'column': column,
+                'pearson': correlations['pearson'][index][i],
+                'spearman': correlations['spearman'][index][i]
+            }
+            for i, column in enumerate(numeric) if i != index
+        ] + [
+            {'column': column, 'correlation_ratio': ratio[index][i]}
+            for i, column in enumerate(categorical)
+        ]
+    elif target in categorical:
+        index = categorical.index(target)
+        rows = [
+            {'column': column, 'cramers_v': correlations['cramers_v'][index][i]}
+            for i, column in enumerate(categorical) if i != index
+        ] + [
+            {'column': column, 'correlation_ratio': ratio[i][index]}
+            for i, column in enumerate(numeric)
+        ]
+    else:
+        raise KeyError(target)
+
+    def strength(row: Dict[str, Any]) -> float:
+        value = row.get('pearson', row.get('cramers_v', row.get('correlation_ratio')))
+        return -abs(value) if value is not None else 1.0
+
+    return sorted(rows, key=strength)
+
+
+def save_correlations(file_path: str, correlations: Dict[str, Any]) -> None:
+    """Store the matrices next to the dataset file."""
+    with open(correlations_path_for(file_path), "w") as f:
+        json.dump(correlations, f)
+
+
+def load_correlations(file_path: str) -> Optional[Dict[str, Any]]:
+    """Matrices stored for a dataset file, if any."""
+    path = correlations_path_for(file_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
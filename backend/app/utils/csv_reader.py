@@ -0,0 +1,137 @@
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas._libs.parsers import STR_NA_VALUES
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # pyarrow is optional; CSVs are then parsed by pandas' C engine
+    pa = None
+
+CSV_ENGINES = ['auto', 'pyarrow', 'c']
+
+# Spellings pd.read_csv reads as booleans; Arrow would also accept 1 and 0
+TRUE_VALUES = ['True', 'TRUE', 'true']
+FALSE_VALUES = ['False', 'FALSE', 'false']
+
+
+def csv_engine(engine: Optional[str] = None) -> str:
+    """Engine whole-file reads use: ``engine`` or ``CSV_ENGINE`` (auto,
+    pyarrow or c). ``auto`` and ``pyarrow`` use the multi-threaded Arrow
+    parser when pyarrow is installed and the C engine otherwise."""
+    engine = (engine or os.getenv("CSV_ENGINE", "auto")).lower()
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine {engine!r}; expected one of {', '.join(CSV_ENGINES)}")
+    if engine == 'c' or pa is None:
+        return 'c'
+    return 'pyarrow'
+
+
+def stored_schema(column_info: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Parsed dtype and value kinds of each column, recorded in
+    ``column_info`` at ingest and kept current by appends."""
+    return {
+        column: {'dtype': info['dtype'], 'kinds': info.get('kinds', [])}
+        for column, info in (column_info or {}).items()
+        if 'dtype' in info
+    }
+
+
+def pandas_dtypes(schema: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """``dtype`` argument that makes the C engine parse each column as the
+    schema says. Booleans with gaps are left to the parser, which keeps
+    them booleans; read as text they would become the strings "True"/"False"."""
+    dtypes = {}
+    for column, entry in schema.items():
+        if entry['dtype'] != 'object':
+            dtypes[column] = entry['dtype']
+        elif entry['kinds'] != ['b']:
+            dtypes[column] = str
+    return dtypes
+
+
+def _arrow_type(entry: Dict[str, Any]):
+    if entry['dtype'] == 'int64':
+        return pa.int64()
+    if entry['dtype'] == 'float64':
+        return pa.float64()
+    if entry['dtype'] == 'bool' or entry['kinds'] == ['b']:
+        return pa.bool_()
+    return pa.string()
+
+
+def _read_pyarrow(
+    file_path: str,
+    columns: Optional[List[str]],
+    schema: Dict[str, Dict[str, Any]]
+) -> Optional[pd.DataFrame]:
+    """Parse with Arrow and match what the C engine would return, or
+    ``None`` when the header needs pandas' handling (duplicate or blank
+    names)."""
+    header = list(pd.read_csv(file_path, nrows=0).columns)
+    if columns is not None:
+        wanted = set(columns)
+        header = [column for column in header if column in wanted]
+    column_types = {column: _arrow_type(schema[column]) for column in header if column in schema}
+
+    def read(types):
+        table = pacsv.read_csv(file_path, convert_options=pacsv.ConvertOptions(
+            include_columns=header if columns is not None else None,
+            column_types=types,
+            null_values=list(STR_NA_VALUES),
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True,
+            true_values=TRUE_VALUES,
+            false_values=FALSE_VALUES
+        ))
+        # pandas renames duplicate and blank names; Arrow keeps them as is
+        return table if table.column_names == header else None
+
+    table = read(column_types)
+    if table is None:
+        return None
+    # Arrow infers dates and times where the C engine keeps the text
+    temporal = {field.name: pa.string() for field in table.schema if pa.types.is_temporal(field.type)}
+    if temporal:
+        table = read({**column_types, **temporal})
+
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            # Columns with no values at all: pandas reads them as float NaN
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    df = table.to_pandas()
+    for column in df.columns[df.dtypes == object]:
+        # Arrow leaves None in text (and gappy boolean) columns; pandas uses NaN
+        df[column] = df[column].fillna(np.nan)
+    return df
+
+
+def read_csv(
+    file_path: str,
+    columns: Optional[List[str]] = None,
+    schema: Optional[Dict[str, Dict[str, Any]]] = None,
+    engine: Optional[str] = None
+) -> pd.DataFrame:
+    """Read a whole CSV (plain or compressed) into a DataFrame.
+
+    ``columns`` limits parsing to those columns. ``schema`` (see
+    ``stored_schema``) fixes each column's type so the parser skips
+    inference. The result matches ``pd.read_csv`` whichever engine is
+    used, except that Arrow rounds floats exactly (as ``float_precision=
+    'round_trip'`` does) where the C engine can be off in the last digit.
+    Files Arrow cannot parse the same way are handed to the C engine.
+    """
+    schema = schema or {}
+    if csv_engine(engine) == 'pyarrow':
+        try:
+            df = _read_pyarrow(file_path, columns, schema)
+        except pa.ArrowException:
+            df = None
+        if df is not None:
+            return df
+    dtypes = pandas_dtypes({column: entry for column, entry in schema.items()
+                            if columns is None or column in columns})
+    return pd.read_csv(file_path, usecols=columns, dtype=dtypes or None)
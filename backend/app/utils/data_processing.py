@@ -1,12 +1,23 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
 import os
 from datetime import datetime
 import json
 
-def detect_column_types(df: pd.DataFrame) -> Dict[str, str]:
-    """Detect the data type of each column."""
+from app.utils.sketches import (
+    HyperLogLog, TopValues, build_distinct_sketches, build_top_values, distinct_count_settings
+)
+from app.utils.memory import memory_report
+from app.utils.parallel import map_column_blocks
+from app.utils.compression import DECOMPRESSION_ERRORS
+
+def detect_column_types(df: pd.DataFrame, unique_counts: Optional[pd.Series] = None) -> Dict[str, str]:
+    """Detect the data type of each column.
+
+    ``unique_counts`` may be passed in when the caller has already computed
+    ``df.nunique()`` so the distinct-value pass is not repeated.
+    """
     column_types = {}
     
     for column in df.columns:
@@ -19,108 +30,245 @@ def detect_column_types(df: pd.DataFrame) -> Dict[str, str]:
         # Check if it's datetime
         elif pd.api.types.is_datetime64_any_dtype(df[column]):
             column_types[column] = 'datetime'
-        # Check if it's categorical (low cardinality)
-        elif df[column].nunique() < min(50, len(df) * 0.1):
-            column_types[column] = 'categorical'
-        # Default to string
         else:
-            column_types[column] = 'string'
+            n_unique = unique_counts[column] if unique_counts is not None else df[column].nunique()
+            # Check if it's categorical (low cardinality)
+            if n_unique < min(50, len(df) * 0.1):
+                column_types[column] = 'categorical'
+            # Default to string
+            else:
+                column_types[column] = 'string'
     
     return column_types
 
-def get_column_info(df: pd.DataFrame) -> Dict[str, Any]:
-    """Get comprehensive information about each column."""
+def _column_info_block(
+    df: pd.DataFrame,
+    unique_estimates: Optional[pd.Series] = None,
+    unique_errors: Optional[pd.Series] = None,
+    top_values: Optional[pd.Series] = None
+) -> Dict[str, Any]:
+    """``get_column_info`` for one block of columns.
+
+    ``unique_estimates`` are sketch estimates of the distinct counts, used
+    instead of exact counts when given; ``top_values`` holds the text
+    columns' summaries if they were already built.
+    """
     column_info = {}
+    row_count = len(df)
+    approximate = unique_estimates is not None
+    
+    missing_counts = df.isnull().sum()
+    if approximate:
+        unique_counts = np.minimum(unique_estimates, row_count - missing_counts)
+    else:
+        unique_counts = df.nunique()
+    column_types = detect_column_types(df, unique_counts)
+    
+    numeric_columns = [col for col, col_type in column_types.items() if col_type in ['integer', 'float']]
+    numeric_stats = df[numeric_columns].agg(['min', 'max', 'mean', 'std']) if numeric_columns else None
     
     for column in df.columns:
+        missing_count = int(missing_counts[column])
+        unique_count = int(unique_counts[column])
         info = {
-            'type': detect_column_types(df)[column],
-            'missing_count': df[column].isnull().sum(),
-            'missing_percentage': (df[column].isnull().sum() / len(df)) * 100,
-            'unique_count': df[column].nunique(),
-            'unique_percentage': (df[column].nunique() / len(df)) * 100
+            'type': column_types[column],
+            'missing_count': missing_count,
+            'missing_percentage': (missing_count / row_count) * 100 if row_count else 0.0,
+            'unique_count': unique_count,
+            'unique_percentage': (unique_count / row_count) * 100 if row_count else 0.0,
+            'unique_count_mode': 'approximate' if approximate else 'exact'
         }
+        if approximate:
+            info['unique_count_error'] = float(unique_errors[column])
         
         # Add type-specific information
         if info['type'] in ['integer', 'float']:
+            all_missing = missing_count == row_count
+            stats = numeric_stats[column]
             info.update({
-                'min': float(df[column].min()) if not df[column].isnull().all() else None,
-                'max': float(df[column].max()) if not df[column].isnull().all() else None,
-                'mean': float(df[column].mean()) if not df[column].isnull().all() else None,
-                'std': float(df[column].std()) if not df[column].isnull().all() else None
-            })
-        elif info['type'] == 'categorical':
-            value_counts = df[column].value_counts()
-            info.update({
-                'top_values': value_counts.head(5).to_dict(),
-                'value_counts': value_counts.to_dict()
+                stat: None if all_missing else float(stats[stat])
+                for stat in ['min', 'max', 'mean', 'std']
             })
+        elif info['type'] in ['categorical', 'string']:
+            # A bounded summary, never the full frequency table of a string column
+            summary = top_values.get(column) if top_values is not None else None
+            if not isinstance(summary, TopValues):
+                summary = TopValues.from_counts(df[column].value_counts(sort=False))
+            info.update(summary.to_info(value_counts=info['type'] == 'categorical'))
         
         column_info[column] = info
     
     return column_info
 
-def clean_dataframe(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-    """Clean the dataframe and return cleaning report."""
-    original_shape = df.shape
-    cleaning_report = {
-        'original_shape': original_shape,
-        'missing_values': {},
-        'outliers': {},
-        'duplicates_removed': 0,
-        'columns_processed': len(df.columns)
-    }
+def get_column_info(
+    df: pd.DataFrame,
+    distinct_sketches: Optional[Dict[str, HyperLogLog]] = None,
+    workers: Optional[int] = None,
+    top_values: Optional[Dict[str, TopValues]] = None
+) -> Dict[str, Any]:
+    """Get comprehensive information about each column.
+
+    Types are detected once and the per-column statistics are computed with
+    frame-wide vectorized calls (one null count, one distinct count and one
+    aggregate over the numeric block) instead of separate passes per column.
+    Wide frames are split into column blocks profiled in parallel
+    (``PROFILE_WORKERS``, or ``workers`` when given).
+
+    Above ``APPROX_DISTINCT_THRESHOLD`` rows, distinct counts come from
+    HyperLogLog sketches (``distinct_sketches`` if given) instead of exact
+    hash sets; ``unique_count_mode`` records which was used.
+
+    Text columns report their ``TOP_VALUES_K`` most frequent values and the
+    error bound of those counts (see ``TopValues``), read from
+    ``top_values`` when given; categorical columns also keep their full
+    ``value_counts``.
+    """
+    column_series = {}
+    if len(df) > distinct_count_settings()['threshold']:
+        if distinct_sketches is None:
+            distinct_sketches = build_distinct_sketches(df, workers)
+        column_series = {
+            'unique_estimates': pd.Series({column: distinct_sketches[column].estimate() for column in df.columns}),
+            'unique_errors': pd.Series({column: distinct_sketches[column].relative_error for column in df.columns})
+        }
+    if top_values is not None:
+        column_series['top_values'] = pd.Series(top_values, index=df.columns, dtype=object)
     
-    # Remove duplicates
-    initial_rows = len(df)
-    df = df.drop_duplicates()
-    cleaning_report['duplicates_removed'] = initial_rows - len(df)
+    column_info = {}
+    for block_info in map_column_blocks(_column_info_block, df, workers, column_series):
+        column_info.update(block_info)
     
+    return column_info
+
+def _clean_block(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Impute and cap outliers in one block of deduplicated columns.
+
+    Returns the cleaned block and its part of the cleaning report: missing
+    and outlier counts plus the fill values and clip bounds applied.
+    Cleaned columns are collected into a new frame rather than assigned
+    back into ``df``, which may be a slice of the caller's frame.
+    """
+    cleaned = {column: df[column] for column in df.columns}
+    report = {'missing_values': {}, 'outliers': {}, 'fill_values': {}, 'clip_bounds': {}}
+    numeric_columns = [column for column in df.columns if df[column].dtype in ['int64', 'float64']]
+
     # Handle missing values
+    missing_counts = df.isnull().sum()
+    missing_numeric = [column for column in numeric_columns if missing_counts[column] > 0]
+    # One vectorized median over all numeric columns with gaps
+    medians = df[missing_numeric].median() if missing_numeric else pd.Series(dtype='float64')
     for column in df.columns:
-        missing_count = df[column].isnull().sum()
+        missing_count = int(missing_counts[column])
         if missing_count > 0:
-            cleaning_report['missing_values'][column] = missing_count
+            report['missing_values'][column] = missing_count
             
             # Fill missing values based on column type
-            if df[column].dtype in ['int64', 'float64']:
+            if column in medians.index:
                 # For numeric columns, fill with median
-                df[column] = df[column].fillna(df[column].median())
+                fill_value = medians[column]
             else:
                 # For categorical/string columns, fill with mode
                 mode_value = df[column].mode()
-                if not mode_value.empty:
-                    df[column] = df[column].fillna(mode_value[0])
-                else:
-                    df[column] = df[column].fillna('Unknown')
+                fill_value = mode_value[0] if not mode_value.empty else 'Unknown'
+            cleaned[column] = df[column].fillna(fill_value)
+            # An all-missing column has no median; filling with NaN is a no-op
+            if not pd.isna(fill_value):
+                report['fill_values'][column] = fill_value.item() if hasattr(fill_value, 'item') else fill_value
     
     # Detect and handle outliers for numeric columns
-    for column in df.columns:
-        if df[column].dtype in ['int64', 'float64']:
-            Q1 = df[column].quantile(0.25)
-            Q3 = df[column].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            
-            outliers = df[(df[column] < lower_bound) | (df[column] > upper_bound)]
-            if len(outliers) > 0:
-                cleaning_report['outliers'][column] = len(outliers)
-                # Cap outliers instead of removing them
-                df[column] = df[column].clip(lower=lower_bound, upper=upper_bound)
+    df = pd.DataFrame(cleaned, index=df.index)
+    if numeric_columns:
+        quartiles = df[numeric_columns].quantile([0.25, 0.75])
+    for column in numeric_columns:
+        Q1 = quartiles.at[0.25, column]
+        Q3 = quartiles.at[0.75, column]
+        IQR = Q3 - Q1
+        lower_bound = Q1 - 1.5 * IQR
+        upper_bound = Q3 + 1.5 * IQR
+        if not pd.isna(IQR):
+            report['clip_bounds'][column] = (float(lower_bound), float(upper_bound))
+        
+        # Count with a boolean mask rather than materialising the outlier rows
+        outlier_count = int(((df[column] < lower_bound) | (df[column] > upper_bound)).sum())
+        if outlier_count > 0:
+            report['outliers'][column] = outlier_count
+            # Cap outliers instead of removing them
+            cleaned[column] = df[column].clip(lower=lower_bound, upper=upper_bound)
+    
+    return pd.DataFrame(cleaned, index=df.index), report
+
+def clean_dataframe(df: pd.DataFrame, workers: Optional[int] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Clean the dataframe and return cleaning report.
+
+    After deduplication, wide frames are imputed and capped in parallel
+    column blocks, as in ``get_column_info``. The report also records the
+    ``fill_values`` and ``clip_bounds`` applied, so rows appended later can
+    be cleaned the same way.
+
+    Medians and quartiles here are exact. Files large enough to be profiled
+    chunk by chunk (``profile_csv_chunked``) take them from KLL sketches
+    instead, so their fill values and clip bounds may sit a rank error of
+    about ``1.7 / QUANTILE_SKETCH_K`` away from these.
+    """
+    original_shape = df.shape
+    cleaning_report = {
+        'original_shape': original_shape,
+        'missing_values': {},
+        'outliers': {},
+        'duplicates_removed': 0,
+        'columns_processed': len(df.columns),
+        'fill_values': {},
+        'clip_bounds': {}
+    }
+    
+    # Remove duplicates
+    initial_rows = len(df)
+    df = df.drop_duplicates()
+    cleaning_report['duplicates_removed'] = initial_rows - len(df)
+    
+    blocks = map_column_blocks(_clean_block, df, workers)
+    df = blocks[0][0] if len(blocks) == 1 else pd.concat([block for block, _ in blocks], axis=1)
+    for _, block_report in blocks:
+        for key, values in block_report.items():
+            cleaning_report[key].update(values)
     
     cleaning_report['final_shape'] = df.shape
     cleaning_report['rows_removed'] = original_shape[0] - df.shape[0]
     
     return df, cleaning_report
 
-def save_dataframe_info(df: pd.DataFrame, file_path: str, user_id: int) -> Dict[str, Any]:
-    """Save dataframe information and return metadata."""
+def save_dataframe_info(
+    df: pd.DataFrame,
+    file_path: str,
+    user_id: int,
+    file_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """Save dataframe information and return metadata.
+
+    Pass ``file_size`` when it is already known to avoid statting the file.
+    """
     # Clean the data
     df_cleaned, cleaning_report = clean_dataframe(df)
     
+    # Distinct sketches and top-value summaries are kept with the dataset so
+    # later appends can be merged
+    distinct_sketches = build_distinct_sketches(df_cleaned)
+    top_values = build_top_values(df_cleaned)
+    
     # Get column information
-    column_info = get_column_info(df_cleaned)
+    column_info = get_column_info(df_cleaned, distinct_sketches, top_values=top_values)
+    
+    # Record the compact dtype each column loads as and the memory it saves.
+    # The plan is applied when training loads the stored raw copy (every
+    # raw row, see ``planned_dtypes``), so it is made on exactly those rows:
+    # planned on the clipped, cleaned values an integer column could be
+    # narrowed below its raw range and overflow on load. Deduplication
+    # keeps every distinct value and imputation fills in an existing one,
+    # so the cleaned distinct counts hold for the raw text columns too
+    unique_counts = pd.Series({column: info['unique_count'] for column, info in column_info.items()}, dtype='int64')
+    for block_report in map_column_blocks(memory_report, df, column_series={'unique_counts': unique_counts}):
+        for column, memory in block_report.items():
+            column_info[column].update(memory)
     
     # Create metadata
     metadata = {
@@ -129,40 +277,76 @@ def save_dataframe_info(df: pd.DataFrame, file_path: str, user_id: int) -> Dict[
         'column_count': len(df_cleaned.columns),
         'column_info': column_info,
         'cleaning_report': cleaning_report,
+        'cleaned_frame': df_cleaned,
+        'distinct_sketches': distinct_sketches,
+        'top_values': top_values,
         'uploaded_at': datetime.now().isoformat(),
-        'file_size': os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        'file_size': file_size if file_size is not None else (
+            os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        )
     }
     
     return metadata
 
-def validate_csv_file(file_path: str) -> Tuple[bool, str]:
-    """Validate if the file is a valid CSV."""
-    try:
-        # Try to read the first few rows
-        df = pd.read_csv(file_path, nrows=5)
-        
-        # Check if dataframe is not empty
-        if df.empty:
-            return False, "CSV file is empty"
-        
-        # Check if there are any columns
-        if len(df.columns) == 0:
-            return False, "CSV file has no columns"
-        
-        return True, "Valid CSV file"
-    
-    except Exception as e:
-        return False, f"Invalid CSV file: {str(e)}"
+class CSVValidationError(ValueError):
+    """An upload that is not a usable CSV; the message is shown to the user."""
+
+
+# Errors parsing a malformed upload raises: bad quoting or field counts, no
+# header, bytes that are not UTF-8, corrupt compressed data
+CSV_PARSE_ERRORS = (
+    pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError
+) + DECOMPRESSION_ERRORS
+
+# Delimiters of files that parse as a single comma-separated column
+FOREIGN_DELIMITERS = {';': 'semicolons', '\t': 'tabs', '|': 'pipes'}
+
+
+def csv_parse_error(error: Exception) -> CSVValidationError:
+    """User-facing error for one of ``CSV_PARSE_ERRORS``."""
+    if isinstance(error, UnicodeDecodeError):
+        return CSVValidationError("Invalid CSV file: text must be UTF-8 encoded")
+    return CSVValidationError(f"Invalid CSV file: {error}")
+
+
+def validate_csv_frame(df: pd.DataFrame) -> None:
+    """Check the header of a parsed CSV and that it has rows.
+
+    Called on the whole frame, or on the first chunk of a chunked read so a
+    bad upload is rejected before the rest of it is parsed. Raises
+    ``CSVValidationError``.
+    """
+    if len(df.columns) == 0:
+        raise CSVValidationError("CSV file has no columns")
+    if df.empty:
+        raise CSVValidationError("CSV file is empty")
+    if len(df.columns) == 1:
+        for delimiter, name in FOREIGN_DELIMITERS.items():
+            if delimiter in str(df.columns[0]):
+                raise CSVValidationError(
+                    f"CSV file appears to be separated by {name}; only comma-separated files are supported"
+                )
+
+def json_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Rows as JSON-safe records, with missing values as ``None``."""
+    return df.astype(object).where(df.notnull(), None).to_dict('records')
+
+def get_dataframe_preview(
+    df: pd.DataFrame,
+    max_rows: int = 10,
+    column_info: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Get a preview of the dataframe for display.
 
-def get_dataframe_preview(df: pd.DataFrame, max_rows: int = 10) -> Dict[str, Any]:
-    """Get a preview of the dataframe for display."""
+    Pass the dataset's stored ``column_info`` to avoid profiling ``df`` again.
+    """
     preview = {
-        'head': df.head(max_rows).to_dict('records'),
-        'tail': df.tail(max_rows).to_dict('records'),
+        'head': json_records(df.head(max_rows)),
+        'tail': json_records(df.tail(max_rows)),
         'shape': df.shape,
         'columns': list(df.columns),
-        'dtypes': df.dtypes.to_dict(),
-        'info': get_column_info(df)
+        'dtypes': {column: str(dtype) for column, dtype in df.dtypes.items()},
+        'info': column_info if column_info is not None else get_column_info(df)
     }
     
-    return preview 
\ No newline at end of file
+    return preview
\ No newline at end of file
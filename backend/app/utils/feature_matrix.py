@@ -0,0 +1,208 @@
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.utils.columnar import cleaned_columns, cleaned_path_for, read_cleaned_frame
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; concurrent builders then duplicate work
+    fcntl = None
+
+# Bump when the encoding changes so columns written by older code are rebuilt
+FEATURE_MATRIX_VERSION = 2
+
+
+def feature_column_path_for(file_path: str, index: int) -> str:
+    """Path of one encoded column (by position in the cleaned copy) of the
+    feature matrix stored next to a dataset file."""
+    return f"{os.path.splitext(file_path)[0]}.features.v{FEATURE_MATRIX_VERSION}.{index}.npy"
+
+
+def _meta_path(column_path: str) -> str:
+    return os.path.splitext(column_path)[0] + ".json"
+
+
+def _replace_atomically(path: str, write) -> None:
+    # Concurrent builders each write their own file; the last rename wins
+    # and readers only ever see a complete file
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+@contextmanager
+def _build_lock(file_path: str) -> Iterator[None]:
+    """Serialize feature matrix builds of one dataset across processes."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{os.path.splitext(file_path)[0]}.features.v{FEATURE_MATRIX_VERSION}.lock", 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class FeatureMatrix:
+    """Read-only, memory-mapped view of a dataset's encoded rows.
+
+    Every column is stored as float64 in its own file: numbers and
+    booleans as their values, other columns as the codes ``LabelEncoder``
+    would give their text (the sorted ``classes`` are kept alongside).
+    Selecting columns touches only their pages, and every process training
+    on the dataset shares the same page cache instead of parsing its own
+    copy.
+    """
+
+    def __init__(
+        self,
+        arrays: Dict[str, np.ndarray],
+        metas: Dict[str, Dict[str, Any]],
+        columns: Optional[List[str]] = None,
+        dtype: Any = np.float64
+    ):
+        self.arrays = arrays
+        self.metas = metas
+        self.columns = list(columns if columns is not None else arrays)
+        self.dtype = dtype
+
+    def select(self, columns: Optional[List[str]] = None, float32: bool = False) -> 'FeatureMatrix':
+        """The same matrix limited to ``columns``, read as float32 if asked."""
+        return FeatureMatrix(self.arrays, self.metas, columns, np.float32 if float32 else np.float64)
+
+    @property
+    def classes(self) -> Dict[str, List[str]]:
+        """Sorted text values of each encoded (non-numeric) column."""
+        return {column: meta['classes'] for column, meta in self.metas.items() if 'classes' in meta}
+
+    def is_numeric(self, column: str, include_bool: bool = True) -> bool:
+        """Whether a column holds numbers rather than codes; booleans count
+        unless ``include_bool`` is off (as ``select_dtypes(np.number)``)."""
+        meta = self.metas[column]
+        if 'classes' in meta:
+            return False
+        return np.dtype(meta['dtype']).kind in ('iufb' if include_bool else 'iuf')
+
+    def take(self, columns: List[str]) -> pd.DataFrame:
+        """Encoded columns as a feature frame (a copy of just those columns)."""
+        return pd.DataFrame(
+            {column: self.arrays[column].astype(self.dtype, copy=False) for column in columns},
+            columns=columns
+        )
+
+    def decoded(self, column: str) -> np.ndarray:
+        """A column's original values: text for encoded columns, numbers in
+        their stored dtype otherwise (floats narrowed to float32 if asked)."""
+        values, meta = self.arrays[column], self.metas[column]
+        if 'classes' in meta:
+            return np.asarray(meta['classes'], dtype=object)[values.astype(np.intp)]
+        dtype = meta['dtype']
+        if dtype == 'float64':
+            dtype = self.dtype
+        return values.astype(dtype)
+
+
+def _write_feature_column(series: pd.Series, file_path: str, index: int) -> None:
+    """Encode one cleaned column into its feature matrix file."""
+    path = feature_column_path_for(file_path, index)
+    meta = {
+        'version': FEATURE_MATRIX_VERSION,
+        'source': os.path.basename(cleaned_path_for(file_path)),
+        'row_count': len(series),
+        'column': series.name,
+        'dtype': str(series.dtype)
+    }
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy(dtype=np.float64)
+    else:
+        codes, uniques = pd.factorize(series.astype(str), sort=True)
+        values = codes.astype(np.float64)
+        meta['classes'] = uniques.tolist()
+
+    def write_meta(temp_path: str) -> None:
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+
+    # The column goes first; a column without current metadata is never read
+    def write_values(temp_path: str) -> None:
+        with open(temp_path, 'wb') as f:
+            np.save(f, values, allow_pickle=False)
+
+    _replace_atomically(path, write_values)
+    _replace_atomically(_meta_path(path), write_meta)
+
+
+def _load_feature_column(file_path: str, index: int, column: str, row_count: int):
+    """Map one encoded column read-only, or ``None`` if it was not built
+    yet or was built from other rows (before an append, or from an older
+    cleaned copy)."""
+    path = feature_column_path_for(file_path, index)
+    try:
+        with open(_meta_path(path)) as f:
+            meta = json.load(f)
+        values = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if meta.get('source') != os.path.basename(cleaned_path_for(file_path)) or meta.get('column') != column or \
+            meta.get('row_count') != row_count or values.shape != (row_count,):
+        return None
+    return values, meta
+
+
+def load_feature_matrix(
+    file_path: str,
+    cleaned_path: Optional[str],
+    row_count: int,
+    columns: Optional[List[str]] = None
+) -> Optional[FeatureMatrix]:
+    """Map the feature matrix of ``columns`` (all by default) of a dataset.
+
+    Columns not encoded yet are built one at a time from the projected
+    cleaned copy, so memory is bounded by a single column and unrequested
+    columns are never read. Builds of one dataset are serialized so
+    concurrent jobs do not encode the same column twice. Returns ``None``
+    when there is no current cleaned copy holding ``columns`` to encode.
+    """
+    all_columns = cleaned_columns(file_path, cleaned_path)
+    if all_columns is None:
+        return None
+    positions = {column: i for i, column in enumerate(all_columns)}
+    columns = list(columns if columns is not None else all_columns)
+    if any(column not in positions for column in columns):
+        return None
+
+    arrays, metas, missing = {}, {}, []
+    for column in columns:
+        loaded = _load_feature_column(file_path, positions[column], column, row_count)
+        if loaded is None:
+            missing.append(column)
+        else:
+            arrays[column], metas[column] = loaded
+
+    if missing:
+        with _build_lock(file_path):
+            for column in missing:
+                # Another job may have built it while this one waited
+                loaded = _load_feature_column(file_path, positions[column], column, row_count)
+                if loaded is None:
+                    series = read_cleaned_frame(file_path, cleaned_path, [column])[column]
+                    if len(series) != row_count:
+                        return None
+                    _write_feature_column(series, file_path, positions[column])
+                    del series
+                    loaded = _load_feature_column(file_path, positions[column], column, row_count)
+                    if loaded is None:
+                        return None
+                arrays[column], metas[column] = loaded
+    return FeatureMatrix({column: arrays[column] for column in columns}, metas)
@@ -0,0 +1,142 @@
+import pandas as pd
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+# Text columns with at most this share of distinct values become ``category``
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+INTEGER_DTYPES = ['int8', 'int16', 'int32', 'int64']
+
+
+def smallest_int_dtype(min_value: float, max_value: float) -> str:
+    """Narrowest signed integer dtype holding ``[min_value, max_value]``."""
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= min_value and max_value <= info.max:
+            return dtype
+    return 'int64'
+
+
+def plan_dtype(
+    dtype: str,
+    row_count: int,
+    unique_count: Optional[int] = None,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None
+) -> str:
+    """Smallest dtype that holds a column without losing information.
+
+    Integers are narrowed to the range they use and low-cardinality text
+    becomes ``category``. Floats keep float64; narrowing them is lossy and
+    only done on request (see ``optimize_dtypes``).
+    """
+    if dtype == 'int64' and min_value is not None:
+        return smallest_int_dtype(min_value, max_value)
+    if dtype == 'object' and unique_count is not None and row_count and \
+            unique_count <= row_count * CATEGORY_MAX_UNIQUE_RATIO:
+        return 'category'
+    return dtype
+
+
+def planned_memory_bytes(dtype: str, row_count: int, categories: Optional[pd.Index] = None) -> int:
+    """Bytes a column of a fixed-width or ``category`` dtype will take."""
+    if dtype == 'category':
+        codes = np.dtype(smallest_int_dtype(-1, len(categories)))
+        return codes.itemsize * row_count + int(categories.memory_usage(deep=True))
+    return np.dtype(dtype).itemsize * row_count
+
+
+def series_dtype_plan(
+    series: pd.Series,
+    planned: Optional[str] = None,
+    unique_count: Optional[int] = None
+) -> str:
+    """Compact dtype for ``series``: ``planned`` when given and still
+    applicable, otherwise planned from its own values (see ``plan_dtype``).
+    Pass ``unique_count`` when it is already known to skip counting the
+    distinct values of text columns."""
+    if planned in INTEGER_DTYPES and series.dtype.kind != 'i':
+        # Planned from raw integers that cleaning has since made float
+        # (capped at a fractional bound); casting back would truncate
+        planned = None
+    if planned is not None:
+        return planned
+    current = str(series.dtype)
+    if current == 'int64' and len(series):
+        return plan_dtype(current, len(series), min_value=series.min(), max_value=series.max())
+    if current == 'object':
+        if unique_count is None:
+            unique_count = series.nunique()
+        return plan_dtype(current, len(series), unique_count=unique_count)
+    return current
+
+
+def optimize_dtypes(
+    df: pd.DataFrame,
+    float32: bool = False,
+    dtypes: Optional[Dict[str, str]] = None
+) -> Tuple[pd.DataFrame, Dict[str, Dict[str, Any]]]:
+    """Downcast ``df`` to compact dtypes and report the memory saved.
+
+    ``dtypes`` maps columns to dtypes already planned at ingest, which skips
+    re-scanning them; other columns are planned from their own values.
+    ``float32`` additionally narrows floats, which suits model training.
+    Returns the new frame and, per column, the dtype used with its memory
+    before and after.
+    """
+    optimized = {}
+    report = {}
+    for column in df.columns:
+        series = df[column]
+        current = str(series.dtype)
+        target = series_dtype_plan(series, (dtypes or {}).get(column))
+        if float32 and target == 'float64':
+            target = 'float32'
+
+        before = int(series.memory_usage(deep=True, index=False))
+        if target != current:
+            try:
+                series = series.astype(target)
+            except (ValueError, TypeError, OverflowError):
+                target = current
+        optimized[column] = series
+        report[column] = {
+            'memory_dtype': target,
+            'memory_bytes_before': before,
+            'memory_bytes_after': int(series.memory_usage(deep=True, index=False))
+        }
+
+    return pd.DataFrame(optimized, index=df.index), report
+
+
+def memory_report(df: pd.DataFrame, unique_counts: Optional[pd.Series] = None) -> Dict[str, Dict[str, Any]]:
+    """Per-column ``optimize_dtypes`` report, worked out from each column's
+    plan instead of converting it, so no copy of ``df`` is made.
+    ``unique_counts`` holds distinct counts already computed per column."""
+    report = {}
+    for column in df.columns:
+        series = df[column]
+        unique_count = unique_counts.get(column) if unique_counts is not None else None
+        target = series_dtype_plan(series, unique_count=unique_count)
+        before = int(series.memory_usage(deep=True, index=False))
+        if target == str(series.dtype):
+            after = before
+        elif target == 'category':
+            after = planned_memory_bytes('category', len(series), pd.Index(series.dropna().unique()))
+        else:
+            after = planned_memory_bytes(target, len(series))
+        report[column] = {
+            'memory_dtype': target,
+            'memory_bytes_before': before,
+            'memory_bytes_after': after
+        }
+    return report
+
+
+def planned_dtypes(column_info: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Compact dtypes recorded in a dataset's ``column_info`` at ingest."""
+    return {
+        column: info['memory_dtype']
+        for column, info in (column_info or {}).items()
+        if 'memory_dtype' in info
+    }
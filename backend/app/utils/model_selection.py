@@ -0,0 +1,623 @@
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+from sklearn.base import clone
+from sklearn.metrics import (
+    accuracy_score, balanced_accuracy_score, f1_score, mean_squared_error, r2_score, roc_auc_score
+)
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+# The estimators and preprocessing LazyPredict sweeps, so auto mode keeps
+# choosing from the same candidates
+from lazypredict.Supervised import CLASSIFIERS, REGRESSORS, adjusted_rsquared, numeric_transformer
+
+AUTO_STRATEGIES = ['halving', 'full']
+
+# Score that ranks the candidates of each task (higher is better)
+RANKING_METRICS = {
+    'classification': 'balanced_accuracy',
+    'regression': 'adjusted_r2'
+}
+
+DATA_ARRAYS = ['X_train', 'X_test', 'y_train', 'y_test']
+
+# How often the workers' memory is sampled while they fit
+MEMORY_POLL_SECONDS = 0.5
+
+# Rough cost of fitting each candidate on n rows of d features, as a weight
+# and the power of n its time grows with (time ~ weight * n ** power * d),
+# and how many n x n float64 matrices it holds in memory. Only the order
+# matters; unlisted candidates are costed like one decision tree.
+COST_MODELS = {
+    'DummyClassifier': (0.01, 1, 0), 'DummyRegressor': (0.01, 1, 0),
+    # Closed-form and single-pass linear models
+    'BernoulliNB': (1, 1, 0), 'CategoricalNB': (1, 1, 0), 'GaussianNB': (1, 1, 0),
+    'NearestCentroid': (1, 1, 0), 'LinearDiscriminantAnalysis': (2, 1, 0),
+    'QuadraticDiscriminantAnalysis': (2, 1, 0), 'RidgeClassifier': (2, 1, 0), 'Ridge': (2, 1, 0),
+    'LinearRegression': (2, 1, 0), 'BayesianRidge': (3, 1, 0), 'Lars': (3, 1, 0), 'LassoLars': (3, 1, 0),
+    'OrthogonalMatchingPursuit': (3, 1, 0), 'TransformedTargetRegressor': (2, 1, 0),
+    # Iterative linear models
+    'Perceptron': (5, 1, 0), 'PassiveAggressiveClassifier': (5, 1, 0), 'PassiveAggressiveRegressor': (5, 1, 0),
+    'SGDClassifier': (5, 1, 0), 'SGDRegressor': (5, 1, 0), 'Lasso': (5, 1, 0), 'ElasticNet': (5, 1, 0),
+    'LogisticRegression': (10, 1, 0), 'LinearSVC': (10, 1, 0), 'LinearSVR': (10, 1, 0),
+    'HuberRegressor': (10, 1, 0), 'GammaRegressor': (10, 1, 0), 'PoissonRegressor': (10, 1, 0),
+    'TweedieRegressor': (10, 1, 0),
+    # Cross-validated linear models refit once per fold and setting
+    'RidgeClassifierCV': (5, 1, 0), 'RidgeCV': (5, 1, 0), 'LassoLarsIC': (5, 1, 0),
+    'LarsCV': (15, 1, 0), 'LassoLarsCV': (15, 1, 0), 'OrthogonalMatchingPursuitCV': (15, 1, 0),
+    'CalibratedClassifierCV': (50, 1, 0), 'LassoCV': (50, 1, 0), 'ElasticNetCV': (200, 1, 0),
+    'RANSACRegressor': (100, 1, 0),
+    # Trees and ensembles of them
+    'DecisionTreeClassifier': (20, 1, 0), 'DecisionTreeRegressor': (20, 1, 0),
+    'ExtraTreeClassifier': (5, 1, 0), 'ExtraTreeRegressor': (5, 1, 0),
+    'LGBMClassifier': (50, 1, 0), 'LGBMRegressor': (50, 1, 0),
+    'HistGradientBoostingRegressor': (50, 1, 0),
+    'XGBClassifier': (100, 1, 0), 'XGBRegressor': (100, 1, 0),
+    'BaggingClassifier': (150, 1, 0), 'BaggingRegressor': (150, 1, 0),
+    'AdaBoostClassifier': (200, 1, 0), 'AdaBoostRegressor': (200, 1, 0),
+    'ExtraTreesClassifier': (300, 1, 0), 'ExtraTreesRegressor': (300, 1, 0),
+    'RandomForestClassifier': (1000, 1, 0), 'RandomForestRegressor': (1000, 1, 0),
+    'GradientBoostingRegressor': (1000, 1, 0), 'StackingClassifier': (2000, 1, 0),
+    'MLPRegressor': (2000, 1, 0),
+    # Neighbours defer their work to prediction, against every training row
+    'KNeighborsClassifier': (0.05, 2, 0), 'KNeighborsRegressor': (0.05, 2, 0),
+    # Kernel methods grow with the square or cube of the rows
+    'SVC': (0.01, 2, 0), 'NuSVC': (0.01, 2, 0), 'SVR': (0.01, 2, 0), 'NuSVR': (0.01, 2, 0),
+    'QuantileRegressor': (0.01, 2, 0),
+    'LabelPropagation': (0.01, 2, 2), 'LabelSpreading': (0.01, 2, 2),
+    'KernelRidge': (0.0001, 3, 2), 'GaussianProcessRegressor': (0.0001, 3, 3)
+}
+
+
+def auto_selection_settings() -> Dict[str, Any]:
+    """How auto mode sweeps its candidates.
+
+    ``workers``: processes fitting candidates at once (``AUTO_SELECT_WORKERS``,
+    the CPU count by default). ``timeout``: seconds each fit may take
+    (``AUTO_SELECT_TIMEOUT_SECONDS``). ``strategy``: ``halving`` or ``full``
+    (``AUTO_SELECT_STRATEGY``). ``min_rows`` and ``factor``: rows of the
+    first successive-halving round and the factor rounds grow (and the
+    candidates shrink) by (``AUTO_SELECT_MIN_ROWS``,
+    ``AUTO_SELECT_HALVING_FACTOR``). ``final_timeout``: seconds the
+    successive-halving winner's fit on all rows may take
+    (``AUTO_SELECT_FINAL_TIMEOUT_SECONDS``).
+    """
+    workers = os.getenv("AUTO_SELECT_WORKERS")
+    return {
+        'workers': max(1, int(workers) if workers else (os.cpu_count() or 1)),
+        'timeout': float(os.getenv("AUTO_SELECT_TIMEOUT_SECONDS", 300)),
+        'strategy': os.getenv("AUTO_SELECT_STRATEGY", "halving").lower(),
+        'min_rows': max(1, int(os.getenv("AUTO_SELECT_MIN_ROWS", 2000))),
+        'factor': max(2, int(os.getenv("AUTO_SELECT_HALVING_FACTOR", 3))),
+        'final_timeout': float(os.getenv("AUTO_SELECT_FINAL_TIMEOUT_SECONDS", 3600))
+    }
+
+
+def candidate_estimators(task_type: str) -> List[Tuple[str, type]]:
+    """Named estimator classes auto mode tries for a task."""
+    return list(CLASSIFIERS if task_type == 'classification' else REGRESSORS)
+
+
+def candidate_pipeline(estimator: type, task_type: str) -> Pipeline:
+    """The pipeline LazyPredict fits for an estimator class."""
+    if 'random_state' in estimator().get_params():
+        model = estimator(random_state=42)
+    else:
+        model = estimator()
+    step = 'classifier' if task_type == 'classification' else 'regressor'
+    return Pipeline(steps=[('preprocessor', clone(numeric_transformer)), (step, model)])
+
+
+def estimated_cost(name: str, rows: int, features: int) -> float:
+    """Relative cost of fitting a candidate, for ordering them (see ``COST_MODELS``)."""
+    weight, power, _ = COST_MODELS.get(name, (20, 1, 0))
+    return weight * float(rows) ** power * max(1, features)
+
+
+def estimated_memory_mb(name: str, rows: int, features: int) -> float:
+    """Rough memory a candidate's fit needs beyond its worker's idle
+    footprint: a few copies of the rows plus any n x n matrices it holds."""
+    _, _, matrices = COST_MODELS.get(name, (20, 1, 0))
+    return (3 * rows * max(1, features) + matrices * float(rows) ** 2) * 8 / 2 ** 20
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    # Resident memory of a process, where /proc is available
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _reset_peak_rss() -> None:
+    # Restart this process's high-water mark (VmHWM) from its current size
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _finite(value: Optional[float]) -> Optional[float]:
+    # Leaderboards are stored and served as JSON, which has no NaN
+    return float(value) if value is not None and math.isfinite(value) else None
+
+
+def _scores(task_type: str, X_test: np.ndarray, y_test: np.ndarray, y_pred: np.ndarray) -> Dict[str, Any]:
+    if task_type == 'classification':
+        try:
+            roc_auc = roc_auc_score(y_test, y_pred)
+        except ValueError:
+            roc_auc = None
+        return {
+            'accuracy': _finite(accuracy_score(y_test, y_pred)),
+            'balanced_accuracy': _finite(balanced_accuracy_score(y_test, y_pred)),
+            'roc_auc': _finite(roc_auc),
+            'f1_score': _finite(f1_score(y_test, y_pred, average='weighted'))
+        }
+    r2 = r2_score(y_test, y_pred)
+    return {
+        'adjusted_r2': _finite(adjusted_rsquared(r2, X_test.shape[0], X_test.shape[1])),
+        'r2_score': _finite(r2),
+        'rmse': _finite(np.sqrt(mean_squared_error(y_test, y_pred)))
+    }
+
+
+def _selection_worker(conn, data_dir: str, task_type: str) -> None:
+    """Fit the candidates sent over ``conn`` one at a time, keeping the
+    fitted pipelines and their test predictions until the parent asks for
+    one or hangs up."""
+    # One core per worker; parallelism comes from the number of workers
+    threadpool_limits(1)
+    # Copy-on-write maps: every worker shares the parent's arrays in the
+    # page cache, and estimators that write to their input still can
+    data = {name: np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode='c') for name in DATA_ARRAYS}
+    fitted = {}
+    conn.send(('ready',))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message[0] == 'fit':
+            _, name, estimator, train_rows, test_rows = message
+            X_train, y_train = data['X_train'], data['y_train']
+            if train_rows is not None:
+                X_train, y_train = X_train[train_rows], y_train[train_rows]
+            X_test, y_test = data['X_test'], data['y_test']
+            if test_rows is not None:
+                X_test, y_test = X_test[test_rows], y_test[test_rows]
+            rss_before = _rss_mb(os.getpid())
+            _reset_peak_rss()
+            start = time.perf_counter()
+            try:
+                pipe = candidate_pipeline(estimator, task_type)
+                pipe.fit(X_train, y_train)
+                fit_time = time.perf_counter() - start
+                y_pred = pipe.predict(X_test)
+                result = {'status': 'ok', 'fit_time': fit_time, **_scores(task_type, X_test, y_test, y_pred)}
+                fitted[name] = (pipe, y_pred)
+            except Exception as e:
+                result = {'status': 'failed', 'fit_time': time.perf_counter() - start, 'error': str(e)}
+            peak = _peak_rss_mb()
+            result['peak_memory_mb'] = round(max(0.0, peak - rss_before), 1) \
+                if peak is not None and rss_before is not None else None
+            conn.send(('done', name, result))
+        elif message[0] == 'model':
+            conn.send(('model', fitted.get(message[1])))
+        elif message[0] == 'forget':
+            fitted.pop(message[1], None)
+        else:
+            return
+
+
+class _Worker:
+    def __init__(self, context, data_dir: str, task_type: str):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_selection_worker, args=(child_conn, data_dir, task_type), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.task: Optional[Tuple[str, type]] = None
+        self.started = 0.0
+        self.deadline = math.inf
+        # Resident memory once started, before any fit
+        self.idle_mb: Optional[float] = None
+
+    def stop(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class _CandidatePool:
+    """Worker processes fitting candidates on the arrays saved in ``data_dir``."""
+
+    def __init__(self, context, data_dir: str, task_type: str, size: int):
+        self.context = context
+        self.data_dir = data_dir
+        self.task_type = task_type
+        self.workers = [self._start() for _ in range(size)]
+        # Worker holding each candidate's latest fitted pipeline
+        self.owners: Dict[str, _Worker] = {}
+        # Most memory the workers were seen using beyond their idle footprint
+        self.peak_memory_mb = 0.0
+
+    def _start(self) -> _Worker:
+        return _Worker(self.context, self.data_dir, self.task_type)
+
+    def _replace(self, worker: _Worker) -> None:
+        worker.stop()
+        self.workers[self.workers.index(worker)] = self._start()
+
+    def run(
+        self,
+        candidates: List[Tuple[str, type]],
+        train_rows: Optional[np.ndarray],
+        test_rows: Optional[np.ndarray],
+        timeout: Optional[float],
+        deadline: Optional[float] = None,
+        max_memory_mb: Optional[float] = None,
+        keep: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fit and score the candidates in order on the given rows (all if
+        ``None``), killing any still fitting after ``timeout`` seconds.
+        Workers hold on to the pipelines of the best ``keep`` so far (all
+        if ``None``) and free the rest.
+
+        At ``deadline`` (a ``time.monotonic()`` value) fits still running
+        are killed and candidates not yet started are skipped. While the
+        workers use more than ``max_memory_mb`` beyond their idle footprint,
+        the fit that grew the most is killed.
+        """
+        pending = deque(candidates)
+        results: Dict[str, Dict[str, Any]] = {}
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                while pending:
+                    results[pending.popleft()[0]] = {
+                        'status': 'skipped', 'fit_time': None, 'error': "Time budget used up"
+                    }
+            for worker in self.workers:
+                if worker.ready and worker.task is None and pending:
+                    worker.task = pending.popleft()
+                    worker.started = time.monotonic()
+                    worker.deadline = min(
+                        worker.started + timeout if timeout else math.inf,
+                        deadline if deadline is not None else math.inf
+                    )
+                    worker.conn.send(('fit', *worker.task, train_rows, test_rows))
+            if not pending and all(worker.task is None for worker in self.workers):
+                break
+
+            next_deadline = min(worker.deadline for worker in self.workers)
+            if deadline is not None:
+                # Idle workers still starting up must not outlast the budget
+                next_deadline = min(next_deadline, deadline)
+            wait_for = MEMORY_POLL_SECONDS
+            if next_deadline < math.inf:
+                wait_for = min(wait_for, max(0.0, next_deadline - time.monotonic()))
+            for conn in wait([worker.conn for worker in self.workers], wait_for):
+                worker = next(worker for worker in self.workers if worker.conn is conn)
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    if not worker.ready:
+                        raise RuntimeError(
+                            f"Model selection worker exited with code {worker.process.exitcode} on startup"
+                        )
+                    # The worker died (e.g. out of memory) mid-fit
+                    if worker.task is not None:
+                        results[worker.task[0]] = {
+                            'status': 'failed',
+                            'fit_time': None,
+                            'error': f"Worker exited with code {worker.process.exitcode}"
+                        }
+                    self._replace(worker)
+                    continue
+                if message[0] == 'ready':
+                    worker.ready = True
+                    worker.idle_mb = _rss_mb(worker.process.pid)
+                else:
+                    _, name, result = message
+                    results[name] = result
+                    if result['status'] == 'ok':
+                        # A pipeline from an earlier round is superseded
+                        self._forget(name)
+                        self.owners[name] = worker
+                        if keep is not None:
+                            for dropped in _ranked(results, self.task_type)[keep:]:
+                                self._forget(dropped)
+                    worker.task = None
+                    worker.deadline = math.inf
+
+            used = self._memory_used_mb()
+            self.peak_memory_mb = max(self.peak_memory_mb, sum(used.values()))
+            if max_memory_mb is not None and sum(used.values()) > max_memory_mb:
+                busy = [worker for worker in self.workers if worker.task is not None]
+                if busy:
+                    worker = max(busy, key=lambda worker: used.get(worker, 0.0))
+                    results[worker.task[0]] = {
+                        'status': 'failed',
+                        'fit_time': time.monotonic() - worker.started,
+                        'error': f"Exceeded the memory budget of {max_memory_mb:g} MB"
+                    }
+                    self._replace(worker)
+
+            now = time.monotonic()
+            for worker in list(self.workers):
+                if worker.task is not None and worker.deadline <= now:
+                    if deadline is not None and worker.deadline >= deadline:
+                        result = {
+                            'status': 'timeout', 'fit_time': now - worker.started, 'error': "Time budget used up"
+                        }
+                    else:
+                        result = {'status': 'timeout', 'fit_time': timeout}
+                    results[worker.task[0]] = result
+                    self._replace(worker)
+        return results
+
+    def _memory_used_mb(self) -> Dict[_Worker, float]:
+        # Memory of each worker beyond its idle footprint
+        used = {}
+        for worker in self.workers:
+            rss = _rss_mb(worker.process.pid) if worker.idle_mb is not None else None
+            if rss is not None:
+                used[worker] = max(0.0, rss - worker.idle_mb)
+        return used
+
+    def _forget(self, name: str) -> None:
+        owner = self.owners.pop(name, None)
+        if owner is not None and owner in self.workers:
+            owner.conn.send(('forget', name))
+
+    def fetch(self, name: str, timeout: Optional[float] = None) -> Optional[Tuple[Any, np.ndarray]]:
+        """A candidate's pipeline and test predictions, or ``None`` if its
+        worker has since been replaced, dies or takes more than ``timeout``
+        seconds to send them (it is then replaced)."""
+        owner = self.owners.pop(name, None)
+        if owner is None or owner not in self.workers:
+            return None
+        try:
+            owner.conn.send(('model', name))
+            if owner.conn.poll(timeout):
+                return owner.conn.recv()[1]
+        except (EOFError, OSError):
+            pass
+        self._replace(owner)
+        return None
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.stop()
+
+
+def _ranked(results: Dict[str, Dict[str, Any]], task_type: str) -> List[str]:
+    """Candidates that were scored, best first; ties keep candidate order
+    (not the order the fits finished in)."""
+    ranking = RANKING_METRICS[task_type]
+    order = {name: i for i, (name, _) in enumerate(candidate_estimators(task_type))}
+    scored = [name for name, result in results.items() if result['status'] == 'ok']
+    return sorted(scored, key=lambda name: (
+        -(results[name][ranking] if results[name][ranking] is not None else -math.inf),
+        order.get(name, len(order))
+    ))
+
+
+def halving_rungs(rows: int, candidates: int, min_rows: int, factor: int) -> List[int]:
+    """Training rows of each successive-halving round, ending with all of them.
+
+    Rounds grow by ``factor`` (as the candidates shrink by it) from at
+    least ``min_rows``, and there are just enough to whittle the
+    candidates down to one; small datasets get a single round.
+    """
+    needed = 1
+    while factor ** (needed - 1) < candidates:
+        needed += 1
+    rungs = [rows]
+    while len(rungs) < needed and rungs[0] // factor >= min_rows:
+        rungs.insert(0, rungs[0] // factor)
+    return rungs
+
+
+def _subsample(y: np.ndarray, size: int, stratify: bool) -> Optional[np.ndarray]:
+    """Row positions of a random sample of ``size`` rows (``None`` for all),
+    with the classes in their original proportions when ``stratify`` is set."""
+    if size >= len(y):
+        return None
+    positions = np.arange(len(y))
+    if stratify:
+        try:
+            rows, _ = train_test_split(positions, train_size=size, stratify=y, random_state=42)
+            return np.sort(rows)
+        except ValueError:
+            # Classes too rare to split proportionally
+            pass
+    return np.sort(np.random.default_rng(42).choice(positions, size, replace=False))
+
+
+def select_model(
+    X_train: np.ndarray,
+    X_test: np.ndarray,
+    y_train: np.ndarray,
+    y_test: np.ndarray,
+    task_type: str,
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    strategy: Optional[str] = None,
+    time_budget: Optional[float] = None,
+    max_memory_mb: Optional[float] = None
+) -> Tuple[str, Any, np.ndarray, List[Dict[str, Any]], Dict[str, Any]]:
+    """Fit the auto-mode candidates in parallel and pick the best.
+
+    Candidates are fitted by ``workers`` processes, each limited to one
+    core, cheapest first (see ``estimated_cost``). A candidate still
+    fitting after ``timeout`` seconds has its worker killed (and replaced)
+    and is recorded as timed out, so one slow estimator cannot stall the
+    sweep.
+
+    The ``full`` strategy fits every candidate on all the training rows.
+    ``halving`` (successive halving) scores them all on a small subsample
+    (stratified for classification), keeps the best ``1 / factor`` and
+    repeats on ``factor`` times more rows until the winner is trained on
+    all of them; that last fit has a longer timeout (``final_timeout``), and
+    if it fails the best of the previous round wins. See
+    ``auto_selection_settings``.
+
+    ``time_budget`` caps the whole selection in seconds: once it is used
+    up no more fits start, running ones are killed, and the best of the
+    largest round any candidate finished wins, even if that round was on
+    a subsample. ``max_memory_mb`` caps the memory the fits use beyond the
+    workers' idle footprint: candidates estimated to need more are skipped
+    (see ``estimated_memory_mb``) and a fit pushing the workers past it is
+    killed.
+
+    Returns the best candidate's name, its fitted pipeline, its predictions
+    for ``X_test``, the leaderboard and the resources used. The leaderboard
+    lists every candidate with the scores and ``rows`` of the largest round
+    it reached, its ``fit_time`` in seconds and ``peak_memory_mb`` there and
+    ``status`` (``ok``, ``failed``, ``timeout`` or ``skipped``), best first.
+    The resources are the ``elapsed_seconds``, the workers' sampled
+    ``peak_memory_mb`` beyond their idle footprint, the budgets, whether
+    the time budget ran out (``budget_exhausted``) and the ``rows`` the
+    best candidate was trained on.
+    """
+    settings = auto_selection_settings()
+    workers = workers or settings['workers']
+    timeout = timeout or settings['timeout']
+    strategy = strategy or settings['strategy']
+    if strategy not in AUTO_STRATEGIES:
+        raise ValueError(f"Unknown auto strategy {strategy!r}; expected one of {', '.join(AUTO_STRATEGIES)}")
+    started = time.monotonic()
+    deadline = started + time_budget if time_budget else None
+    candidates = candidate_estimators(task_type)
+    ranking = RANKING_METRICS[task_type]
+    classification = task_type == 'classification'
+    y_train = np.asarray(y_train)
+    y_test = np.asarray(y_test)
+    features = X_train.shape[1] if np.ndim(X_train) > 1 else 1
+
+    if strategy == 'halving':
+        rungs = halving_rungs(len(y_train), len(candidates), settings['min_rows'], settings['factor'])
+    else:
+        rungs = [len(y_train)]
+
+    with tempfile.TemporaryDirectory(prefix="insightai-select-") as data_dir:
+        arrays = dict(zip(DATA_ARRAYS, (X_train, X_test, y_train, y_test)))
+        for name, array in arrays.items():
+            np.save(os.path.join(data_dir, f"{name}.npy"), np.asarray(array))
+
+        context = multiprocessing.get_context("spawn")
+        pool = _CandidatePool(context, data_dir, task_type, min(workers, len(candidates)))
+        try:
+            reached: Dict[str, Dict[str, Any]] = {}
+            # Best candidate so far, with the rows of the round it won
+            best_name, best_rows, best_train_rows, best_test_rows = None, 0, None, None
+            budget_exhausted = False
+            survivors = candidates
+            for i, rows in enumerate(rungs):
+                final = i == len(rungs) - 1 or len(survivors) == 1
+                if final:
+                    rows = len(y_train)
+                # Test rows shrink in step, keeping the original split ratio
+                test_size = len(y_test) if final else max(1, math.ceil(rows * len(y_test) / len(y_train)))
+                train_rows = _subsample(y_train, rows, classification)
+                test_rows = _subsample(y_test, test_size, classification)
+
+                results = {}
+                fits = sorted(survivors, key=lambda candidate: estimated_cost(candidate[0], rows, features))
+                if max_memory_mb is not None:
+                    for name, _ in fits:
+                        needed = estimated_memory_mb(name, rows, features)
+                        if needed > max_memory_mb:
+                            results[name] = {
+                                'status': 'skipped',
+                                'fit_time': None,
+                                'error': f"Estimated to need {needed:.0f} MB, over the memory budget"
+                            }
+                    fits = [candidate for candidate in fits if candidate[0] not in results]
+                # Only pipelines that can still win are kept: the next
+                # round's survivors, or the winner
+                keep = 1 if final else max(1, math.ceil(len(fits) / settings['factor']))
+                results.update(pool.run(
+                    fits, train_rows, test_rows,
+                    # A halving winner's fit on all rows gets longer
+                    settings['final_timeout'] if final and len(rungs) > 1 else timeout,
+                    deadline, max_memory_mb, keep
+                ))
+                for name, result in results.items():
+                    # A candidate the budget skipped keeps the round it last finished
+                    if result['status'] != 'skipped' or name not in reached:
+                        reached[name] = {'rows': rows, **result}
+                ranked = _ranked(results, task_type)
+                if ranked:
+                    best_name, best_rows, best_train_rows, best_test_rows = ranked[0], rows, train_rows, test_rows
+                budget_exhausted = deadline is not None and time.monotonic() >= deadline
+                if final or not ranked or budget_exhausted:
+                    break
+                keep = set(ranked[:max(1, math.ceil(len(ranked) / settings['factor']))])
+                survivors = [candidate for candidate in survivors if candidate[0] in keep]
+
+            if best_name is None:
+                raise ValueError("No candidate model could be trained within the budget"
+                                 if time_budget or max_memory_mb else "No candidate model could be trained")
+            leaderboard = sorted(
+                ({'model': name, **reached[name]} for name, _ in candidates),
+                key=lambda row: (
+                    row['status'] != 'ok',
+                    -row['rows'],
+                    -(row.get(ranking) if row.get(ranking) is not None else -math.inf)
+                )
+            )
+
+            fetched = pool.fetch(best_name, timeout)
+            if fetched is not None:
+                best_model, y_pred = fetched
+            else:
+                # Its worker was replaced after a later timeout, or failed to
+                # send the pipeline: fit it again here
+                best_model = candidate_pipeline(dict(candidates)[best_name], task_type)
+                if best_train_rows is None:
+                    best_model.fit(X_train, y_train)
+                else:
+                    best_model.fit(np.asarray(X_train)[best_train_rows], y_train[best_train_rows])
+                y_pred = None
+            if y_pred is None or best_test_rows is not None:
+                # Predictions cached from a round on a subsample of the test rows
+                y_pred = best_model.predict(X_test)
+            usage = {
+                'elapsed_seconds': round(time.monotonic() - started, 3),
+                'peak_memory_mb': round(pool.peak_memory_mb, 1),
+                'time_budget_seconds': time_budget,
+                'max_memory_mb': max_memory_mb,
+                'budget_exhausted': budget_exhausted,
+                'rows': best_rows
+            }
+        finally:
+            pool.close()
+
+    return best_name, best_model, y_pred, leaderboard, usage
@@ -0,0 +1,109 @@
+import pandas as pd
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import socket
+import threading
+
+_executors: Dict[Tuple[str, int], Executor] = {}
+_executors_lock = threading.Lock()
+
+
+def profile_settings() -> Dict[str, Any]:
+    """Parallelism used to profile and clean wide frames.
+
+    ``PROFILE_WORKERS`` defaults to the CPU count; ``PROFILE_EXECUTOR`` is
+    ``thread`` (no copying; numeric kernels release the GIL) or ``process``
+    (each block is pickled to a worker, which also parallelises Python-level
+    work on text columns). Frames narrower than ``PROFILE_MIN_COLUMNS`` are
+    profiled inline since splitting them costs more than it saves.
+    """
+    return {
+        'workers': int(os.getenv("PROFILE_WORKERS") or os.cpu_count() or 1),
+        'executor': os.getenv("PROFILE_EXECUTOR", "thread"),
+        'min_columns': int(os.getenv("PROFILE_MIN_COLUMNS", 64))
+    }
+
+
+def server_token() -> str:
+    """Claim token of this server process (host and pid), recorded on the
+    jobs and files it works on."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claimant_alive(claim: Optional[str]) -> bool:
+    """Whether the server that took ``claim`` may still be running.
+
+    Servers on other hosts cannot be checked and count as running; they
+    finish or resume their own work.
+    """
+    if not claim:
+        return False
+    host, _, pid = claim.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+def _get_executor(kind: str, workers: int) -> Executor:
+    with _executors_lock:
+        key = (kind, workers)
+        if key not in _executors:
+            if kind == "process":
+                _executors[key] = ProcessPoolExecutor(max_workers=workers)
+            else:
+                _executors[key] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="profile")
+        return _executors[key]
+
+
+def column_blocks(columns: List[Any], n_blocks: int) -> List[List[Any]]:
+    """Split ``columns`` into at most ``n_blocks`` contiguous, even blocks."""
+    n_blocks = max(1, min(n_blocks, len(columns)))
+    size, extra = divmod(len(columns), n_blocks)
+    blocks, start = [], 0
+    for i in range(n_blocks):
+        end = start + size + (1 if i < extra else 0)
+        blocks.append(columns[start:end])
+        start = end
+    return blocks
+
+
+def map_column_blocks(
+    func: Callable[..., Any],
+    df: pd.DataFrame,
+    workers: Optional[int] = None,
+    column_series: Optional[Dict[str, pd.Series]] = None,
+    **kwargs: Any
+) -> List[Any]:
+    """Apply ``func(block, **kwargs)`` to column blocks of ``df`` in parallel.
+
+    Results come back in column order. ``column_series`` holds Series
+    indexed by column name; each block is passed the slice for its own
+    columns under the same keyword. With the process executor ``func``
+    must be a module-level function.
+    """
+    settings = profile_settings()
+    workers = workers if workers is not None else settings['workers']
+    columns = list(df.columns)
+    if workers <= 1 or len(columns) < settings['min_columns']:
+        blocks = [columns]
+    else:
+        # A few blocks per worker evens out columns of unequal cost
+        blocks = column_blocks(columns, workers * 4)
+
+    def block_kwargs(block: List[Any]) -> Dict[str, Any]:
+        sliced = {name: series[block] for name, series in (column_series or {}).items()}
+        return {**kwargs, **sliced}
+
+    if len(blocks) == 1:
+        return [func(df, **block_kwargs(columns))]
+
+    executor = _get_executor(settings['executor'], workers)
+    futures = [executor.submit(func, df[block], **block_kwargs(block)) for block in blocks]
+    return [future.result() for future in futures]
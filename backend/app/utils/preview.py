@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import io
+import json
+import math
+import os
+
+from app.utils.compression import compression_for
+from app.utils.data_processing import json_records
+
+# Bump when the stored format changes so previews written by older code
+# (e.g. with bare NaN values) are rebuilt on their next request
+PREVIEW_VERSION = 2
+PREVIEW_EXTENSION = f".preview.v{PREVIEW_VERSION}.json"
+PREVIEW_ROWS = 10
+TAIL_BLOCK_SIZE = 64 * 1024
+TAIL_CHUNK_ROWS = 100000
+
+# Spellings the CSV parser turns into booleans
+BOOL_TEXT = {'True': True, 'TRUE': True, 'true': True, 'False': False, 'FALSE': False, 'false': False}
+
+
+def preview_path_for(file_path: str) -> str:
+    """Path of the stored preview kept next to a dataset file."""
+    return os.path.splitext(file_path)[0] + PREVIEW_EXTENSION
+
+
+def preview_etag(content: bytes) -> str:
+    """Strong ETag for a serialized preview."""
+    return '"' + hashlib.sha256(content).hexdigest() + '"'
+
+
+def read_csv_tail(file_path: str, n: int, dtype: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Parse the last ``n`` rows of a CSV by seeking back from its end.
+
+    Blocks are read backwards until ``n`` complete lines are in hand, then
+    parsed together with the header line, so the cost depends on the row
+    width rather than the file length. Files whose tail cannot be parsed
+    this way (e.g. quoted fields with embedded newlines) are read in full,
+    as are compressed files, which cannot be read backwards; both are
+    streamed in chunks keeping only the last ``n`` rows.
+    """
+    if compression_for(file_path) is not None:
+        return _stream_tail(file_path, n, dtype)
+
+    with open(file_path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        tail = b""
+        # One extra line break: the trailing newline, or the cut-off first line
+        while position > data_start and tail.count(b"\n") <= n:
+            step = min(TAIL_BLOCK_SIZE, position - data_start)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+    if position > data_start:
+        # Drop the partial line at the front of the first block read
+        tail = tail[tail.index(b"\n") + 1:]
+
+    try:
+        frame = pd.read_csv(io.BytesIO(header + tail), dtype=dtype)
+        if len(frame.columns) == len(pd.read_csv(io.BytesIO(header), nrows=0).columns):
+            return frame.tail(n).reset_index(drop=True)
+    except (pd.errors.ParserError, ValueError):
+        pass
+    return _stream_tail(file_path, n, dtype)
+
+
+def _stream_tail(file_path: str, n: int, dtype: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    tail = pd.read_csv(file_path, dtype=dtype, nrows=0)
+    for chunk in pd.read_csv(file_path, dtype=dtype, chunksize=max(n, TAIL_CHUNK_ROWS)):
+        tail = chunk if tail.empty else pd.concat([tail, chunk]).tail(n)
+    return tail.tail(n).reset_index(drop=True)
+
+
+def build_preview(
+    file_path: str,
+    shape: Tuple[int, int],
+    column_info: Dict[str, Any],
+    dtypes: Optional[Dict[str, str]] = None,
+    max_rows: int = PREVIEW_ROWS
+) -> Dict[str, Any]:
+    """Preview a stored CSV from its first and last rows only.
+
+    ``dtypes`` (as produced by a full parse) keeps the sampled rows typed
+    the way the whole file is; without it the sample's own inference is used.
+    """
+    read_dtypes = {column: dtype for column, dtype in (dtypes or {}).items() if dtype == 'object'}
+    head = pd.read_csv(file_path, nrows=max_rows, dtype=read_dtypes or None)
+    tail = read_csv_tail(file_path, max_rows, dtype=read_dtypes or None)
+    for frame in (head, tail):
+        for column in read_dtypes:
+            # Text columns were read as text; a full parse still turns a
+            # column of True/False with gaps into booleans
+            values = frame[column].dropna()
+            if len(values) and values.isin(BOOL_TEXT).all():
+                frame[column] = frame[column].map(BOOL_TEXT)
+    if dtypes:
+        head = head.astype(dtypes)
+        tail = tail.astype(dtypes)
+    return {
+        'head': json_records(head),
+        'tail': json_records(tail),
+        'shape': shape,
+        'columns': list(head.columns),
+        'dtypes': {column: str(dtype) for column, dtype in head.dtypes.items()},
+        'info': column_info
+    }
+
+
+def _json_safe(value: Any) -> Any:
+    """``value`` with numpy scalars as Python ones and non-finite floats
+    (NaN, infinities) as ``None``."""
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def serialize_preview(preview: Dict[str, Any]) -> bytes:
+    """Preview as strict JSON: ``json.dumps`` would write non-finite values
+    as bare ``NaN``/``Infinity``, which browsers' JSON parsers reject, so
+    they become ``null``."""
+    return json.dumps(_json_safe(preview), default=str, allow_nan=False).encode("utf-8")
+
+
+def save_preview(file_path: str, preview: Dict[str, Any]) -> bytes:
+    """Store a preview next to the dataset file and return its bytes."""
+    content = serialize_preview(preview)
+    with open(preview_path_for(file_path), "wb") as f:
+        f.write(content)
+    return content
+
+
+def load_preview(file_path: str) -> Optional[bytes]:
+    """Serialized preview stored for a dataset file, if any."""
+    path = preview_path_for(file_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
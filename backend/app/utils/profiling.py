@@ -0,0 +1,964 @@
+import pandas as pd
+import numpy as np
+from typing import Callable, Dict, List, Any, Optional, Set
+from datetime import datetime
+import glob
+import hashlib
+import math
+import os
+import re
+import tempfile
+
+from app.utils.data_processing import (
+    CSV_PARSE_ERRORS, CSVValidationError, csv_parse_error, validate_csv_frame
+)
+from app.utils.columnar import ColumnarWriter, cleaned_path_for, columnar_available
+from app.utils.memory import (
+    CATEGORY_MAX_UNIQUE_RATIO, plan_dtype, planned_memory_bytes, smallest_int_dtype
+)
+from app.utils.correlations import RowSample
+from app.utils.sketches import (
+    HyperLogLog, KLLSketch, TopValues, new_distinct_sketch, distinct_count_settings, quantile_sketch_k
+)
+
+NUMERIC_KINDS = {'i', 'f', 'b'}
+
+ROW_HASHES_PATTERN = re.compile(r"\.rowhashes\.(\d+)\.npy$")
+
+
+def _chunk_kind(series: pd.Series) -> Optional[str]:
+    """Classify a parsed chunk column as int, float, bool or object.
+
+    All-null chunks carry no type information and return ``None``. Object
+    columns holding only booleans (what pandas produces for a True/False
+    column with gaps) count as bool so they merge with clean bool chunks.
+    """
+    if series.isnull().all():
+        return None
+    if pd.api.types.is_bool_dtype(series):
+        return 'b'
+    if pd.api.types.is_integer_dtype(series):
+        return 'i'
+    if pd.api.types.is_float_dtype(series):
+        return 'f'
+    if pd.api.types.infer_dtype(series, skipna=True) == 'boolean':
+        return 'b'
+    return 'O'
+
+
+def _resolve_dtype(kinds: Set[str], null_count: int) -> Optional[str]:
+    """Return the dtype a whole-file ``pd.read_csv`` would give a column.
+
+    Returns ``None`` when chunks disagree in a way pandas resolves by keeping
+    the raw text (e.g. numbers in one chunk and words in another).
+    """
+    if not kinds:
+        return 'float64'
+    if 'O' in kinds:
+        return 'object' if kinds == {'O'} else None
+    if 'b' in kinds:
+        if kinds != {'b'}:
+            return None
+        return 'object' if null_count else 'bool'
+    if kinds == {'i'} and not null_count:
+        return 'int64'
+    return 'float64'
+
+
+def _native(value: Any) -> Any:
+    """Plain Python scalar for a numpy one, so it can be stored as JSON."""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def column_schema(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Parsed dtype and value kinds of each column of a raw frame.
+
+    Stored with a dataset so appended rows can be checked against it and
+    parsed the same way.
+    """
+    schema = {}
+    for column in df.columns:
+        kind = _chunk_kind(df[column])
+        schema[column] = {'dtype': str(df[column].dtype), 'kinds': [kind] if kind else []}
+    return schema
+
+
+def _hash_rows(chunk: pd.DataFrame) -> np.ndarray:
+    """Hash each row, normalising numeric columns so int, float and bool
+    chunks of the same column hash identically."""
+    normalised = {}
+    for column in chunk.columns:
+        series = chunk[column]
+        if _chunk_kind(series) in NUMERIC_KINDS:
+            series = series.astype('float64')
+        normalised[column] = series
+    frame = pd.DataFrame(normalised, index=chunk.index)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def row_hash_memory_limit() -> int:
+    """Bytes of row hashes deduplication keeps in memory (``ROW_HASH_MEMORY_MB``)."""
+    return int(float(os.getenv("ROW_HASH_MEMORY_MB", 256)) * 1024 * 1024)
+
+
+class RowHashSet:
+    """Set of 64-bit row hashes used to drop duplicates across chunks.
+
+    Hashes are kept in a handful of sorted ``uint64`` arrays that are merged
+    like an LSM tree, so membership costs a few binary searches and storage
+    is 8 bytes per distinct row rather than a Python object per row.
+
+    Once the arrays in memory exceed ``memory_limit`` bytes they are merged
+    into one run and spilled to an anonymous temporary file, which is
+    memory-mapped: its pages live in the (evictable) page cache rather than
+    the process, so resident memory stays around twice the limit however
+    many distinct rows a file has. Spilled runs are not merged again; each
+    adds a binary search to every lookup.
+
+    ``stored`` runs (see ``load_row_hashes``) count as seen but are never
+    rewritten; ``new_runs`` returns what was added on top of them.
+    """
+
+    def __init__(self, memory_limit: Optional[int] = None, stored: Optional[List[np.ndarray]] = None):
+        self.memory_limit = memory_limit if memory_limit is not None else row_hash_memory_limit()
+        self._stored = list(stored or [])
+        self._runs: List[np.ndarray] = []
+        self._spilled: List[np.ndarray] = []
+
+    def add_new(self, hashes: np.ndarray) -> np.ndarray:
+        """Add ``hashes`` and return a mask of the ones not seen before."""
+        keep = ~pd.Series(hashes).duplicated().to_numpy()
+        for run in self._stored + self._spilled + self._runs:
+            positions = np.searchsorted(run, hashes).clip(max=len(run) - 1)
+            keep &= run[positions] != hashes
+        new = np.sort(hashes[keep])
+        if len(new):
+            self._runs.append(new)
+            while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+                last = self._runs.pop()
+                self._runs[-1] = np.sort(np.concatenate([self._runs[-1], last]))
+            if sum(run.nbytes for run in self._runs) > self.memory_limit:
+                self._spill()
+        return keep
+
+    def _spill(self) -> None:
+        run = np.sort(np.concatenate(self._runs))
+        self._runs = []
+        # The file is unlinked on creation; the mapping keeps it alive
+        with tempfile.TemporaryFile() as f:
+            run.tofile(f)
+            f.flush()
+            self._spilled.append(np.memmap(f, dtype=run.dtype, mode='r', shape=run.shape))
+
+    def new_runs(self) -> List[np.ndarray]:
+        """Sorted runs of the hashes added since the set was created."""
+        runs = list(self._spilled)
+        if self._runs:
+            runs.append(np.sort(np.concatenate(self._runs)))
+        return runs
+
+
+def row_hash_paths(file_path: str) -> List[str]:
+    """Run files of the row hashes stored next to a dataset file, oldest first."""
+    stem = os.path.splitext(file_path)[0]
+    runs = []
+    for path in glob.glob(glob.escape(stem) + ".rowhashes.*.npy"):
+        match = ROW_HASHES_PATTERN.search(path)
+        if match:
+            runs.append((int(match.group(1)), path))
+    return [path for _, path in sorted(runs)]
+
+
+def save_row_hashes(file_path: str, seen: RowHashSet) -> List[str]:
+    """Store the hashes added to ``seen`` next to a dataset file, one
+    ``<stem>.rowhashes.<n>.npy`` file per run, so rows appended later are
+    deduplicated against the stored ones. Returns the files written."""
+    stem = os.path.splitext(file_path)[0]
+    start = len(row_hash_paths(file_path))
+    paths = []
+    for i, run in enumerate(seen.new_runs()):
+        path = f"{stem}.rowhashes.{start + i + 1}.npy"
+        with open(path, 'wb') as f:
+            np.save(f, run)
+        paths.append(path)
+    return paths
+
+
+def load_row_hashes(file_path: str) -> Optional[RowHashSet]:
+    """The stored row hashes of a dataset file, memory-mapped, or ``None``
+    for datasets stored before row hashes were kept."""
+    paths = row_hash_paths(file_path)
+    if not paths:
+        return None
+    return RowHashSet(stored=[np.load(path, mmap_mode='r') for path in paths])
+
+
+def frame_row_hashes(df: pd.DataFrame) -> RowHashSet:
+    """Row hashes of a whole frame, as the chunked profiler collects them."""
+    seen = RowHashSet()
+    seen.add_new(_hash_rows(df))
+    return seen
+
+
+class ColumnAccumulator:
+    """Mergeable running statistics for a single column.
+
+    Tracks row and null counts, numeric moments (combined with Chan's
+    parallel update so chunk order does not matter), min/max and the value
+    frequencies used for distinct counts, modes and top values.
+
+    Frequencies are counted exactly until a column holds more than
+    ``EXACT_DISTINCT_LIMIT`` distinct values; the table is then dropped
+    (``values_complete`` turns false) and text values keep feeding a
+    bounded ``TopValues`` summary for the mode and top values, and
+    ``distinct`` (if given) for the distinct count, so memory stays
+    bounded however many values a column holds.
+
+    With ``quantile_k`` numeric values also feed a KLL sketch for quantiles.
+    ``track_numeric_values=False`` skips the frequencies of int and float
+    chunks, when only moments and quantiles are needed.
+
+    An accumulator rebuilt from a stored profile (``from_info``) usually
+    lacks the full frequency table; distinct counts then come from the
+    column's sketch.
+    """
+
+    def __init__(
+        self,
+        track_numeric_values: bool = True,
+        quantile_k: Optional[int] = None,
+        distinct: Optional[HyperLogLog] = None
+    ):
+        self.values_complete = True
+        self.track_numeric_values = track_numeric_values
+        self.quantiles = KLLSketch(quantile_k) if quantile_k else None
+        self.distinct = distinct
+        self.count = 0
+        self.null_count = 0
+        self.kinds: Set[str] = set()
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.value_counts = pd.Series(dtype='int64')
+        self.top_values = TopValues()
+
+    def update(self, series: pd.Series) -> None:
+        """Fold one chunk of values into the accumulator."""
+        chunk = ColumnAccumulator()
+        chunk.count = len(series)
+        chunk.null_count = int(series.isnull().sum())
+        kind = _chunk_kind(series)
+        if kind is not None:
+            chunk.kinds.add(kind)
+            if kind in NUMERIC_KINDS:
+                values = series.dropna().astype('float64')
+                chunk.n = len(values)
+                chunk.mean = float(values.mean())
+                chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+                chunk.min = float(values.min())
+                chunk.max = float(values.max())
+                if self.quantiles is not None and kind != 'b':
+                    self.quantiles.update(values)
+            if self.track_numeric_values or kind not in {'i', 'f'}:
+                counts = series.value_counts(sort=False)
+                if self.values_complete:
+                    chunk.value_counts = counts
+                if kind not in {'i', 'f'}:
+                    chunk.top_values = TopValues.from_counts(counts, self.top_values.capacity)
+                if self.distinct is not None:
+                    self.distinct.update(series)
+        self.merge(chunk)
+
+    @classmethod
+    def from_info(
+        cls,
+        info: Dict[str, Any],
+        row_count: int,
+        kinds: List[str],
+        top_values: Optional[TopValues] = None
+    ) -> 'ColumnAccumulator':
+        """Rebuild an accumulator from a stored ``column_info`` entry.
+
+        ``kinds`` are the column's stored value kinds; text columns keep
+        them only when they held booleans. The frequency table is restored
+        for categorical columns, whose ``top_values`` summary holds every
+        value exactly (profiles stored before summaries kept the table as
+        ``value_counts``).
+        """
+        acc = cls()
+        acc.count = row_count
+        acc.null_count = info['missing_count']
+        if info['type'] == 'integer':
+            acc.kinds = {'i'}
+        elif info['type'] == 'float':
+            acc.kinds = {'b'} if kinds == ['b'] else {'f'}
+        else:
+            acc.kinds = {'b'} if kinds == ['b'] else {'O'}
+        if info.get('mean') is not None:
+            acc.n = row_count - acc.null_count
+            acc.mean = info['mean']
+            std = info.get('std')
+            acc.m2 = std ** 2 * (acc.n - 1) if std is not None and not math.isnan(std) else 0.0
+            acc.min = info['min']
+            acc.max = info['max']
+        if info['type'] == 'categorical' and top_values is not None and not top_values.error:
+            acc.value_counts = top_values.counts.copy()
+        elif 'value_counts' in info:
+            counts = info['value_counts']
+            if acc.kinds == {'b'}:
+                # JSON turned boolean keys into "true"/"false"
+                counts = {key == 'true': count for key, count in counts.items()}
+            acc.value_counts = pd.Series(counts, dtype='int64')
+        else:
+            acc.values_complete = acc.count == acc.null_count
+        return acc
+
+    def merge(self, other: 'ColumnAccumulator') -> None:
+        """Combine another accumulator for the same column into this one."""
+        self.values_complete = self.values_complete and other.values_complete
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        if self.distinct is not None and other.distinct is not None:
+            self.distinct.merge(other.distinct)
+        if len(other.top_values.counts) or other.top_values.error:
+            self.top_values.merge(other.top_values)
+        self.count += other.count
+        self.null_count += other.null_count
+        self.kinds |= other.kinds
+        if other.n:
+            total = self.n + other.n
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta ** 2 * self.n * other.n / total
+            self.mean += delta * other.n / total
+            self.n = total
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        if len(other.value_counts) and self.values_complete:
+            if len(self.value_counts):
+                combined = pd.concat([self.value_counts, other.value_counts])
+                self.value_counts = combined.groupby(level=0, sort=False).sum()
+            else:
+                self.value_counts = other.value_counts
+        if len(self.value_counts) > distinct_count_settings()['exact_values']:
+            self.values_complete = False
+        if not self.values_complete:
+            self.value_counts = pd.Series(dtype='int64')
+
+    @property
+    def dtype(self) -> Optional[str]:
+        return _resolve_dtype(self.kinds, self.null_count)
+
+    def quantile(self, q: float, extra_value: Any = None, extra_count: int = 0) -> float:
+        """Approximate quantile from the KLL sketch.
+
+        ``extra_value`` repeated ``extra_count`` times is folded in first,
+        which is how median imputation shifts the distribution.
+        """
+        return self.quantiles.quantile(q, extra_value, extra_count)
+
+    def mode(self) -> Any:
+        """Smallest most-frequent value, as ``Series.mode()[0]`` returns;
+        from the ``TopValues`` summary once the frequency table is dropped."""
+        counts = self.value_counts if self.values_complete else self.top_values.counts
+        if not len(counts):
+            return None
+        top = counts[counts == counts.max()]
+        return min(top.index)
+
+    def distinct_count(self) -> int:
+        """Distinct non-null values: exact while the frequency table holds
+        all of them, estimated by ``distinct`` afterwards."""
+        if self.values_complete or self.distinct is None:
+            return len(self.value_counts)
+        return min(self.distinct.estimate(), self.count - self.null_count)
+
+    def summary(self) -> TopValues:
+        """Top values summary: exact while the frequency table holds every
+        value, the bounded ``TopValues`` afterwards."""
+        if self.values_complete:
+            return TopValues.from_counts(self.value_counts)
+        return self.top_values
+
+    def to_info(
+        self,
+        row_count: int,
+        distinct_sketch: Optional[HyperLogLog] = None,
+        top_values: Optional[TopValues] = None
+    ) -> Dict[str, Any]:
+        """Build the ``column_info`` entry ``get_column_info`` would produce.
+
+        Above the approximate-distinct threshold, or once the frequency
+        table is dropped, the distinct count is read from
+        ``distinct_sketch`` (by default the accumulator's own). Top values
+        of text columns come from ``top_values``, or from ``summary()`` when
+        none is given.
+        """
+        dtype = self.dtype
+        distinct_sketch = distinct_sketch if distinct_sketch is not None else self.distinct
+        approximate = distinct_sketch is not None and (
+            row_count > distinct_count_settings()['threshold'] or not self.values_complete
+        )
+        if approximate:
+            unique_count = min(distinct_sketch.estimate(), row_count - self.null_count)
+        else:
+            unique_count = len(self.value_counts)
+        if dtype in ['int64', 'float64', 'bool']:
+            column_type = 'integer' if dtype == 'int64' else 'float'
+        elif unique_count < min(50, row_count * 0.1) and self.values_complete:
+            column_type = 'categorical'
+        else:
+            column_type = 'string'
+
+        info = {
+            'type': column_type,
+            'missing_count': self.null_count,
+            'missing_percentage': (self.null_count / row_count) * 100 if row_count else 0.0,
+            'unique_count': unique_count,
+            'unique_percentage': (unique_count / row_count) * 100 if row_count else 0.0,
+            'unique_count_mode': 'approximate' if approximate else 'exact'
+        }
+        if approximate:
+            info['unique_count_error'] = distinct_sketch.relative_error
+
+        if column_type in ['integer', 'float']:
+            if self.n:
+                std = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else float('nan')
+                info.update({'min': self.min, 'max': self.max, 'mean': self.mean, 'std': std})
+            else:
+                info.update({'min': None, 'max': None, 'mean': None, 'std': None})
+        elif column_type in ['categorical', 'string']:
+            if top_values is None:
+                top_values = self.summary()
+            info.update(top_values.to_info(value_counts=column_type == 'categorical'))
+
+        return info
+
+
+def _read_chunks(file_path: str, chunksize: int, dtype: Optional[Dict[str, Any]] = None):
+    return pd.read_csv(file_path, chunksize=chunksize, dtype=dtype)
+
+
+def _scan_raw(
+    file_path: str,
+    chunksize: int,
+    dtype: Optional[Dict[str, Any]],
+    progress: Optional[Callable[[str, int], None]] = None,
+    previous: Optional[tuple] = None
+):
+    """First pass: deduplicate and accumulate statistics of the raw rows.
+
+    The first chunk is validated before anything else is read and parse
+    errors surface at the chunk they occur in, both as
+    ``CSVValidationError``; the second pass re-reads a file this accepted.
+
+    Returns the columns, their accumulators, the row count and a digest
+    per chunk of the rows deduplication kept. ``previous`` is the result
+    of a scan whose accumulators found columns in conflict, now overridden
+    in ``dtype``: only those columns are accumulated again and the others'
+    accumulators are reused, unless deduplication keeps different rows
+    this time (overridden columns compare as text), in which case every
+    column is scanned again.
+    """
+    seen = RowHashSet()
+    accumulators: Dict[str, ColumnAccumulator] = {}
+    columns: List[str] = []
+    kept: List[bytes] = []
+    reused: Set[str] = set()
+    total_rows = 0
+    try:
+        for index, chunk in enumerate(_read_chunks(file_path, chunksize, dtype)):
+            if not columns:
+                validate_csv_frame(chunk)
+                columns = list(chunk.columns)
+                if previous is not None:
+                    reused = {column for column in columns if previous[1][column].dtype is not None}
+                accumulators = {
+                    column: ColumnAccumulator(
+                        track_numeric_values=False, quantile_k=quantile_sketch_k(), distinct=new_distinct_sketch()
+                    )
+                    for column in columns if column not in reused
+                }
+            total_rows += len(chunk)
+            mask = seen.add_new(_hash_rows(chunk))
+            digest = hashlib.blake2b(np.packbits(mask).tobytes(), digest_size=16).digest()
+            if previous is not None and digest != previous[3][index]:
+                return _scan_raw(file_path, chunksize, dtype, progress)
+            kept.append(digest)
+            chunk = chunk[mask]
+            for column in accumulators:
+                accumulators[column].update(chunk[column])
+            if progress is not None:
+                progress('scanning', total_rows)
+    except CSV_PARSE_ERRORS as e:
+        raise csv_parse_error(e) from e
+    if not columns:
+        raise CSVValidationError("CSV file is empty")
+    accumulators.update({column: previous[1][column] for column in reused})
+    return columns, accumulators, total_rows, kept
+
+
+def _cleaned_dtype(dtype: str, acc: 'ColumnAccumulator', bounds: Optional[tuple]) -> str:
+    """Dtype ``clean_dataframe`` leaves a column in, from its raw profile.
+
+    Capping an integer column keeps it integer unless a fractional bound
+    is actually applied; clipping its extremes reproduces that.
+    """
+    if acc.kinds == {'b'}:
+        return 'bool'
+    if dtype == 'int64' and bounds is not None and acc.min is not None:
+        extremes = pd.Series([acc.min, acc.max], dtype='int64')
+        return str(extremes.clip(lower=bounds[0], upper=bounds[1]).dtype)
+    return dtype
+
+
+def profile_csv_chunked(
+    file_path: str,
+    user_id: int,
+    chunksize: int = 100000,
+    columnar_cache: bool = False,
+    progress: Optional[Callable[[str, int], None]] = None,
+    file_size: Optional[int] = None,
+    sample_size: int = 0
+) -> Dict[str, Any]:
+    """Clean and profile a CSV in bounded memory, chunk by chunk.
+
+    Produces the same metadata as ``save_dataframe_info(pd.read_csv(path))``
+    without materialising the file. The first pass deduplicates rows and
+    collects the raw statistics that drive imputation and outlier capping;
+    the second pass re-reads the file, applies that cleaning plan chunk by
+    chunk and accumulates the profile of the cleaned rows. Medians and
+    quartiles come from KLL sketches (``QUANTILE_SKETCH_K``), so they are
+    approximate on large files. Memory is bounded by the chunk size plus
+    the per-column sketches and frequency tables (at most
+    ``EXACT_DISTINCT_LIMIT`` values each, see ``ColumnAccumulator``) and
+    the row hashes of duplicate detection, of which at most
+    ``ROW_HASH_MEMORY_MB`` stay in memory before spilling to disk (see
+    ``RowHashSet``).
+
+    With ``columnar_cache`` the typed raw rows are also streamed into an
+    Arrow file during the second pass, and the cleaned rows into a second
+    one; their paths are returned as ``columnar_path`` and
+    ``cleaned_path`` (``None`` if they could not be written). ``dtypes``
+    holds the dtype a full ``pd.read_csv`` would give each column, and
+    ``schema`` the same as ``column_schema`` describes it. The hashes of
+    the distinct raw rows are returned as ``row_hashes`` for
+    ``save_row_hashes``.
+
+    Malformed files raise ``CSVValidationError`` from the first pass, at
+    the first bad chunk.
+
+    ``progress`` is called after every chunk with the pass name
+    (``scanning`` or ``profiling``) and the rows read so far in that pass.
+
+    With ``sample_size`` a uniform sample of that many cleaned rows (see
+    ``RowSample``) is returned as ``sample``, limited to the columns that
+    can be numeric or categorical; otherwise ``sample`` is ``None``.
+    """
+    dtype_overrides: Dict[str, Any] = {}
+    scan = None
+    while True:
+        scan = _scan_raw(file_path, chunksize, dtype_overrides or None, progress, scan)
+        columns, raw, total_rows, _ = scan
+        conflicts = [column for column in columns if raw[column].dtype is None]
+        if not conflicts:
+            break
+        # Chunks disagreed on the type (e.g. numbers then words); a full read
+        # keeps such columns as text, so rescan them as strings.
+        dtype_overrides.update({column: str for column in conflicts})
+    scan = None
+
+    raw_dtypes = {column: raw[column].dtype for column in columns}
+    deduped_rows = raw[columns[0]].count if columns else 0
+
+    # Build the cleaning plan clean_dataframe would apply to the full frame.
+    fill_values: Dict[str, Any] = {}
+    clip_bounds: Dict[str, tuple] = {}
+    for column in columns:
+        acc = raw[column]
+        numeric = raw_dtypes[column] in ['int64', 'float64']
+        if acc.null_count:
+            if numeric:
+                fill_values[column] = acc.quantile(0.5)
+            else:
+                mode_value = acc.mode()
+                fill_values[column] = mode_value if mode_value is not None else 'Unknown'
+        if numeric:
+            q1 = acc.quantile(0.25, fill_values.get(column), acc.null_count)
+            q3 = acc.quantile(0.75, fill_values.get(column), acc.null_count)
+            iqr = q3 - q1
+            clip_bounds[column] = (q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+
+    # Compact dtypes the raw columns will load as (see ``optimize_dtypes``)
+    memory_dtypes = {
+        column: plan_dtype(
+            raw_dtypes[column],
+            total_rows,
+            unique_count=raw[column].distinct_count() if raw_dtypes[column] == 'object' else None,
+            min_value=raw[column].min,
+            max_value=raw[column].max
+        )
+        for column in columns
+    }
+    text_bytes = {column: 0 for column in columns if raw_dtypes[column] == 'object'}
+
+    writer = cleaned_writer = None
+    if columnar_cache and columnar_available() and columns:
+        writer = ColumnarWriter(file_path, {
+            column: 'bool' if raw[column].kinds == {'b'} else raw_dtypes[column]
+            for column in columns
+        })
+        cleaned_writer = ColumnarWriter(file_path, {
+            column: _cleaned_dtype(raw_dtypes[column], raw[column], clip_bounds.get(column))
+            for column in columns
+        }, path=cleaned_path_for(file_path))
+
+    sample = RowSample(sample_size) if sample_size else None
+    # Free text never enters the correlation matrices, so only text columns
+    # that can be categorical (fewer than 50 values) are sampled
+    sample_columns = [
+        column for column in columns
+        if raw_dtypes[column] != 'object' or raw[column].distinct_count() < 50
+    ]
+
+    seen = RowHashSet()
+    # Above the threshold distinct counts come from the sketches, so numeric
+    # frequency tables would only cost memory.
+    track_numeric_values = deduped_rows <= distinct_count_settings()['threshold']
+    cleaned = {column: ColumnAccumulator(track_numeric_values) for column in columns}
+    distinct_sketches = {column: new_distinct_sketch() for column in columns}
+    outliers = {column: 0 for column in columns}
+    rows_read = 0
+    for chunk in _read_chunks(file_path, chunksize, dtype_overrides or None):
+        rows_read += len(chunk)
+        chunk = chunk.astype(raw_dtypes)
+        if writer is not None:
+            writer.write(chunk)
+        for column in text_bytes:
+            text_bytes[column] += int(chunk[column].memory_usage(deep=True, index=False))
+        chunk = chunk[seen.add_new(_hash_rows(chunk))]
+        cleaned_chunk = {}
+        for column in columns:
+            series = chunk[column]
+            if column in fill_values:
+                series = series.fillna(fill_values[column])
+            if column in clip_bounds:
+                lower_bound, upper_bound = clip_bounds[column]
+                outliers[column] += int(((series < lower_bound) | (series > upper_bound)).sum())
+                # Clipping a chunk without outliers leaves it (and its dtype)
+                # untouched, so capping per chunk matches capping the column.
+                series = series.clip(lower=lower_bound, upper=upper_bound)
+            cleaned[column].update(series)
+            distinct_sketches[column].update(series)
+            cleaned_chunk[column] = series
+        if cleaned_writer is not None:
+            cleaned_writer.write(pd.DataFrame(cleaned_chunk, index=chunk.index))
+        if sample is not None and len(chunk):
+            sample.update(pd.DataFrame({column: cleaned_chunk[column] for column in sample_columns}))
+        if progress is not None:
+            progress('profiling', rows_read)
+
+    columnar_path = writer.close() if writer is not None else None
+    cleaned_path = cleaned_writer.close() if cleaned_writer is not None else None
+
+    top_values = {
+        column: cleaned[column].summary()
+        for column in columns
+        if cleaned[column].dtype not in ['int64', 'float64', 'bool']
+    }
+    column_info = {
+        column: cleaned[column].to_info(deduped_rows, distinct_sketches[column], top_values.get(column))
+        for column in columns
+    }
+    for column in columns:
+        before = text_bytes.get(column, planned_memory_bytes(raw_dtypes[column], total_rows))
+        if memory_dtypes[column] == 'category' and raw[column].values_complete:
+            categories = pd.Index(raw[column].value_counts.index)
+            after = planned_memory_bytes('category', total_rows, categories)
+        elif memory_dtypes[column] == 'category':
+            # Too many values to list: each category takes about as many
+            # bytes as an average stored value
+            categories = raw[column].distinct_count()
+            codes = np.dtype(smallest_int_dtype(-1, categories)).itemsize * total_rows
+            after = codes + categories * before // max(total_rows, 1)
+        elif memory_dtypes[column] == 'object':
+            after = before
+        else:
+            after = planned_memory_bytes(memory_dtypes[column], total_rows)
+        column_info[column].update({
+            'memory_dtype': memory_dtypes[column],
+            'memory_bytes_before': before,
+            'memory_bytes_after': after
+        })
+    cleaning_report = {
+        'original_shape': (total_rows, len(columns)),
+        'missing_values': {column: raw[column].null_count for column in columns if raw[column].null_count},
+        'outliers': {column: count for column, count in outliers.items() if count},
+        'duplicates_removed': total_rows - deduped_rows,
+        'columns_processed': len(columns),
+        # All-missing columns have no median or quartiles to record
+        'fill_values': {column: _native(value) for column, value in fill_values.items() if not pd.isna(value)},
+        'clip_bounds': {column: bounds for column, bounds in clip_bounds.items() if not math.isnan(bounds[0])},
+        'final_shape': (deduped_rows, len(columns)),
+        'rows_removed': total_rows - deduped_rows
+    }
+
+    return {
+        'user_id': user_id,
+        'row_count': deduped_rows,
+        'column_count': len(columns),
+        'column_info': column_info,
+        'cleaning_report': cleaning_report,
+        'columnar_path': columnar_path,
+        'cleaned_path': cleaned_path,
+        'dtypes': raw_dtypes,
+        'schema': {
+            column: {'dtype': raw_dtypes[column], 'kinds': sorted(raw[column].kinds)}
+            for column in columns
+        },
+        'distinct_sketches': distinct_sketches,
+        'top_values': top_values,
+        'sample': sample.frame() if sample is not None else None,
+        'row_hashes': seen,
+        'uploaded_at': datetime.now().isoformat(),
+        'file_size': file_size if file_size is not None else (
+            os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        )
+    }
+
+
+# Value kinds a stored column accepts from appended rows
+APPEND_KINDS = {
+    'int64': {'i'},
+    'float64': {'i', 'f'},
+    'bool': {'b'}
+}
+
+
+def _append_read_dtypes(schema: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Read text columns as text so appended values keep their spelling;
+    columns of booleans with gaps are parsed so True/False stay booleans."""
+    return {
+        column: str for column, entry in schema.items()
+        if entry['dtype'] == 'object' and entry['kinds'] != ['b']
+    }
+
+
+def validate_append(file_path: str, schema: Dict[str, Dict[str, Any]], chunksize: int = 100000) -> int:
+    """Check that a CSV of new rows matches a stored schema.
+
+    Columns must match by name (order may differ) and every value must
+    parse as the stored type would: integers for integer columns, numbers
+    for float columns, True/False for boolean columns. Raises
+    ``ValueError`` describing the first mismatch; returns the row count.
+    """
+    rows = 0
+    for chunk in _read_chunks(file_path, chunksize, _append_read_dtypes(schema)):
+        if not rows:
+            missing = [column for column in schema if column not in chunk.columns]
+            unexpected = [column for column in chunk.columns if column not in schema]
+            if missing or unexpected:
+                problems = []
+                if missing:
+                    problems.append(f"missing columns: {', '.join(map(str, missing))}")
+                if unexpected:
+                    problems.append(f"unexpected columns: {', '.join(map(str, unexpected))}")
+                raise ValueError("New rows do not match the dataset schema (" + "; ".join(problems) + ")")
+        for column, entry in schema.items():
+            kind = _chunk_kind(chunk[column])
+            allowed = APPEND_KINDS.get(entry['dtype'], {'b'} if entry['kinds'] == ['b'] else {'O'})
+            if not entry['kinds'] and entry['dtype'] == 'float64':
+                allowed = APPEND_KINDS['float64']
+            if kind is not None and kind not in allowed:
+                raise ValueError(
+                    f"Column '{column}' expects {entry['dtype']} values; "
+                    f"rows {rows + 1}-{rows + len(chunk)} contain incompatible values"
+                )
+        rows += len(chunk)
+    if not rows:
+        raise ValueError("No rows to append")
+    return rows
+
+
+def _extend_memory_info(
+    old: Dict[str, Any],
+    new: Dict[str, Any],
+    dtype: str,
+    new_dtype: str,
+    raw_rows: int,
+    text_bytes: int,
+    int_range: Optional[tuple]
+) -> None:
+    """Carry the ``memory_*`` entries of ``old`` over to ``new`` after
+    ``raw_rows`` rows were appended, widening the planned dtype if needed."""
+    if 'memory_dtype' not in old:
+        return
+    if dtype == 'object':
+        before = old['memory_bytes_before'] + text_bytes
+    else:
+        before = old['memory_bytes_before'] + planned_memory_bytes(dtype, raw_rows)
+
+    plan = old['memory_dtype']
+    if new_dtype != dtype:
+        # Gaps turned an int column into floats (or bools into objects)
+        plan = new_dtype
+    elif dtype == 'int64' and int_range is not None:
+        widened = smallest_int_dtype(*int_range)
+        if np.dtype(widened).itemsize > np.dtype(plan).itemsize:
+            plan = widened
+    if plan == 'category' and new['unique_percentage'] > CATEGORY_MAX_UNIQUE_RATIO * 100:
+        plan = 'object'
+
+    if plan == 'category':
+        codes = np.dtype(smallest_int_dtype(-1, new['unique_count']))
+        after = old['memory_bytes_after'] + codes.itemsize * raw_rows
+    elif plan == 'object':
+        after = before
+    else:
+        after = np.dtype(plan).itemsize * (before // np.dtype(dtype).itemsize)
+    new.update({'memory_dtype': plan, 'memory_bytes_before': int(before), 'memory_bytes_after': int(after)})
+
+
+def profile_append(
+    file_path: str,
+    row_count: int,
+    column_info: Dict[str, Any],
+    schema: Dict[str, Dict[str, Any]],
+    cleaning_plan: Dict[str, Any],
+    distinct_sketches: Dict[str, HyperLogLog],
+    write_chunk: Optional[Callable[[pd.DataFrame], None]] = None,
+    chunksize: int = 100000,
+    write_cleaned: Optional[Callable[[pd.DataFrame], None]] = None,
+    top_values: Optional[Dict[str, TopValues]] = None,
+    row_hashes: Optional[RowHashSet] = None
+) -> Dict[str, Any]:
+    """Extend a stored profile with the rows of another CSV.
+
+    The new rows are read chunk by chunk, handed raw to ``write_chunk``
+    (which appends them to the stored data), deduplicated against the
+    stored rows' ``row_hashes`` (see ``load_row_hashes``; added to in
+    place) and among themselves, cleaned with the dataset's stored ``cleaning_plan``,
+    handed to ``write_cleaned`` and accumulated. Their statistics are then merged into ``column_info``,
+    ``distinct_sketches`` and the text columns' ``top_values`` summaries
+    (both updated in place); the existing rows are never read. Distinct counts of columns whose profile does not hold
+    every value become sketch estimates.
+
+    Call ``validate_append`` first. Returns the new ``row_count``,
+    ``column_info`` and ``schema`` plus a cleaning report for the new rows,
+    whose ``deduplicated_against_stored`` is false when there were no
+    stored hashes (datasets stored before they were kept): duplicates of
+    existing rows are then kept.
+    """
+    columns = list(schema)
+    fill_values = cleaning_plan.get('fill_values', {})
+    clip_bounds = cleaning_plan.get('clip_bounds', {})
+
+    seen = row_hashes if row_hashes is not None else RowHashSet()
+    delta = {column: ColumnAccumulator() for column in columns}
+    raw_nulls = {column: 0 for column in columns}
+    outliers = {column: 0 for column in columns}
+    text_bytes = {column: 0 for column in columns if schema[column]['dtype'] == 'object'}
+    raw_kinds: Dict[str, Set[str]] = {column: set() for column in columns}
+    int_ranges: Dict[str, tuple] = {}
+    raw_rows = 0
+    for chunk in _read_chunks(file_path, chunksize, _append_read_dtypes(schema)):
+        chunk = chunk[columns]
+        raw_rows += len(chunk)
+        if write_chunk is not None:
+            write_chunk(chunk)
+        for column in text_bytes:
+            text_bytes[column] += int(chunk[column].memory_usage(deep=True, index=False))
+        for column in columns:
+            series = chunk[column]
+            raw_nulls[column] += int(series.isnull().sum())
+            kind = _chunk_kind(series)
+            if kind is not None:
+                raw_kinds[column].add(kind)
+            if schema[column]['dtype'] == 'int64' and series.notnull().any():
+                low, high = series.min(), series.max()
+                if column in int_ranges:
+                    low, high = min(low, int_ranges[column][0]), max(high, int_ranges[column][1])
+                int_ranges[column] = (low, high)
+
+        chunk = chunk[seen.add_new(_hash_rows(chunk))]
+        cleaned_chunk = {}
+        for column in columns:
+            series = chunk[column]
+            if column in fill_values:
+                series = series.fillna(fill_values[column])
+            if column in clip_bounds:
+                lower_bound, upper_bound = clip_bounds[column]
+                outliers[column] += int(((series < lower_bound) | (series > upper_bound)).sum())
+                series = series.clip(lower=lower_bound, upper=upper_bound)
+            delta[column].update(series)
+            distinct_sketches[column].update(series)
+            cleaned_chunk[column] = series
+        if write_cleaned is not None:
+            write_cleaned(pd.DataFrame(cleaned_chunk, index=chunk.index))
+
+    new_rows = delta[columns[0]].count if columns else 0
+    total_rows = row_count + new_rows
+    top_values = top_values if top_values is not None else {}
+    new_info = {}
+    new_schema = {}
+    for column in columns:
+        entry = schema[column]
+        info = column_info[column]
+        summary = top_values.get(column)
+        if summary is None and info['type'] in ['categorical', 'string']:
+            # Profiles stored before summaries were kept: start from the
+            # stored frequency table, or count every old value as unknown
+            if 'value_counts' in info:
+                summary = TopValues.from_counts(pd.Series(info['value_counts'], dtype='int64'))
+            else:
+                summary = TopValues(error=row_count - info['missing_count'])
+            top_values[column] = summary
+        acc = ColumnAccumulator.from_info(info, row_count, entry['kinds'], summary)
+        acc.merge(delta[column])
+        if summary is not None:
+            summary.merge(delta[column].summary())
+        new_info[column] = acc.to_info(total_rows, distinct_sketches[column], summary)
+
+        dtype = entry['dtype']
+        new_dtype = dtype
+        if raw_nulls[column] and dtype in ('int64', 'bool'):
+            new_dtype = 'float64' if dtype == 'int64' else 'object'
+        new_schema[column] = {'dtype': new_dtype, 'kinds': sorted(set(entry['kinds']) | raw_kinds[column])}
+        new_info[column].update(new_schema[column])
+        _extend_memory_info(
+            column_info[column], new_info[column], dtype, new_dtype,
+            raw_rows, text_bytes.get(column, 0), int_ranges.get(column)
+        )
+
+    return {
+        'row_count': total_rows,
+        'column_info': new_info,
+        'schema': new_schema,
+        'rows_appended': raw_rows,
+        'cleaning_report': {
+            'rows_received': raw_rows,
+            'duplicates_removed': raw_rows - new_rows,
+            'deduplicated_against_stored': row_hashes is not None,
+            'missing_values': {column: count for column, count in raw_nulls.items() if count},
+            'outliers': {column: count for column, count in outliers.items() if count}
+        }
+    }
+
+
+def merge_cleaning_reports(report: Dict[str, Any], appended: Dict[str, Any], row_count: int) -> Dict[str, Any]:
+    """Dataset cleaning report after an append, from the stored report and
+    the ``profile_append`` report of the new rows; ``row_count`` is the
+    dataset's row count afterwards."""
+    merged = dict(report)
+    columns = report['original_shape'][1]
+    merged['original_shape'] = (report['original_shape'][0] + appended['rows_received'], columns)
+    merged['final_shape'] = (row_count, columns)
+    merged['duplicates_removed'] = report['duplicates_removed'] + appended['duplicates_removed']
+    merged['rows_removed'] = merged['original_shape'][0] - row_count
+    for key in ('missing_values', 'outliers'):
+        counts = dict(report[key])
+        for column, count in appended[key].items():
+            counts[column] = counts.get(column, 0) + count
+        merged[key] = counts
+    return merged
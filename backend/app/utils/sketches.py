@@ -0,0 +1,437 @@
+import pandas as pd
+import numpy as np
+from typing import Any, Dict, Optional
+import base64
+import json
+import math
+import os
+import zlib
+
+from app.utils.parallel import map_column_blocks
+
+SKETCHES_EXTENSION = ".sketches.json"
+
+
+def _hash_values(series: pd.Series) -> np.ndarray:
+    """64-bit hashes of the non-null values of ``series``.
+
+    Numeric and boolean values are hashed as float64 so that the same value
+    parsed as int in one chunk and float in another lands in one bucket.
+    """
+    values = series.dropna()
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        values = values.astype('float64')
+    return pd.util.hash_array(values.to_numpy())
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Exact vectorized ``int.bit_length`` for a ``uint64`` array."""
+    lengths = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        over = values >= (np.uint64(1) << np.uint64(shift))
+        lengths[over] += shift
+        values = np.where(over, values >> np.uint64(shift), values)
+    return lengths + (values > 0)
+
+
+def _sigma(x: float) -> float:
+    if x == 1:
+        return float('inf')
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-value sketch over 64-bit hashes.
+
+    Uses ``2 ** precision`` one-byte registers and has a relative standard
+    error of about ``1.04 / sqrt(2 ** precision)``. Sketches of the same
+    precision merge losslessly, so per-chunk or per-append sketches can be
+    combined into the sketch of the union.
+    """
+
+    MIN_PRECISION = 4
+    MAX_PRECISION = 18
+
+    def __init__(self, precision: int = 14):
+        if not self.MIN_PRECISION <= precision <= self.MAX_PRECISION:
+            raise ValueError(f"precision must be between {self.MIN_PRECISION} and {self.MAX_PRECISION}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @classmethod
+    def for_error(cls, relative_error: float) -> 'HyperLogLog':
+        """Smallest sketch whose standard error is at most ``relative_error``."""
+        precision = math.ceil(2 * math.log2(1.04 / relative_error))
+        return cls(min(max(precision, cls.MIN_PRECISION), cls.MAX_PRECISION))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, series: pd.Series) -> None:
+        """Add the non-null values of ``series``."""
+        hashes = _hash_values(series)
+        if not len(hashes):
+            return
+        value_bits = 64 - self.precision
+        index = (hashes >> np.uint64(value_bits)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << value_bits) - 1)
+        rank = (value_bits - _bit_length(remainder) + 1).astype(np.uint8)
+        # Group by register and take each group's maximum; several times
+        # faster than ``np.maximum.at``, and every register index is then
+        # written once (fancy assignment to repeated indices has no defined
+        # winner)
+        order = np.argsort(index, kind='stable')
+        index, rank = index[order], rank[order]
+        starts = np.flatnonzero(np.concatenate(([True], index[1:] != index[:-1])))
+        registers = index[starts]
+        self.registers[registers] = np.maximum(self.registers[registers], np.maximum.reduceat(rank, starts))
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        """Estimated number of distinct values added so far.
+
+        Uses Ertl's improved estimator ("New cardinality estimation
+        algorithms for HyperLogLog sketches", 2017), which stays unbiased
+        from empty sketches up to very large cardinalities without the
+        empirical bias tables of HLL++.
+        """
+        m = len(self.registers)
+        q = 64 - self.precision
+        histogram = np.bincount(self.registers, minlength=q + 2).astype(np.float64)
+        z = m * _tau(1 - histogram[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + histogram[k])
+        z += m * _sigma(histogram[0] / m)
+        if math.isinf(z):
+            return 0
+        return int(round(m * m / (2 * math.log(2)) / z))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'precision': self.precision,
+            'registers': base64.b64encode(zlib.compress(self.registers.tobytes())).decode('ascii')
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HyperLogLog':
+        sketch = cls(data['precision'])
+        registers = np.frombuffer(zlib.decompress(base64.b64decode(data['registers'])), dtype=np.uint8)
+        sketch.registers = registers.copy()
+        return sketch
+
+
+class KLLSketch:
+    """KLL quantile sketch (Karnin, Lang & Liberty, 2016).
+
+    Values live in a stack of compactors; level ``h`` items stand for
+    ``2 ** h`` original values. When a level overflows it is sorted and
+    every other item (random offset) is promoted, so memory stays around
+    ``3 * k`` items while rank error is roughly ``1.7 / k``. Sketches merge
+    by concatenating levels, and until the first compaction they are exact.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                # An odd item out stays behind so the promoted weight is exact
+                even = len(items) - len(items) % 2
+                promoted = items[:even][self._rng.integers(2)::2]
+                self.levels[level] = items[even:]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values: Any) -> None:
+        """Add an array or Series of numbers; NaNs are ignored."""
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: 'KLLSketch') -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def copy(self) -> 'KLLSketch':
+        sketch = KLLSketch(self.k)
+        sketch.count = self.count
+        sketch.levels = [items.copy() for items in self.levels]
+        return sketch
+
+    def quantile(self, q: float, extra_value: Optional[float] = None, extra_count: int = 0) -> float:
+        """Linear-interpolated quantile, as ``Series.quantile`` computes it.
+
+        ``extra_value`` repeated ``extra_count`` times is counted in
+        exactly, as one weighted item; inserting it into the compactors
+        would add levels above the data and compact it all away.
+        """
+        if extra_value is None or math.isnan(extra_value):
+            extra_count = 0
+        if not self.count + extra_count:
+            return float('nan')
+        items = np.concatenate(self.levels + [np.full(1 if extra_count else 0, extra_value, dtype=np.float64)])
+        weights = np.concatenate([
+            np.full(len(level_items), 1 << level, dtype=np.int64)
+            for level, level_items in enumerate(self.levels)
+        ] + [np.full(1 if extra_count else 0, extra_count, dtype=np.int64)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative = weights[order].cumsum()
+        position = q * (cumulative[-1] - 1)
+        lower = items[np.searchsorted(cumulative, math.floor(position), side='right')]
+        upper = items[np.searchsorted(cumulative, math.ceil(position), side='right')]
+        return float(lower + (upper - lower) * (position - math.floor(position)))
+
+
+class TopValues:
+    """Bounded heavy-hitters summary of a column (Misra-Gries).
+
+    Keeps at most ``capacity`` value counters. Every counter is at most
+    ``error`` below its value's true count, and a value without a counter
+    occurs at most ``error`` times. Built from an exact frequency table
+    the largest counts are kept exactly and ``error`` is the largest count
+    dropped (0 when everything fits). Merging adds counters and, when
+    there are too many, subtracts the ``capacity + 1``-th largest from all
+    of them (Agarwal et al., "Mergeable Summaries", 2012), so the error
+    stays below ``rows / (capacity + 1)`` however many appends follow.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, error: int = 0):
+        self.capacity = capacity if capacity is not None else top_values_settings()['capacity']
+        self.error = error
+        self.counts = pd.Series(dtype='int64')
+
+    @classmethod
+    def from_counts(cls, counts: pd.Series, capacity: Optional[int] = None) -> 'TopValues':
+        """Summary of an exact frequency table (``Series.value_counts``)."""
+        summary = cls(capacity)
+        ranked = counts.sort_values(ascending=False, kind='stable')
+        summary.counts = ranked.head(summary.capacity).astype('int64')
+        if len(ranked) > summary.capacity:
+            summary.error = int(ranked.iloc[summary.capacity])
+        return summary
+
+    def update(self, series: pd.Series) -> None:
+        """Add the non-null values of ``series``."""
+        self.merge(TopValues.from_counts(series.value_counts(sort=False), self.capacity))
+
+    def merge(self, other: 'TopValues') -> None:
+        counts = pd.concat([self.counts, other.counts]).groupby(level=0, sort=False).sum()
+        self.error += other.error
+        if len(counts) > self.capacity:
+            threshold = int(counts.sort_values(ascending=False, kind='stable').iloc[self.capacity])
+            counts = counts[counts > threshold] - threshold
+            self.error += threshold
+        self.counts = counts.astype('int64')
+
+    def copy(self) -> 'TopValues':
+        summary = TopValues(self.capacity, self.error)
+        summary.counts = self.counts.copy()
+        return summary
+
+    def to_info(self, k: Optional[int] = None, value_counts: bool = False) -> Dict[str, Any]:
+        """The ``k`` (``TOP_VALUES_K``) most frequent values with their counts,
+        most frequent first, and the error bound of those counts.
+
+        ``value_counts`` also reports every counter, as categorical columns
+        always have: their fewer than 50 values all fit the summary, so the
+        table is exact and bounded by ``capacity``.
+        """
+        k = k if k is not None else top_values_settings()['k']
+        ranked = self.counts.sort_values(ascending=False, kind='stable')
+        info = {
+            'top_values': {key: int(count) for key, count in ranked.head(k).items()},
+            'top_values_error': self.error
+        }
+        if value_counts:
+            info['value_counts'] = {key: int(count) for key, count in ranked.items()}
+        return info
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Pairs rather than an object so non-string values keep their type
+        return {
+            'capacity': self.capacity,
+            'error': self.error,
+            'counts': [[key.item() if hasattr(key, 'item') else key, int(count)] for key, count in self.counts.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TopValues':
+        summary = cls(data['capacity'], data['error'])
+        if data['counts']:
+            keys, counts = zip(*data['counts'])
+            summary.counts = pd.Series(counts, index=pd.Index(keys, dtype=object), dtype='int64')
+        return summary
+
+
+def top_values_settings() -> Dict[str, int]:
+    """Values reported per text column (``TOP_VALUES_K``) and the counters
+    kept to track them: enough to hold every value of a categorical column
+    (fewer than 50) exactly, and several per reported value otherwise."""
+    k = int(os.getenv("TOP_VALUES_K", 5))
+    return {'k': k, 'capacity': max(64, 4 * k)}
+
+
+def quantile_sketch_k() -> int:
+    """Accuracy parameter of quantile sketches (rank error ~ 1.7 / k)."""
+    return int(os.getenv("QUANTILE_SKETCH_K", 200))
+
+
+def distinct_count_settings() -> Dict[str, float]:
+    """Row threshold above which distinct counts are approximate, the
+    target relative error of the sketches, and the distinct values a
+    column's frequency table holds before counts fall back to the sketches
+    (``EXACT_DISTINCT_LIMIT``; never below the 50 values that decide
+    whether text is categorical)."""
+    return {
+        'threshold': int(os.getenv("APPROX_DISTINCT_THRESHOLD", 1000000)),
+        'error': float(os.getenv("APPROX_DISTINCT_ERROR", 0.01)),
+        'exact_values': max(50, int(os.getenv("EXACT_DISTINCT_LIMIT", 10000)))
+    }
+
+
+def new_distinct_sketch() -> HyperLogLog:
+    return HyperLogLog.for_error(distinct_count_settings()['error'])
+
+
+def _sketch_block(df: pd.DataFrame) -> Dict[str, HyperLogLog]:
+    sketches = {}
+    for column in df.columns:
+        sketch = new_distinct_sketch()
+        sketch.update(df[column])
+        sketches[column] = sketch
+    return sketches
+
+
+def build_distinct_sketches(df: pd.DataFrame, workers: Optional[int] = None) -> Dict[str, HyperLogLog]:
+    """One distinct sketch per column of ``df``, built in parallel column blocks."""
+    sketches = {}
+    for block_sketches in map_column_blocks(_sketch_block, df, workers):
+        sketches.update(block_sketches)
+    return sketches
+
+
+def _top_values_block(df: pd.DataFrame) -> Dict[str, TopValues]:
+    return {column: TopValues.from_counts(df[column].value_counts(sort=False)) for column in df.columns}
+
+
+def build_top_values(df: pd.DataFrame, workers: Optional[int] = None) -> Dict[str, TopValues]:
+    """Top-value summaries of the text columns of ``df``, built in parallel
+    column blocks from exact counts."""
+    text_columns = [column for column in df.columns if not pd.api.types.is_numeric_dtype(df[column])]
+    summaries = {}
+    if text_columns:
+        for block in map_column_blocks(_top_values_block, df[text_columns], workers):
+            summaries.update(block)
+    return summaries
+
+
+def sketches_path_for(file_path: str) -> str:
+    """Path of the sketch file stored next to a dataset file."""
+    return os.path.splitext(file_path)[0] + SKETCHES_EXTENSION
+
+
+def save_sketches(
+    file_path: str,
+    sketches: Dict[str, HyperLogLog],
+    schema: Optional[Dict[str, Any]] = None,
+    cleaning_plan: Optional[Dict[str, Any]] = None,
+    top_values: Optional[Dict[str, TopValues]] = None
+) -> str:
+    """Persist per-column distinct sketches next to the dataset file.
+
+    The column ``schema``, ``cleaning_plan`` (fill values and clip bounds)
+    and the ``top_values`` summaries of text columns are stored alongside;
+    together they are what appending rows needs to extend the profile
+    without re-reading the stored ones.
+    """
+    path = sketches_path_for(file_path)
+    data = {'distinct': {column: sketch.to_dict() for column, sketch in sketches.items()}}
+    if schema is not None:
+        data['schema'] = schema
+    if cleaning_plan is not None:
+        data['cleaning_plan'] = cleaning_plan
+    if top_values is not None:
+        data['top_values'] = {column: summary.to_dict() for column, summary in top_values.items()}
+    with open(path, "w") as f:
+        json.dump(data, f)
+    return path
+
+
+def _load_sketch_file(file_path: str) -> Optional[Dict[str, Any]]:
+    path = sketches_path_for(file_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_sketches(file_path: str) -> Optional[Dict[str, HyperLogLog]]:
+    """Load the per-column distinct sketches stored for a dataset file."""
+    data = _load_sketch_file(file_path)
+    if data is None:
+        return None
+    return {column: HyperLogLog.from_dict(sketch) for column, sketch in data['distinct'].items()}
+
+
+def load_profile_state(file_path: str) -> Optional[Dict[str, Any]]:
+    """Distinct sketches, schema, cleaning plan and top-value summaries
+    stored for a dataset file.
+
+    Returns ``None`` for datasets stored before schemas were recorded.
+    ``top_values`` is empty for those stored before summaries were kept.
+    """
+    data = _load_sketch_file(file_path)
+    if data is None or 'schema' not in data:
+        return None
+    return {
+        'distinct': {column: HyperLogLog.from_dict(sketch) for column, sketch in data['distinct'].items()},
+        'schema': data['schema'],
+        'cleaning_plan': data.get('cleaning_plan', {}),
+        'top_values': {column: TopValues.from_dict(summary) for column, summary in data.get('top_values', {}).items()}
+    }
@@ -0,0 +1,279 @@
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import AsyncIterator, Optional, Tuple
+import aiofiles
+import glob
+import hashlib
+import os
+import shutil
+import time
+import uuid
+
+from app.models.dataset import Dataset, StoredFile
+from app.utils.parallel import claimant_alive, server_token
+
+CLAIM_POLL_SECONDS = 0.5
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+async def save_upload_file(
+    upload: UploadFile,
+    dest_path: str,
+    max_size: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[int, str]:
+    """Stream an upload to disk without blocking the event loop.
+
+    The size limit is enforced on the bytes actually received, not the
+    client-declared size, and the SHA-256 of the content is computed as it
+    streams. Returns ``(bytes_written, sha256_hex)``; a partial file is
+    removed if the limit is exceeded or the write fails.
+    """
+    digest = hashlib.sha256()
+    bytes_written = 0
+
+    try:
+        async with aiofiles.open(dest_path, "wb") as buffer:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+
+                bytes_written += len(chunk)
+                if bytes_written > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File size exceeds {max_size / 1024 / 1024}MB limit"
+                    )
+
+                digest.update(chunk)
+                await buffer.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+
+    return bytes_written, digest.hexdigest()
+
+
+def session_file_path(upload_dir: str, session_id: int) -> str:
+    """Path a resumable upload is assembled at until it is finalized."""
+    return os.path.join(upload_dir, f".session_{session_id}.part")
+
+
+def allocate_session_file(path: str, size: int) -> None:
+    """Create the file a resumable upload's chunks are written into.
+
+    Truncating to the full size leaves a sparse file, so chunks can arrive
+    in any order and be written straight to their offsets.
+    """
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+
+async def write_upload_chunk(
+    stream: AsyncIterator[bytes],
+    path: str,
+    offset: int,
+    max_size: int
+) -> Tuple[int, str]:
+    """Stream one chunk of a resumable upload to ``offset`` of ``path``.
+
+    Like ``save_upload_file`` the body is never held in memory and its
+    SHA-256 is computed as it is written. Bodies longer than ``max_size``
+    are rejected. Returns ``(bytes_written, sha256_hex)``; callers must
+    check both before treating the chunk as received.
+    """
+    digest = hashlib.sha256()
+    bytes_written = 0
+
+    async with aiofiles.open(path, "r+b") as buffer:
+        await buffer.seek(offset)
+        async for data in stream:
+            bytes_written += len(data)
+            if bytes_written > max_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Chunk exceeds its expected size of {max_size} bytes"
+                )
+            digest.update(data)
+            await buffer.write(data)
+
+    return bytes_written, digest.hexdigest()
+
+
+async def hash_file(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """SHA-256 of a file on disk, read without blocking the event loop."""
+    digest = hashlib.sha256()
+    async with aiofiles.open(path, "rb") as f:
+        while True:
+            chunk = await f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def incoming_path(upload_dir: str, suffix: str = ".csv") -> str:
+    """Temporary path an upload streams into before its hash is known.
+
+    ``suffix`` keeps the upload's extension (e.g. ``.csv.gz``) so readers
+    infer its compression.
+    """
+    return os.path.join(upload_dir, f".incoming_{uuid.uuid4().hex}{suffix}")
+
+
+def stored_file_path(upload_dir: str, content_hash: str, suffix: str = ".csv") -> str:
+    """Content-addressed location of an upload; compressed uploads are
+    stored as sent, e.g. ``<hash>.csv.gz``."""
+    return os.path.join(upload_dir, f"{content_hash}{suffix}")
+
+
+def remove_dataset_files(file_path: str) -> None:
+    """Remove a stored file and every artifact derived from it.
+
+    Derived artifacts (columnar copy, previews, ...) share the file's stem,
+    e.g. ``<hash>.csv`` and ``<hash>.arrow``.
+    """
+    stem = os.path.splitext(file_path)[0]
+    for path in [file_path] + glob.glob(glob.escape(stem) + ".*"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def move_dataset_files(file_path: str, new_file_path: str, copy: bool = False) -> None:
+    """Move a stored file and its derived artifacts to ``new_file_path``'s stem.
+
+    With ``copy`` the originals are left in place for the datasets still
+    using them.
+    """
+    stem = os.path.splitext(file_path)[0]
+    new_stem = os.path.splitext(new_file_path)[0]
+    for path in glob.glob(glob.escape(stem) + ".*"):
+        target = new_stem + path[len(stem):]
+        if copy:
+            shutil.copyfile(path, target)
+        else:
+            os.replace(path, target)
+
+
+def acquire_stored_file(db: Session, content_hash: str) -> Optional[StoredFile]:
+    """Take a reference on an already stored upload, if there is one.
+
+    The increment is part of the caller's transaction, so it only sticks
+    if the dataset that holds the reference is committed too.
+    """
+    stored = db.query(StoredFile).filter(
+        StoredFile.content_hash == content_hash,
+        StoredFile.status == "ready"
+    ).first()
+    if stored is not None:
+        stored.ref_count = StoredFile.ref_count + 1
+    return stored
+
+
+def claim_stored_file(db: Session, content_hash: str, file_path: str, file_size: int) -> Optional[StoredFile]:
+    """Claim ``content_hash`` for ingest, before anything is moved into
+    ``file_path``.
+
+    A pending row is inserted and committed under the hash's unique
+    constraint, so of identical uploads arriving together exactly one gets
+    it. Returns ``None`` when the hash is already stored or claimed.
+    """
+    stored = StoredFile(
+        content_hash=content_hash,
+        file_path=file_path,
+        file_size=file_size,
+        ref_count=0,
+        status="pending",
+        claim=server_token()
+    )
+    db.add(stored)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    return stored
+
+
+def drop_claim(db: Session, stored: StoredFile) -> None:
+    """Give up a pending claim, so the hash can be claimed again."""
+    db.query(StoredFile).filter(
+        StoredFile.id == stored.id,
+        StoredFile.status == "pending"
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def wait_for_claim(db: Session, content_hash: str) -> None:
+    """Wait until another upload's pending claim on ``content_hash`` is
+    resolved: its file is stored, or the claim was dropped. Claims of a
+    server that is no longer running are dropped here.
+
+    Every poll ends the session's transaction, so call it without pending
+    changes.
+    """
+    while True:
+        db.rollback()
+        stored = db.query(StoredFile).filter(StoredFile.content_hash == content_hash).first()
+        if stored is None or stored.status != "pending":
+            return
+        if not claimant_alive(stored.claim):
+            db.query(StoredFile).filter(
+                StoredFile.id == stored.id,
+                StoredFile.claim == stored.claim,
+                StoredFile.status == "pending"
+            ).delete(synchronize_session=False)
+            db.commit()
+            return
+        time.sleep(CLAIM_POLL_SECONDS)
+
+
+def release_stored_file(db: Session, file_path: str) -> Optional[str]:
+    """Drop one dataset's reference to the file stored at ``file_path``.
+
+    Returns the path whose files should be removed once the caller's
+    transaction commits: the stored file when this was its last reference,
+    or ``file_path`` itself for datasets uploaded before deduplication,
+    which own their files outright. Returns ``None`` while other datasets
+    still reference the file.
+    """
+    stored = db.query(StoredFile).filter(StoredFile.file_path == file_path).first()
+    if stored is None:
+        return file_path
+
+    stored.ref_count = StoredFile.ref_count - 1
+    db.flush()
+    db.refresh(stored)
+    if stored.ref_count > 0:
+        return None
+
+    db.delete(stored)
+    return stored.file_path
+
+
+def release_dataset_files(db: Session, dataset: Dataset) -> Optional[str]:
+    """Drop whatever hold ``dataset`` has on its stored file.
+
+    Only ready datasets hold a reference (taken when their ingest
+    succeeded), released as by ``release_stored_file``. A dataset whose
+    ingest failed points at its own upload; datasets that failed before
+    uploads were claimed may point at a path shared with identical
+    uploads, so the path is only returned for removal when no stored file
+    or dataset still being ingested uses it.
+    """
+    if dataset.status == "ready":
+        return release_stored_file(db, dataset.file_path)
+
+    stored = db.query(StoredFile).filter(StoredFile.file_path == dataset.file_path).first()
+    ingesting = db.query(Dataset).filter(
+        Dataset.file_path == dataset.file_path,
+        Dataset.id != dataset.id,
+        Dataset.status.in_(["pending", "profiling"])
+    ).first()
+    if stored is not None or ingesting is not None:
+        return None
+    return dataset.file_path
@@ -0,0 +1,77 @@
+"""Benchmark auto-mode model selection against a sequential LazyPredict sweep.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.bench_auto_selection --rows 1000000 --features 30 --workers 8 --skip-lazypredict
+
+A synthetic classification (or ``--task regression``) problem is split and
+scaled the way ``MLService`` does it, then swept by ``LazyClassifier``
+(``LazyRegressor``) on one core and by ``select_model`` with ``--workers``
+processes and a ``--timeout`` per candidate, fitting every candidate on all
+rows (``full``) and by successive halving (``halving``), optionally within
+``--time-budget`` seconds and ``--max-memory-mb``. The slowest fits of each
+leaderboard are listed with the rows they were trained on.
+"""
+import argparse
+import time
+import warnings
+
+from sklearn.datasets import make_classification, make_regression
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from app.utils.model_selection import RANKING_METRICS, select_model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--features', type=int, default=30)
+    parser.add_argument('--task', choices=['classification', 'regression'], default='classification')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=None)
+    parser.add_argument('--strategy', choices=['halving', 'full', 'both'], default='both')
+    parser.add_argument('--time-budget', type=float, default=None)
+    parser.add_argument('--max-memory-mb', type=float, default=None)
+    parser.add_argument('--skip-lazypredict', action='store_true')
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    if args.task == 'classification':
+        X, y = make_classification(n_samples=args.rows, n_features=args.features, random_state=42)
+    else:
+        X, y = make_regression(n_samples=args.rows, n_features=args.features, noise=10, random_state=42)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train)
+    X_test = scaler.transform(X_test)
+    print(f"{args.task}: {args.rows} rows x {args.features} features")
+
+    if not args.skip_lazypredict:
+        from lazypredict.Supervised import LazyClassifier, LazyRegressor
+        lazy = LazyClassifier if args.task == 'classification' else LazyRegressor
+        start = time.perf_counter()
+        scores, _ = lazy(verbose=0, ignore_warnings=True).fit(X_train, X_test, y_train, y_test)
+        print(f"LazyPredict sequential  {time.perf_counter() - start:8.1f}s  best {scores.index[0]}")
+
+    ranking = RANKING_METRICS[args.task]
+    strategies = ['full', 'halving'] if args.strategy == 'both' else [args.strategy]
+    for strategy in strategies:
+        start = time.perf_counter()
+        best_name, _, _, leaderboard, usage = select_model(
+            X_train, X_test, y_train, y_test, args.task, args.workers, args.timeout, strategy,
+            args.time_budget, args.max_memory_mb
+        )
+        print(f"select_model {strategy:<10} {time.perf_counter() - start:8.1f}s  best {best_name}  "
+              f"on {usage['rows']} rows, peak {usage['peak_memory_mb']} MB"
+              f"{', budget used up' if usage['budget_exhausted'] else ''}")
+
+        timed = sorted(leaderboard, key=lambda row: -(row['fit_time'] or 0))
+        for row in timed[:5]:
+            score = row.get(ranking)
+            print(f"  {row['model']:<32} {row['status']:<8} {row['rows']:>9} rows {row['fit_time'] or 0:8.2f}s  "
+                  f"{row.get('peak_memory_mb') or 0:8.1f} MB  {ranking} {score if score is not None else '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark the vectorized column profiler against the per-column original.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.bench_column_info --rows 20000 --columns 300
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.data_processing import get_column_info
+from app.utils.sketches import top_values_settings
+
+
+def legacy_detect_column_types(df: pd.DataFrame) -> dict:
+    """The original type detection, kept verbatim for comparison."""
+    column_types = {}
+    for column in df.columns:
+        if pd.api.types.is_numeric_dtype(df[column]):
+            if df[column].dtype in ['int64', 'int32']:
+                column_types[column] = 'integer'
+            else:
+                column_types[column] = 'float'
+        elif pd.api.types.is_datetime64_any_dtype(df[column]):
+            column_types[column] = 'datetime'
+        elif df[column].nunique() < min(50, len(df) * 0.1):
+            column_types[column] = 'categorical'
+        else:
+            column_types[column] = 'string'
+    return column_types
+
+
+def legacy_get_column_info(df: pd.DataFrame) -> dict:
+    """The original ``get_column_info``, kept verbatim for comparison (with
+    ``TOP_VALUES_K`` top values)."""
+    k = top_values_settings()['k']
+    column_info = {}
+    for column in df.columns:
+        info = {
+            'type': legacy_detect_column_types(df)[column],
+            'missing_count': df[column].isnull().sum(),
+            'missing_percentage': (df[column].isnull().sum() / len(df)) * 100,
+            'unique_count': df[column].nunique(),
+            'unique_percentage': (df[column].nunique() / len(df)) * 100
+        }
+        if info['type'] in ['integer', 'float']:
+            info.update({
+                'min': float(df[column].min()) if not df[column].isnull().all() else None,
+                'max': float(df[column].max()) if not df[column].isnull().all() else None,
+                'mean': float(df[column].mean()) if not df[column].isnull().all() else None,
+                'std': float(df[column].std()) if not df[column].isnull().all() else None
+            })
+        elif info['type'] == 'categorical':
+            value_counts = df[column].value_counts()
+            info.update({
+                'top_values': value_counts.head(k).to_dict(),
+                'value_counts': value_counts.to_dict()
+            })
+        column_info[column] = info
+    return column_info
+
+
+def make_frame(rows: int, columns: int, seed: int = 42) -> pd.DataFrame:
+    """Build a mixed-type frame: integers, floats with gaps, categories and free text."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        kind = i % 4
+        if kind == 0:
+            data[f'int_{i}'] = rng.integers(0, 1000, rows)
+        elif kind == 1:
+            values = rng.normal(size=rows)
+            values[rng.random(rows) < 0.05] = np.nan
+            data[f'float_{i}'] = values
+        elif kind == 2:
+            data[f'cat_{i}'] = rng.choice(['red', 'green', 'blue', 'black'], rows)
+        else:
+            data[f'text_{i}'] = rng.integers(0, rows, rows).astype(str)
+    return pd.DataFrame(data)
+
+
+def assert_same(expected: dict, actual: dict) -> None:
+    """Check that both profilers produce the same ``column_info``.
+
+    The new profiler may add keys (e.g. ``unique_count_mode``); every key the
+    original produced must be present with the same value. Top values must
+    have the same counts; values tied at the cut-off may differ.
+    """
+    assert expected.keys() == actual.keys()
+    for column, info in expected.items():
+        assert info.keys() <= actual[column].keys(), column
+        for key, value in info.items():
+            if key == 'top_values':
+                top = actual[column][key]
+                assert sorted(value.values()) == sorted(top.values()), (column, key)
+                cutoff = min(value.values(), default=0)
+                assert all(value.get(item, cutoff) == count for item, count in top.items()), (column, key)
+            elif isinstance(value, float) and not np.isnan(value):
+                assert np.isclose(value, actual[column][key]), (column, key)
+            elif not isinstance(value, float):
+                assert value == actual[column][key], (column, key)
+
+
+def timed(func, df: pd.DataFrame, repeat: int):
+    """Return the best wall time over ``repeat`` runs and the last result."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--columns', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.columns)
+    legacy_time, legacy_info = timed(legacy_get_column_info, df, args.repeat)
+    new_time, new_info = timed(get_column_info, df, args.repeat)
+    assert_same(legacy_info, new_info)
+
+    print(f"rows={args.rows} columns={args.columns}")
+    print(f"legacy get_column_info: {legacy_time:.3f}s")
+    print(f"vectorized get_column_info: {new_time:.3f}s")
+    print(f"speedup: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
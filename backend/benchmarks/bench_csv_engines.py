@@ -0,0 +1,76 @@
+"""Benchmark whole-file CSV reads with each parsing engine.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.bench_csv_engines --rows 1000000
+
+A synthetic export (integers, floats with gaps, booleans with and without
+gaps, categories, free text) is written to a temporary file and read with
+the C engine and with pyarrow, each inferring types and with the schema
+stored at ingest. Every result is checked against a plain ``pd.read_csv``.
+Use ``--compression gzip`` to time compressed uploads.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.csv_reader import csv_engine, read_csv, stored_schema
+from app.utils.profiling import column_schema
+
+
+def make_orders_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """An order export: ids and counts, prices with gaps, flags, codes and notes."""
+    rng = np.random.default_rng(seed)
+    price = rng.gamma(2.0, 40.0, rows).round(2)
+    price[rng.random(rows) < 0.03] = np.nan
+    gift = rng.random(rows) < 0.1
+    reviewed = pd.Series(rng.random(rows) < 0.5, dtype=object)
+    reviewed[rng.random(rows) < 0.2] = np.nan
+    return pd.DataFrame({
+        'order_id': np.arange(rows) + 10_000_000,
+        'quantity': rng.integers(1, 20, rows),
+        'price': price,
+        'discount': rng.random(rows).round(4),
+        'gift': gift,
+        'reviewed': reviewed,
+        'region': rng.choice(['north', 'south', 'east', 'west'], rows),
+        'sku': np.char.add('SKU-', rng.integers(0, 50_000, rows).astype(str)),
+        'note': rng.choice(['', 'leave at door', 'call first', 'fragile, handle with care'], rows)
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--compression', choices=['none', 'gzip', 'bz2', 'zstd'], default='none')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    suffix = {'none': '.csv', 'gzip': '.csv.gz', 'bz2': '.csv.bz2', 'zstd': '.csv.zst'}[args.compression]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'orders' + suffix)
+        make_orders_frame(args.rows).to_csv(path, index=False)
+        expected = pd.read_csv(path)
+        column_info = {column: dict(entry) for column, entry in column_schema(expected).items()}
+        print(f"{args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB {args.compression}, {os.cpu_count()} CPUs")
+
+        engines = ['c'] + (['pyarrow'] if csv_engine('pyarrow') == 'pyarrow' else [])
+        baseline = None
+        for engine in engines:
+            for label, schema in [('inferred', None), ('stored dtypes', stored_schema(column_info))]:
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    df = read_csv(path, schema=schema, engine=engine)
+                elapsed = (time.perf_counter() - start) / args.repeat
+
+                assert df.equals(expected) and df.dtypes.equals(expected.dtypes), (engine, label)
+                baseline = baseline or elapsed
+                print(f"{engine:<8} {label:<14} {elapsed:8.3f}s  speedup {baseline / elapsed:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
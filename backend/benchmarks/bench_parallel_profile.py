@@ -0,0 +1,77 @@
+"""Benchmark how cleaning and profiling a wide frame scale with workers.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.bench_parallel_profile --rows 20000 --columns 2000
+
+Each worker count runs ``clean_dataframe`` followed by ``get_column_info``
+(what ingest does) and reports the speedup over a single worker. Results
+are checked against the single-worker run. Use ``--executor process`` to
+measure the process pool instead of threads.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.data_processing import clean_dataframe, get_column_info
+
+
+def make_sensor_frame(rows: int, columns: int, seed: int = 42) -> pd.DataFrame:
+    """A wide sensor export: mostly float channels with gaps, some status codes."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        if i % 10 == 9:
+            data[f'status_{i}'] = rng.choice(['ok', 'warn', 'fault'], rows, p=[0.9, 0.08, 0.02])
+        else:
+            values = rng.normal(loc=i, scale=1 + i % 7, size=rows)
+            values[rng.random(rows) < 0.02] = np.nan
+            data[f'sensor_{i}'] = values
+    return pd.DataFrame(data)
+
+
+def profile(df: pd.DataFrame, workers: int):
+    cleaned, report = clean_dataframe(df, workers=workers)
+    return cleaned, report, get_column_info(cleaned, workers=workers)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--columns', type=int, default=2000)
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ['PROFILE_EXECUTOR'] = args.executor
+    df = make_sensor_frame(args.rows, args.columns)
+    print(f"{args.rows} rows x {args.columns} columns, {args.executor} pool, {os.cpu_count()} CPUs")
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    baseline = None
+    expected = profile(df, 1)
+    for workers in worker_counts:
+        profile(df, workers)  # warm up the pool
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            result = profile(df, workers)
+        elapsed = (time.perf_counter() - start) / args.repeat
+
+        pd.testing.assert_frame_equal(result[0], expected[0])
+        assert result[1] == expected[1] and result[2] == expected[2]
+
+        baseline = baseline or elapsed
+        print(f"workers={workers:<3} {elapsed:8.3f}s  speedup {baseline / elapsed:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
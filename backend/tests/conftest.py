@@ -0,0 +1,57 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# The app reads its settings on import and keeps models and reports in
+# directories relative to the working directory, so the tests run in a
+# scratch directory
+WORKDIR = tempfile.mkdtemp(prefix="insightai-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'insightai.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(WORKDIR, "uploads")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+
+def pytest_sessionstart(session):
+    os.chdir(WORKDIR)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db():
+    from app.models.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def headers(db):
+    """Authorization headers of a new user."""
+    from app.models.user import User
+    from app.utils.auth import create_access_token
+
+    name = uuid.uuid4().hex
+    db.add(User(email=f"{name}@example.com", username=name, hashed_password="x"))
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': f'{name}@example.com'})}"}
+
+
+def csv_bytes(rows: int = 200, seed: int = 0) -> bytes:
+    """A small CSV whose content is unique to ``seed``."""
+    lines = ["id,value,category,seed"]
+    for i in range(rows):
+        lines.append(f"{i},{(i * 7919 + seed) % 1000 / 10},{'abc'[i % 3]},{seed}")
+    return ("\n".join(lines) + "\n").encode()
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.dataset import Dataset
+from app.utils.profiling import row_hash_paths
+from tests.conftest import csv_bytes
+
+
+def mixed_csv(rows: int, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=rows).round(3)
+    values[rng.random(rows) < 0.2] = np.nan
+    return pd.DataFrame({
+        'id': np.arange(rows) + seed * rows,
+        'value': values,
+        'flag': rng.random(rows) < 0.5,
+        'code': [f"00{i % 7}" for i in range(rows)],
+        'seed': seed
+    }).to_csv(index=False).encode()
+
+
+def upload(client, headers, content):
+    response = client.post("/upload/csv", files={"file": ("data.csv", content, "text/csv")}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def append(client, headers, dataset_id, content):
+    response = client.post(
+        f"/upload/datasets/{dataset_id}/append",
+        files={"file": ("more.csv", content, "text/csv")},
+        headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_appended_rows_are_deduplicated_against_stored_rows(client, headers, monkeypatch, chunked):
+    if chunked:
+        monkeypatch.setenv("CHUNKED_INGEST_THRESHOLD", "0")
+    content = mixed_csv(300, seed=10 + chunked)
+    dataset = upload(client, headers, content)
+    assert dataset['row_count'] == 300
+
+    # Half the rows again, then half new ones
+    lines = content.decode().splitlines(keepends=True)
+    more = mixed_csv(100, seed=20 + chunked).decode().splitlines(keepends=True)
+    result = append(client, headers, dataset['id'], "".join(lines[:151] + more[1:]).encode())
+
+    report = result['cleaning_report']
+    assert report['rows_received'] == 250
+    assert report['duplicates_removed'] == 150
+    assert report['deduplicated_against_stored']
+    assert result['dataset']['row_count'] == 400
+
+    # The appended rows count as stored on the next append
+    result = append(client, headers, dataset['id'], "".join(more).encode())
+    assert result['cleaning_report']['duplicates_removed'] == 100
+    assert result['dataset']['row_count'] == 400
+
+
+def test_datasets_without_stored_hashes_report_it(client, headers, db):
+    dataset = upload(client, headers, csv_bytes(seed=30))
+    for path in row_hash_paths(db.get(Dataset, dataset['id']).file_path):
+        os.remove(path)
+
+    result = append(client, headers, dataset['id'], csv_bytes(seed=30))
+    assert not result['cleaning_report']['deduplicated_against_stored']
+    assert result['cleaning_report']['duplicates_removed'] == 0
+    assert result['dataset']['row_count'] == 400
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.data_processing import clean_dataframe
+from app.utils.profiling import profile_csv_chunked
+from app.utils.sketches import quantile_sketch_k
+
+ROWS = 30000
+
+
+@pytest.fixture(scope="module")
+def csv_path(tmp_path_factory):
+    rng = np.random.default_rng(7)
+    skewed = rng.lognormal(size=ROWS)
+    skewed[rng.random(ROWS) < 0.1] = np.nan
+    gaps = rng.normal(50, 10, ROWS).round(2)
+    gaps[rng.random(ROWS) < 0.3] = np.nan
+    city = rng.choice(['Oslo', 'Lima', 'Baku', None], ROWS, p=[0.5, 0.3, 0.1, 0.1])
+    df = pd.DataFrame({
+        'count': rng.integers(0, 1000, ROWS),
+        'skewed': skewed,
+        'gaps': gaps,
+        'city': city
+    })
+    # Some duplicate rows for both paths to drop
+    df = pd.concat([df, df.head(500)], ignore_index=True)
+    path = tmp_path_factory.mktemp("parity") / "data.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def rank(values: pd.Series, value: float) -> float:
+    """Normalized rank of ``value`` among ``values``, halfway through ties."""
+    values = values.to_numpy()
+    return ((values < value).sum() + (values <= value).sum()) / 2 / len(values)
+
+
+def test_chunked_cleaning_matches_whole_file_within_sketch_error(csv_path):
+    raw = pd.read_csv(csv_path)
+    _, exact = clean_dataframe(raw)
+    chunked = profile_csv_chunked(csv_path, 1, chunksize=4000)['cleaning_report']
+    deduped = raw.drop_duplicates()
+    # Rank error of KLL is about 1.7 / k; allow twice that
+    tolerance = 2 * 1.7 / quantile_sketch_k()
+
+    # Counts and modes are exact on both paths
+    for key in ['original_shape', 'final_shape']:
+        assert tuple(chunked[key]) == tuple(exact[key]), key
+    for key in ['missing_values', 'duplicates_removed']:
+        assert chunked[key] == exact[key], key
+    assert chunked['fill_values']['city'] == exact['fill_values']['city']
+
+    assert chunked['fill_values'].keys() == exact['fill_values'].keys()
+    for column in ['skewed', 'gaps']:
+        assert abs(rank(deduped[column].dropna(), chunked['fill_values'][column]) - 0.5) <= tolerance, column
+
+    assert chunked['clip_bounds'].keys() == exact['clip_bounds'].keys()
+    for column, (lower, upper) in chunked['clip_bounds'].items():
+        # Quartiles are taken after imputing this path's median, and
+        # recovered from the bounds
+        imputed = deduped[column].fillna(chunked['fill_values'].get(column, 0))
+        q1, q3 = (2.5 * lower + 1.5 * upper) / 4, (1.5 * lower + 2.5 * upper) / 4
+        assert abs(rank(imputed, q1) - 0.25) <= tolerance, column
+        assert abs(rank(imputed, q3) - 0.75) <= tolerance, column
@@ -0,0 +1,85 @@
+import glob
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from app.utils import feature_matrix
+from app.utils.columnar import cleaned_path_for, write_columnar_cache
+from app.utils.feature_matrix import load_feature_matrix
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """A stored file and its cleaned copy."""
+    file_path = str(tmp_path / "data.csv")
+    df = pd.DataFrame({
+        'number': np.arange(100, dtype=np.float64) / 3,
+        'flag': np.arange(100) % 2 == 0,
+        'city': ['Oslo', 'Lima', 'Baku', 'Oslo'] * 25,
+        'unused': ['x'] * 100
+    })
+    cleaned_path = write_columnar_cache(df, file_path, cleaned_path_for(file_path))
+    return file_path, cleaned_path, df
+
+
+def built_columns(file_path):
+    return sorted(glob.glob(file_path[:-len(".csv")] + ".features.*.npy"))
+
+
+def test_only_requested_columns_are_encoded(dataset):
+    file_path, cleaned_path, df = dataset
+
+    features = load_feature_matrix(file_path, cleaned_path, len(df), ['number', 'city'])
+
+    assert features.columns == ['number', 'city']
+    assert len(built_columns(file_path)) == 2
+    encoder = LabelEncoder().fit(df['city'])
+    assert features.classes == {'city': encoder.classes_.tolist()}
+    frame = features.take(['number', 'city'])
+    np.testing.assert_array_equal(frame['number'], df['number'])
+    np.testing.assert_array_equal(frame['city'], encoder.transform(df['city']))
+    np.testing.assert_array_equal(features.decoded('city'), df['city'])
+
+    # Asking for more columns encodes only the new ones
+    features = load_feature_matrix(file_path, cleaned_path, len(df))
+    assert features.columns == list(df.columns)
+    assert len(built_columns(file_path)) == 4
+    assert features.is_numeric('flag') and not features.is_numeric('flag', include_bool=False)
+    np.testing.assert_array_equal(features.decoded('flag'), df['flag'])
+
+
+def test_missing_columns_and_stale_rows(dataset):
+    file_path, cleaned_path, df = dataset
+
+    assert load_feature_matrix(file_path, cleaned_path, len(df), ['nope']) is None
+    assert load_feature_matrix(file_path, None, len(df)) is None
+    # A cleaned copy with other rows than the dataset (e.g. before an
+    # append) is not encoded
+    assert load_feature_matrix(file_path, cleaned_path, len(df) + 1, ['number']) is None
+
+
+def test_concurrent_builds_encode_each_column_once(dataset, monkeypatch):
+    file_path, cleaned_path, df = dataset
+    writes = []
+    write_feature_column = feature_matrix._write_feature_column
+
+    def counting_write(series, *args):
+        writes.append(series.name)
+        write_feature_column(series, *args)
+
+    monkeypatch.setattr(feature_matrix, "_write_feature_column", counting_write)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(load_feature_matrix(file_path, cleaned_path, len(df))))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(writes) == sorted(df.columns)
+    assert all(features.columns == list(df.columns) for features in results)
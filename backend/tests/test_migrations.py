@@ -0,0 +1,64 @@
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, text
+
+from app.models import dataset, user  # noqa: F401  (register the tables)
+from app.models.database import Base, alembic_config, upgrade_database
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'insightai.db'}")
+
+
+def schema_diff(engine):
+    """Differences between the migrated database and the models."""
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={'compare_type': True})
+        return compare_metadata(context, Base.metadata)
+
+
+def migrate(engine, revision, direction=command.upgrade):
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes['connection'] = connection
+        direction(config, revision)
+
+
+def test_migrations_reproduce_the_models(engine):
+    upgrade_database(engine)
+    assert schema_diff(engine) == []
+
+
+def test_database_created_before_migrations_is_upgraded(engine):
+    # What create_all made before migrations: the base revision's tables
+    # without a revision record
+    migrate(engine, ScriptDirectory.from_config(alembic_config()).get_base())
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE alembic_version"))
+        connection.execute(text("INSERT INTO users (email, username) VALUES ('a@b.c', 'a')"))
+        connection.execute(text("INSERT INTO datasets (name, file_size, user_id) VALUES ('d', 123, 1)"))
+
+    upgrade_database(engine)
+
+    assert schema_diff(engine) == []
+    with engine.connect() as connection:
+        assert tuple(connection.execute(text("SELECT status, file_size FROM datasets")).one()) == ('ready', 123)
+
+
+def test_downgrade_and_upgrade_again(engine):
+    upgrade_database(engine)
+    migrate(engine, 'base', command.downgrade)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT name FROM sqlite_master WHERE name = 'datasets'")).first() is None
+    upgrade_database(engine)
+    assert schema_diff(engine) == []
+
+
+def test_upgrade_is_idempotent(engine):
+    upgrade_database(engine)
+    upgrade_database(engine)
+    assert schema_diff(engine) == []
@@ -0,0 +1,26 @@
+import json
+
+import numpy as np
+
+from app.utils.preview import serialize_preview
+
+
+def reject_constant(name):
+    raise ValueError(f"{name} is not valid JSON")
+
+
+def test_non_finite_values_serialize_as_null():
+    preview = {
+        'head': [{'a': float('inf'), 'b': -np.inf, 'c': 1.5, 'd': 'x'}],
+        'tail': [],
+        'shape': (1, 4),
+        'info': {'a': {'std': float('nan'), 'mean': np.float32(2.5), 'bounds': (np.nan, 1.0)}}
+    }
+
+    content = serialize_preview(preview)
+
+    # Strict parsers reject NaN and Infinity
+    parsed = json.loads(content, parse_constant=reject_constant)
+    assert parsed['head'] == [{'a': None, 'b': None, 'c': 1.5, 'd': 'x'}]
+    assert parsed['shape'] == [1, 4]
+    assert parsed['info'] == {'a': {'std': None, 'mean': 2.5, 'bounds': [None, 1.0]}}
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.data_processing import save_dataframe_info
+from app.utils.profiling import RowHashSet, profile_csv_chunked
+
+
+def test_row_hash_set_spills_past_its_memory_limit():
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 2 ** 63, 50000, dtype=np.int64).astype(np.uint64)
+    stream = np.concatenate([hashes, hashes[rng.integers(0, len(hashes), 20000)]])
+    rng.shuffle(stream)
+
+    seen = RowHashSet(memory_limit=16 * 1024)
+    keep = np.concatenate([seen.add_new(stream[i:i + 3000]) for i in range(0, len(stream), 3000)])
+
+    np.testing.assert_array_equal(keep, ~pd.Series(stream).duplicated().to_numpy())
+    assert seen._spilled
+    assert sum(run.nbytes for run in seen._runs) <= 16 * 1024
+
+
+@pytest.fixture(scope="module")
+def mixed_csv(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    rows = 3000
+    df = pd.DataFrame({
+        'count': rng.integers(0, 50, rows),
+        'gaps': np.where(rng.random(rows) < 0.1, np.nan, rng.integers(0, 9, rows)),
+        'heavy': rng.normal(size=rows) * np.where(rng.random(rows) < 0.02, 50, 1),
+        'city': rng.choice(['Oslo', 'Lima', 'Baku', None], rows),
+        'code': rng.integers(0, 2000, rows).astype(str),
+        'flag': rng.choice([True, False], rows),
+        'mixed': ['1'] * (rows - 5) + ['x'] * 5,
+        'empty': [np.nan] * rows,
+        'spiky': np.r_[rng.integers(0, 10, rows - 3), [1000, 2000, -500]]
+    })
+    # Some duplicate rows for both paths to drop
+    df = pd.concat([df, df.head(200)], ignore_index=True)
+    path = tmp_path_factory.mktemp("profile") / "data.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def assert_same_value(expected, actual, where):
+    if isinstance(expected, float) and np.isnan(expected):
+        assert isinstance(actual, float) and np.isnan(actual), where
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected), where
+    elif isinstance(expected, dict):
+        assert {str(key): value for key, value in actual.items()} == \
+            {str(key): value for key, value in expected.items()}, where
+    else:
+        assert actual == expected, where
+
+
+@pytest.mark.parametrize("chunksize", [97, 1000, 10 ** 6])
+def test_chunked_profile_matches_in_memory_profile(mixed_csv, chunksize, monkeypatch):
+    # Quantile sketches this large never compact, so medians and quartiles
+    # are exact and any difference is the chunking itself (their error is
+    # covered in test_sketches)
+    monkeypatch.setenv("QUANTILE_SKETCH_K", "100000")
+    whole = save_dataframe_info(pd.read_csv(mixed_csv), mixed_csv, 1)
+    chunked = profile_csv_chunked(mixed_csv, 1, chunksize=chunksize)
+
+    assert (chunked['row_count'], chunked['column_count']) == (whole['row_count'], whole['column_count'])
+    assert chunked['column_info'].keys() == whole['column_info'].keys()
+    for column, info in whole['column_info'].items():
+        other = chunked['column_info'][column]
+        assert other.keys() == info.keys(), column
+        for key, value in info.items():
+            assert_same_value(value, other[key], (column, key))
+
+    expected, actual = whole['cleaning_report'], chunked['cleaning_report']
+    assert actual['missing_values'] == {column: int(count) for column, count in expected['missing_values'].items()}
+    for key in ['duplicates_removed', 'outliers', 'fill_values', 'clip_bounds']:
+        assert_same_value(expected[key], actual[key], key)
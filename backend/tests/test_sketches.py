@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.sketches import HyperLogLog, KLLSketch, TopValues
+
+
+def rank(values: np.ndarray, value: float) -> float:
+    """Normalized rank of ``value`` among sorted ``values``, halfway through ties."""
+    below = np.searchsorted(values, value, side='left')
+    through = np.searchsorted(values, value, side='right')
+    return (below + through) / 2 / len(values)
+
+
+def chunks(values: pd.Series, count: int):
+    size = -(-len(values) // count)
+    return [values.iloc[start:start + size] for start in range(0, len(values), size)]
+
+
+@pytest.mark.parametrize("distinct", [100, 20000, 500000])
+def test_hyperloglog_estimate_is_within_its_error(distinct):
+    rng = np.random.default_rng(distinct)
+    values = pd.Series(rng.integers(0, distinct, 2 * distinct)).astype(str)
+    exact = values.nunique()
+
+    sketch = HyperLogLog(12)
+    sketch.update(values)
+
+    # Four standard errors; the hashes are fixed, so this never flakes
+    assert abs(sketch.estimate() - exact) <= 4 * sketch.relative_error * exact
+
+
+def test_merged_hyperloglogs_estimate_the_union():
+    rng = np.random.default_rng(1)
+    values = pd.Series(rng.integers(0, 50000, 200000))
+    whole = HyperLogLog(12)
+    whole.update(values)
+
+    merged = HyperLogLog(12)
+    for chunk in chunks(values, 7):
+        part = HyperLogLog(12)
+        part.update(chunk)
+        merged.merge(part)
+
+    np.testing.assert_array_equal(merged.registers, whole.registers)
+    assert merged.estimate() == whole.estimate()
+    assert HyperLogLog.from_dict(merged.to_dict()).estimate() == merged.estimate()
+
+
+def test_kll_quantiles_are_within_their_rank_error():
+    rng = np.random.default_rng(2)
+    values = np.concatenate([rng.lognormal(size=150000), rng.integers(0, 5, 50000)])
+    rng.shuffle(values)
+    k = 200
+
+    # Built from chunks, as ingest and appends build it
+    sketch = KLLSketch(k)
+    for chunk in np.array_split(values, 40):
+        part = KLLSketch(k)
+        part.update(chunk)
+        sketch.merge(part)
+
+    exact = np.sort(values)
+    assert sketch.count == len(values)
+    for q in [0.01, 0.25, 0.5, 0.75, 0.99]:
+        # Rank error of KLL is about 1.7 / k; allow twice that
+        assert abs(rank(exact, sketch.quantile(q)) - q) <= 2 * 1.7 / k, q
+
+
+def test_kll_counts_a_point_mass_exactly():
+    rng = np.random.default_rng(3)
+    values = rng.normal(size=50000)
+    values[rng.random(len(values)) < 0.2] = np.nan
+    present = values[~np.isnan(values)]
+    k = 200
+
+    sketch = KLLSketch(k)
+    sketch.update(values)
+    # The missing values imputed with the median, as cleaning does
+    median = sketch.quantile(0.5)
+    imputed = np.sort(np.where(np.isnan(values), median, values))
+
+    assert sketch.count == len(present)
+    for q in [0.25, 0.5, 0.75]:
+        quantile = sketch.quantile(q, extra_value=median, extra_count=len(values) - len(present))
+        assert abs(rank(imputed, quantile) - q) <= 2 * 1.7 / k, q
+
+
+def test_kll_is_exact_until_it_compacts():
+    values = np.arange(100, dtype=float)[::-1]
+    sketch = KLLSketch(200)
+    sketch.update(values)
+
+    for q in [0, 0.1, 0.5, 0.9, 1]:
+        assert sketch.quantile(q) == pd.Series(values).quantile(q)
+
+
+def test_top_values_counts_are_within_their_error():
+    rng = np.random.default_rng(4)
+    # A few heavy hitters over a long tail of rare values
+    values = pd.Series(np.where(
+        rng.random(300000) < 0.5,
+        rng.choice(['a', 'b', 'c', 'd'], 300000, p=[0.4, 0.3, 0.2, 0.1]),
+        rng.integers(0, 100000, 300000).astype(str)
+    ))
+    exact = values.value_counts()
+    capacity = 64
+
+    summary = TopValues(capacity)
+    for chunk in chunks(values, 30):
+        part = TopValues(capacity)
+        part.update(chunk)
+        summary.merge(part)
+
+    assert 0 < summary.error <= len(values) / (capacity + 1)
+    assert len(summary.counts) <= capacity
+    for value, count in summary.counts.items():
+        assert exact[value] - summary.error <= count <= exact[value], value
+    # Values without a counter occur at most ``error`` times
+    assert exact.drop(summary.counts.index).max() <= summary.error
+    info = summary.to_info(4)
+    assert list(info['top_values']) == ['a', 'b', 'c', 'd']
+    assert info['top_values_error'] == summary.error
+
+
+def test_top_values_from_an_exact_table_are_exact():
+    counts = pd.Series({'a': 10, 'b': 7, 'c': 3, 'd': 1})
+
+    assert TopValues.from_counts(counts, capacity=8).error == 0
+    summary = TopValues.from_counts(counts, capacity=2)
+    assert summary.counts.to_dict() == {'a': 10, 'b': 7}
+    assert summary.error == 3
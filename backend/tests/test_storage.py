@@ -0,0 +1,72 @@
+import os
+
+from app.models.dataset import Dataset, StoredFile
+from app.utils.storage import release_dataset_files
+from tests.conftest import csv_bytes
+
+
+def upload(client, headers, content, name="data.csv"):
+    response = client.post("/upload/csv", files={"file": (name, content, "text/csv")}, headers=headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def artifacts(file_path):
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return sorted(name for name in os.listdir(os.path.dirname(file_path)) if name.startswith(stem + "."))
+
+
+def test_shared_file_is_removed_with_its_last_dataset(client, headers, db):
+    content = csv_bytes(seed=60)
+    ids = [upload(client, headers, content, name) for name in ("a.csv", "b.csv", "c.csv")]
+    file_path = db.get(Dataset, ids[0]).file_path
+    stored = db.query(StoredFile).filter(StoredFile.file_path == file_path).one()
+    assert stored.ref_count == 3
+    files = artifacts(file_path)
+    assert len(files) > 1
+
+    for remaining, dataset_id in zip([2, 1], ids):
+        assert client.delete(f"/upload/datasets/{dataset_id}", headers=headers).status_code == 200
+        db.refresh(stored)
+        assert stored.ref_count == remaining
+        assert artifacts(file_path) == files
+
+    assert client.delete(f"/upload/datasets/{ids[2]}", headers=headers).status_code == 200
+    db.expire_all()
+    assert db.query(StoredFile).filter(StoredFile.file_path == file_path).count() == 0
+    assert artifacts(file_path) == []
+
+    # Uploading it again stores it afresh
+    dataset_id = upload(client, headers, content)
+    assert db.query(StoredFile).filter(StoredFile.content_hash == db.get(Dataset, dataset_id).content_hash).one().ref_count == 1
+
+
+def test_release_only_returns_paths_nothing_else_uses(client, headers, db):
+    dataset = db.get(Dataset, upload(client, headers, csv_bytes(seed=61)))
+    stored = db.query(StoredFile).filter(StoredFile.file_path == dataset.file_path).one()
+    user_id = dataset.user_id
+
+    def add(status, file_path):
+        other = Dataset(name="x", filename="x.csv", file_path=file_path, status=status, user_id=user_id)
+        db.add(other)
+        db.flush()
+        return other
+
+    # Failed datasets hold no reference, and do not own a stored file
+    assert release_dataset_files(db, add("failed", stored.file_path)) is None
+    assert release_dataset_files(db, add("failed", "own.csv")) == "own.csv"
+    # Nor a path an identical upload is still ingesting
+    add("profiling", "shared.csv")
+    assert release_dataset_files(db, add("failed", "shared.csv")) is None
+    # Datasets stored before deduplication own their file outright
+    assert release_dataset_files(db, add("ready", "legacy.csv")) == "legacy.csv"
+    db.refresh(stored)
+    assert stored.ref_count == 1
+
+    # The ready dataset holds the only reference
+    assert release_dataset_files(db, dataset) == stored.file_path
+    db.flush()
+    assert db.query(StoredFile).filter(StoredFile.id == stored.id).count() == 0
+    db.rollback()
+    db.refresh(stored)
+    assert stored.ref_count == 1
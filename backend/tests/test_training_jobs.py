@@ -0,0 +1,159 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+from app.models.dataset import Dataset, Model, TrainingJob
+from app.routes.ml import ModelTrainingRequest, training_service
+from app.services import training_service as training_module
+from app.utils.parallel import server_token
+from tests.conftest import csv_bytes
+
+
+def sleep_in_worker(job_id):
+    """Stands in for ``run_training_job``: a worker that never finishes."""
+    training_module._become_worker()
+    training_module._advance(training_module.SessionLocal(), job_id, 'training', worker_pid=os.getpid())
+    time.sleep(60)
+
+
+class Submitted(list):
+    """Records what is handed to the training executor instead of running it."""
+
+    def submit(self, fn, *args):
+        self.append((fn.__name__, *args))
+
+
+@pytest.fixture
+def dataset_id(client, headers):
+    response = client.post(
+        "/upload/csv", files={"file": ("data.csv", csv_bytes(seed=50), "text/csv")}, headers=headers
+    )
+    return response.json()["id"]
+
+
+def train_body(dataset_id, **values):
+    return {"dataset_id": dataset_id, "task_type": "regression", "target_column": "value",
+            "algorithm": "linear_regression", "feature_columns": ["id"], **values}
+
+
+def add_job(db, dataset_id, stage, claim, **values):
+    job = TrainingJob(
+        dataset_id=dataset_id,
+        user_id=db.get(Dataset, dataset_id).user_id,
+        request=ModelTrainingRequest(**train_body(dataset_id)).model_dump(),
+        stage=stage,
+        claim=claim,
+        **values
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def dead_claim():
+    """Claim of a server process on this host that has exited."""
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return server_token().rpartition(":")[0] + f":{process.pid}"
+
+
+def wait_for_stage(db, job_id, stages, timeout=60):
+    for _ in range(int(timeout * 10)):
+        db.expire_all()
+        job = db.get(TrainingJob, job_id)
+        if job.stage in stages:
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"job stayed {job.stage}")
+
+
+def test_cancelled_queued_job_never_runs(client, headers, db, dataset_id, monkeypatch):
+    submitted = Submitted()
+    monkeypatch.setattr(training_service, "executor", submitted)
+    response = client.post("/ml/train?background=true", json=train_body(dataset_id), headers=headers)
+    job_id = response.json()["id"]
+
+    response = client.post(f"/ml/jobs/{job_id}/cancel", headers=headers)
+    assert (response.status_code, response.json()["stage"]) == (200, "cancelled")
+    assert client.post(f"/ml/jobs/{job_id}/cancel", headers=headers).status_code == 409
+
+    # The executor gets to it after the cancellation and skips it
+    assert submitted == [("run_job", job_id)]
+    training_service.run_job(job_id)
+    job = wait_for_stage(db, job_id, ["cancelled"])
+    assert (job.model_id, job.started_at) == (None, None)
+
+
+def test_cancelling_a_running_job_kills_its_worker(client, headers, db, dataset_id, monkeypatch):
+    monkeypatch.setattr(training_module, "run_training_job", sleep_in_worker)
+    response = client.post("/ml/train?background=true", json=train_body(dataset_id), headers=headers)
+    job_id = response.json()["id"]
+    job = wait_for_stage(db, job_id, ["training"])
+    process = training_service.processes[job_id]
+    assert job.worker_pid == process.pid
+
+    response = client.post(f"/ml/jobs/{job_id}/cancel", headers=headers)
+    assert (response.status_code, response.json()["stage"]) == (200, "cancelled")
+    process.join(10)
+    assert process.exitcode is not None
+    # Dying of the cancellation does not turn it into a failure
+    job = wait_for_stage(db, job_id, ["cancelled"])
+    assert (job.error, job.worker_pid, job.model_id) == (None, None, None)
+
+
+def test_worker_records_nothing_for_a_job_cancelled_mid_training(db, dataset_id, monkeypatch):
+    job = add_job(db, dataset_id, "queued", server_token())
+    train = training_module.MLService.train_regression_model
+
+    def cancel_while_training(self, *args, **kwargs):
+        training_service.cancel(training_module.SessionLocal(), job)
+        return train(self, *args, **kwargs)
+
+    # Run the worker body in this process
+    monkeypatch.setattr(training_module, "_become_worker", lambda: None)
+    monkeypatch.setattr(training_module.MLService, "train_regression_model", cancel_while_training)
+    models = db.query(Model).count()
+    saved = set(os.listdir("models")) if os.path.isdir("models") else set()
+    training_module.run_training_job(job.id)
+
+    db.expire_all()
+    assert db.get(TrainingJob, job.id).stage == "cancelled"
+    assert db.query(Model).count() == models
+    assert (set(os.listdir("models")) if os.path.isdir("models") else set()) == saved
+
+
+def test_resume_requeues_only_jobs_of_stopped_servers(db, dataset_id, monkeypatch):
+    submitted = Submitted()
+    monkeypatch.setattr(training_service, "executor", submitted)
+    claim = dead_claim()
+    interrupted = add_job(db, dataset_id, "training", claim, worker_pid=12345)
+    queued = add_job(db, dataset_id, "queued", claim)
+    live = add_job(db, dataset_id, "training", server_token())
+    finished = add_job(db, dataset_id, "failed", claim)
+    refit = add_job(db, dataset_id, "ready", claim, refit_stage="running")
+
+    training_service.resume()
+    # Once claimed by this running server they are not taken again
+    training_service.resume()
+
+    assert sorted(submitted) == sorted([
+        ("run_job", interrupted.id), ("run_job", queued.id), ("run_refit", refit.id)
+    ])
+    db.expire_all()
+    assert (interrupted.stage, interrupted.worker_pid, interrupted.claim) == ("queued", None, server_token())
+    assert (refit.stage, refit.refit_stage, refit.claim) == ("ready", "queued", server_token())
+    assert (live.stage, finished.stage) == ("training", "failed")
+
+
+def test_resumed_job_trains_to_completion(db, dataset_id):
+    job = add_job(db, dataset_id, "training", dead_claim())
+
+    training_service.resume()
+
+    job = wait_for_stage(db, job.id, ["ready", "failed"])
+    assert (job.stage, job.error) == ("ready", None)
+    model = db.get(Model, job.model_id)
+    assert os.path.exists(model.model_path)
+    assert model.feature_columns == ["id"]
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from sqlalchemy import event
+
+from app.models.database import SessionLocal, engine
+from app.models.dataset import Dataset, TrainingJob
+from app.routes.ml import training_service
+from tests.conftest import csv_bytes
+
+
+def create_jobs_together(dataset_id, user_id, count):
+    """Create jobs from ``count`` threads at once, each with its own session
+    as separate requests (or server processes) would have."""
+    created = []
+    barrier = threading.Barrier(count)
+
+    def create():
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            job = training_service.create_job(db, dataset_id, user_id, {"task_type": "regression"})
+            created.append(job.id if job is not None else None)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=create) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return created
+
+
+def test_concurrent_jobs_respect_the_per_user_limit(client, headers, db, monkeypatch):
+    monkeypatch.setattr(training_service, "max_jobs_per_user", 2)
+    response = client.post(
+        "/upload/csv", files={"file": ("data.csv", csv_bytes(seed=40), "text/csv")}, headers=headers
+    )
+    dataset_id = response.json()["id"]
+    user_id = db.get(Dataset, dataset_id).user_id
+
+    def slow_count(conn, cursor, statement, parameters, context, executemany):
+        # Let the other threads run between counting jobs and inserting one
+        if "count(" in statement and "training_jobs" in statement:
+            time.sleep(0.2)
+
+    event.listen(engine, "after_cursor_execute", slow_count)
+    try:
+        created = create_jobs_together(dataset_id, user_id, 6)
+    finally:
+        event.remove(engine, "after_cursor_execute", slow_count)
+
+    assert len([job_id for job_id in created if job_id is not None]) == 2
+    jobs = db.query(TrainingJob).filter(TrainingJob.dataset_id == dataset_id).all()
+    assert [job.stage for job in jobs] == ["queued", "queued"]
+    assert all(job.request == {"task_type": "regression"} and job.claim for job in jobs)
+
+
+def test_jobs_beyond_the_limit_are_rejected(client, headers, monkeypatch):
+    monkeypatch.setattr(training_service, "max_jobs_per_user", 1)
+    # Jobs stay queued so they count against the limit
+    monkeypatch.setattr(training_service, "submit", lambda job_id: None)
+    response = client.post(
+        "/upload/csv", files={"file": ("data.csv", csv_bytes(seed=41), "text/csv")}, headers=headers
+    )
+    body = {"dataset_id": response.json()["id"], "task_type": "regression", "target_column": "value"}
+
+    assert client.post("/ml/train?background=true", json=body, headers=headers).status_code == 202
+    assert client.post("/ml/train?background=true", json=body, headers=headers).status_code == 429
@@ -0,0 +1,115 @@
+import hashlib
+import os
+
+import pytest
+
+from app.models.dataset import Dataset
+from tests.conftest import csv_bytes
+
+CHUNK_SIZE = 1000
+
+
+@pytest.fixture
+def content():
+    return csv_bytes(rows=400, seed=20)
+
+
+@pytest.fixture
+def session(client, headers, content, monkeypatch):
+    """A new upload session for ``content`` in ``CHUNK_SIZE`` chunks."""
+    monkeypatch.setenv("UPLOAD_SESSION_CHUNK_SIZE", str(CHUNK_SIZE))
+    response = client.post(
+        "/upload/sessions", json={"filename": "data.csv", "total_size": len(content)}, headers=headers
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def put_chunk(client, headers, session, index, body, checksum=None):
+    return client.put(
+        f"/upload/sessions/{session['id']}/chunks/{index}",
+        content=body,
+        headers={**headers, "X-Chunk-SHA256": checksum or hashlib.sha256(body).hexdigest()}
+    )
+
+
+def chunk(content, index):
+    return content[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+
+
+def test_chunks_in_any_order_complete_the_upload(client, headers, db, content, session):
+    total = session["total_chunks"]
+    assert total == -(-len(content) // CHUNK_SIZE) and total > 3
+    order = [total - 1, 1, 0] + list(range(2, total - 1))
+
+    response = put_chunk(client, headers, session, order[0], chunk(content, order[0]))
+    assert response.json()["received_ranges"] == [[(total - 1) * CHUNK_SIZE, len(content)]]
+    put_chunk(client, headers, session, order[1], chunk(content, order[1]))
+    response = put_chunk(client, headers, session, order[2], chunk(content, order[2]))
+    assert response.json()["received_ranges"] == [[0, 2 * CHUNK_SIZE], [(total - 1) * CHUNK_SIZE, len(content)]]
+    for index in order[3:]:
+        response = put_chunk(client, headers, session, index, chunk(content, index))
+    assert response.json()["received_ranges"] == [[0, len(content)]]
+    assert response.json()["received_bytes"] == len(content)
+
+    response = client.post(f"/upload/sessions/{session['id']}/complete", headers=headers)
+    assert response.status_code == 200
+    dataset = db.get(Dataset, response.json()["id"])
+    assert dataset.content_hash == hashlib.sha256(content).hexdigest()
+    assert dataset.row_count == 400
+    with open(dataset.file_path, "rb") as f:
+        assert f.read() == content
+
+    response = client.get(f"/upload/sessions/{session['id']}", headers=headers)
+    assert (response.json()["status"], response.json()["dataset_id"]) == ("complete", dataset.id)
+    # Completed sessions take no more chunks and cannot complete again
+    assert put_chunk(client, headers, session, 0, chunk(content, 0)).status_code == 409
+    assert client.post(f"/upload/sessions/{session['id']}/complete", headers=headers).status_code == 409
+
+
+def test_completing_with_chunks_missing_is_refused(client, headers, content, session):
+    for index in range(session["total_chunks"] - 1):
+        put_chunk(client, headers, session, index, chunk(content, index))
+
+    response = client.post(f"/upload/sessions/{session['id']}/complete", headers=headers)
+    assert response.status_code == 409
+    assert "1 of" in response.json()["detail"]
+    # The session stays open for the missing chunk
+    last = session["total_chunks"] - 1
+    assert put_chunk(client, headers, session, last, chunk(content, last)).status_code == 200
+    assert client.post(f"/upload/sessions/{session['id']}/complete", headers=headers).status_code == 200
+
+
+def test_corrupt_chunks_are_rejected_and_can_be_resent(client, headers, db, content, session):
+    body = chunk(content, 0)
+    corrupted = bytes([body[0] ^ 1]) + body[1:]
+
+    # Body damaged in transit: its checksum is that of the intended chunk
+    response = put_chunk(client, headers, session, 0, corrupted, checksum=hashlib.sha256(body).hexdigest())
+    assert response.status_code == 400
+    assert put_chunk(client, headers, session, 0, body[:-1]).status_code == 400
+    assert put_chunk(client, headers, session, 0, body + b"x").status_code == 413
+    assert put_chunk(client, headers, session, session["total_chunks"], body).status_code == 400
+    assert client.get(f"/upload/sessions/{session['id']}", headers=headers).json()["received_bytes"] == 0
+
+    for index in range(session["total_chunks"]):
+        assert put_chunk(client, headers, session, index, chunk(content, index)).status_code == 200
+    # A received chunk is never overwritten; re-sending it is a no-op
+    assert put_chunk(client, headers, session, 0, body).status_code == 200
+    assert put_chunk(client, headers, session, 0, corrupted).status_code == 409
+
+    response = client.post(f"/upload/sessions/{session['id']}/complete", headers=headers)
+    assert response.status_code == 200
+    dataset = db.get(Dataset, response.json()["id"])
+    with open(dataset.file_path, "rb") as f:
+        assert f.read() == content
+
+
+def test_deleted_session_removes_its_partial_file(client, headers, content, session):
+    put_chunk(client, headers, session, 0, chunk(content, 0))
+    upload_dir = os.environ["UPLOAD_DIR"]
+    before = set(os.listdir(upload_dir))
+
+    assert client.delete(f"/upload/sessions/{session['id']}", headers=headers).status_code == 200
+    assert client.get(f"/upload/sessions/{session['id']}", headers=headers).status_code == 404
+    assert len(before - set(os.listdir(upload_dir))) == 1
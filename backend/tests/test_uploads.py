@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+from app.models.dataset import Dataset, StoredFile
+from app.routes.upload import ingest_service
+from tests.conftest import csv_bytes
+
+
+class Ingests(list):
+    """Paths ingested; ``fail_first`` makes the first ingest fail."""
+    fail_first = False
+
+
+@pytest.fixture
+def ingests(monkeypatch):
+    """Record ingests, slowing each down so identical uploads overlap."""
+    calls = Ingests()
+    ingest_file = ingest_service.ingest_file
+
+    def slow_ingest(file_path, *args, **kwargs):
+        calls.append(file_path)
+        time.sleep(1)
+        if calls.fail_first and len(calls) == 1:
+            raise ValueError("ingest failed")
+        return ingest_file(file_path, *args, **kwargs)
+
+    monkeypatch.setattr(ingest_service, "ingest_file", slow_ingest)
+    return calls
+
+
+def upload_together(client, headers, content, background=False):
+    responses = []
+
+    def upload(name):
+        responses.append(client.post(
+            f"/upload/csv?background={str(background).lower()}",
+            files={"file": (name, content, "text/csv")},
+            headers=headers
+        ))
+
+    threads = [threading.Thread(target=upload, args=(name,)) for name in ("a.csv", "b.csv")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def wait_for_job(client, headers, job_id):
+    for _ in range(200):
+        job = client.get(f"/upload/jobs/{job_id}", headers=headers).json()
+        if job["stage"] in ("ready", "failed"):
+            return job
+        time.sleep(0.1)
+    raise AssertionError("ingest job did not finish")
+
+
+def stored_file(db, content_hash):
+    return db.query(StoredFile).filter(StoredFile.content_hash == content_hash).one()
+
+
+def incoming_files():
+    upload_dir = os.environ["UPLOAD_DIR"]
+    return [name for name in os.listdir(upload_dir) if name.startswith(".incoming")]
+
+
+def test_identical_uploads_are_ingested_once(client, headers, db, ingests):
+    responses = upload_together(client, headers, csv_bytes(seed=1))
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert len(ingests) == 1
+    datasets = [db.get(Dataset, response.json()["id"]) for response in responses]
+    assert datasets[0].file_path == datasets[1].file_path
+    assert os.path.exists(datasets[0].file_path)
+    stored = stored_file(db, datasets[0].content_hash)
+    assert (stored.status, stored.ref_count) == ("ready", 2)
+    assert incoming_files() == []
+
+
+def test_identical_background_uploads_are_ingested_once(client, headers, db, ingests):
+    responses = upload_together(client, headers, csv_bytes(seed=2), background=True)
+
+    assert [response.status_code for response in responses] == [202, 202]
+    jobs = [wait_for_job(client, headers, response.json()["id"]) for response in responses]
+    assert [job["stage"] for job in jobs] == ["ready", "ready"]
+    assert len(ingests) == 1
+    datasets = [db.get(Dataset, job["dataset_id"]) for job in jobs]
+    assert [dataset.status for dataset in datasets] == ["ready", "ready"]
+    assert datasets[0].file_path == datasets[1].file_path
+    assert os.path.exists(datasets[0].file_path)
+    assert stored_file(db, datasets[0].content_hash).ref_count == 2
+    assert incoming_files() == []
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_failed_ingest_leaves_the_identical_upload_its_file(client, headers, db, ingests, background):
+    ingests.fail_first = True
+    content = csv_bytes(seed=3 + background)
+    responses = upload_together(client, headers, content, background=background)
+
+    if background:
+        stages = sorted(wait_for_job(client, headers, response.json()["id"])["stage"] for response in responses)
+        assert stages == ["failed", "ready"]
+    else:
+        assert sorted(response.status_code for response in responses) == [200, 500]
+    # The failed claimant removed its claim; the other upload claimed the
+    # hash and stored its own copy
+    assert len(ingests) == 2
+    ready = db.query(Dataset).filter(Dataset.content_hash == hashlib.sha256(content).hexdigest(),
+                                     Dataset.status == "ready").one()
+    assert os.path.exists(ready.file_path)
+    assert stored_file(db, ready.content_hash).ref_count == 1
+    assert incoming_files() == []
+